@@ -1,56 +1,100 @@
 ﻿import requests
-import pandas as pd
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import re
-from fuzzywuzzy import fuzz
-import unicodedata
+import multiprocessing
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, wait
+from motor import (COLUMNAS_HISTORIAL, MAXIMO_FILAS_HISTORIAL, TRABAJADORES, URLS_CONTRATO,
+                   CacheResultados, CatalogosPrecargados, Diagnostico, Historial,
+                   ValidacionCancelada, analizar_archivo_contratos, comparar_contratos,
+                   describir_estado_catalogo, describir_reporte, guardar_reporte,
+                   guardar_resultados)
+from servicio import URL_SERVICIO, validar_en_servicio
 
 # =============================================================================
-# FUNCIONES DE PROCESAMIENTO
+# RESULTADOS DE VALIDACIÓN
 # =============================================================================
 
-def normalizar_texto(texto):
+def exportar_resultados(partidas_detectadas, ventana):
     """
-    Convierte el texto a minúsculas, remueve diacríticos,
-    realiza reemplazos específicos y elimina caracteres no deseados.
+    Exporta los resultados en el formato que corresponde a la extensión
+    elegida (ver guardar_resultados).
     """
-    texto = str(texto).lower()
-    # Remover diacríticos (ej.: "cáscara" -> "cascara")
-    texto = ''.join(c for c in unicodedata.normalize('NFD', texto)
-                    if unicodedata.category(c) != 'Mn')
-    # Reemplazos específicos (según el dominio)
-    texto = texto.replace("9 1/2", "9.5").replace("9 1/2'", "9.5").replace("9.5'", "9.5")
-    texto = texto.replace("20'", "20in")
-    # Se conservan números, letras, puntos, comas y espacios
-    texto = re.sub(r'[^a-z0-9., ]', '', texto)
-    texto = re.sub(r'\s+', ' ', texto).strip()
-    return texto
-
-def mejor_fuzzy_score(a, b):
+    file_path = filedialog.asksaveasfilename(parent=ventana, defaultextension=".xlsx",
+                                             filetypes=[("Excel files", "*.xlsx"),
+                                                        ("CSV", "*.csv"),
+                                                        ("JSON", "*.json"),
+                                                        ("JSON Lines", "*.jsonl"),
+                                                        ("Parquet", "*.parquet")])
+    if not file_path:
+        return
+    ventana.config(cursor="watch")
+    ventana.update_idletasks()
+    try:
+        guardar_resultados(partidas_detectadas, file_path)
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Error", f"No se pudieron exportar los resultados:\n{e}", parent=ventana)
+        return
+    finally:
+        ventana.config(cursor="")
+    messagebox.showinfo("Exportación Completa", "Los resultados han sido exportados correctamente.",
+                        parent=ventana)
+
+def crear_pestaña_diagnostico(pestañas, reporte):
     """
-    Devuelve el máximo entre distintos métodos de fuzzy matching.
+    Agrega a 'pestañas' la pestaña con el reporte de diagnóstico de la
+    validación y un botón para guardarlo como JSON.
     """
-    return max(
-        fuzz.ratio(a, b),
-        fuzz.partial_ratio(a, b),
-        fuzz.token_sort_ratio(a, b),
-        fuzz.token_set_ratio(a, b)
-    )
+    frame_diagnostico = tk.Frame(pestañas, bg="#f9f9f9")
+    frame_diagnostico.columnconfigure(0, weight=1)
+    frame_diagnostico.rowconfigure(0, weight=1)
+    pestañas.add(frame_diagnostico, text="Diagnóstico")
+
+    texto = tk.Text(frame_diagnostico, font=("Consolas", 9), wrap="none", bg="white", relief="flat")
+    texto.insert("1.0", describir_reporte(reporte))
+    texto.config(state="disabled")
+    texto.grid(row=0, column=0, sticky="nsew")
+    scrollbar_v = ttk.Scrollbar(frame_diagnostico, orient="vertical", command=texto.yview)
+    scrollbar_v.grid(row=0, column=1, sticky="ns")
+    scrollbar_h = ttk.Scrollbar(frame_diagnostico, orient="horizontal", command=texto.xview)
+    scrollbar_h.grid(row=1, column=0, sticky="ew")
+    texto.config(yscrollcommand=scrollbar_v.set, xscrollcommand=scrollbar_h.set)
+
+    def guardar():
+        file_path = filedialog.asksaveasfilename(parent=frame_diagnostico, defaultextension=".json",
+                                                 filetypes=[("JSON", "*.json")])
+        if not file_path:
+            return
+        try:
+            guardar_reporte(reporte, file_path)
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudo guardar el reporte:\n{e}", parent=frame_diagnostico)
 
-def exportar_a_excel(partidas_detectadas):
-    file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", 
-                                             filetypes=[("Excel files", "*.xlsx")])
-    if not file_path:
-        return
-    df = pd.DataFrame.from_dict(partidas_detectadas, orient='index')
-    df.reset_index(inplace=True)
-    df.rename(columns={'index': 'Partida'}, inplace=True)
-    df["Total"] = df["cantidad"] * df["precio_unitario"]
-    df.to_excel(file_path, index=False)
-    messagebox.showinfo("Exportación Completa", "Los resultados han sido exportados correctamente.")
-
-def mostrar_resultados(partidas_detectadas):
+    tk.Button(frame_diagnostico, text="Guardar reporte JSON", command=guardar,
+              font=("Segoe UI", 10), bg="#4a90e2", fg="white",
+              relief="flat", padx=10, pady=4).grid(row=2, column=0, columnspan=2, pady=10)
+
+# Filas de reserva que se dibujan debajo de las visibles en la tabla de resultados
+FILAS_RESERVA = 2
+# Filas del libro que se listan como máximo en el detalle de una partida
+MAXIMO_FILAS_DETALLE = 50
+
+def etiqueta_similitud(similitud):
+    return "verde" if similitud >= 100 else "naranja" if similitud >= 80 else "amarillo"
+
+def mostrar_resultados(partidas_detectadas, reporte=None):
+    """
+    Muestra los resultados en una tabla virtual: el Treeview sólo contiene
+    las filas que caben en la ventana (más FILAS_RESERVA) y se vuelve a
+    llenar al desplazarse, así que abrir, desplazarse y colorear cuesta lo
+    mismo con 100 que con 50 000 partidas.
+
+    Si se registró el diagnóstico de la validación, 'reporte' se muestra en
+    una segunda pestaña.
+    """
     ventana_resultados = tk.Toplevel(bg="#f9f9f9")
     ventana_resultados.title("Resultados de Validación")
     ventana_resultados.geometry("900x600")
@@ -59,29 +103,18 @@ def mostrar_resultados(partidas_detectadas):
     ventana_resultados.columnconfigure(0, weight=1)
     ventana_resultados.rowconfigure(0, weight=1)
 
-    frame_principal = tk.Frame(ventana_resultados, bg="#f9f9f9")
-    frame_principal.grid(row=0, column=0, sticky="nsew")
+    if reporte is None:
+        frame_principal = tk.Frame(ventana_resultados, bg="#f9f9f9")
+        frame_principal.grid(row=0, column=0, sticky="nsew")
+    else:
+        pestañas = ttk.Notebook(ventana_resultados)
+        pestañas.grid(row=0, column=0, sticky="nsew")
+        frame_principal = tk.Frame(pestañas, bg="#f9f9f9")
+        pestañas.add(frame_principal, text="Resultados")
+        crear_pestaña_diagnostico(pestañas, reporte)
     frame_principal.columnconfigure(0, weight=1)
     frame_principal.rowconfigure(0, weight=1)
 
-    canvas = tk.Canvas(frame_principal, bg="#f9f9f9", highlightthickness=0)
-    canvas.grid(row=0, column=0, sticky="nsew")
-
-    scrollbar_vertical = ttk.Scrollbar(frame_principal, orient="vertical", command=canvas.yview)
-    scrollbar_vertical.grid(row=0, column=1, sticky="ns")
-
-    scrollbar_horizontal = ttk.Scrollbar(frame_principal, orient="horizontal", command=canvas.xview)
-    scrollbar_horizontal.grid(row=1, column=0, sticky="ew")
-
-    canvas.configure(yscrollcommand=scrollbar_vertical.set, xscrollcommand=scrollbar_horizontal.set)
-
-    frame_interno = tk.Frame(canvas, bg="#f9f9f9")
-    canvas.create_window((0, 0), window=frame_interno, anchor="nw")
-
-    def on_frame_configure(event):
-        canvas.configure(scrollregion=canvas.bbox("all"))
-    frame_interno.bind("<Configure>", on_frame_configure)
-
     estilo = ttk.Style()
     estilo.theme_use("clam")
     estilo.configure("Treeview", font=("Segoe UI", 10), rowheight=26,
@@ -96,7 +129,7 @@ def mostrar_resultados(partidas_detectadas):
     columnas = ("Partida", "Descripción", "Unidad de Medida",
                 "Precio Unitario", "Cantidad", "Total",
                 "Similitud", "Palabra Coincidente", "Comentario")
-    tree = ttk.Treeview(frame_interno, columns=columnas, show='headings')
+    tree = ttk.Treeview(frame_principal, columns=columnas, show='headings')
     for col in columnas:
         tree.heading(col, text=col)
         if col == "Comentario":
@@ -104,14 +137,135 @@ def mostrar_resultados(partidas_detectadas):
         else:
             tree.column(col, anchor="center", width=110)
 
-    tree.pack(expand=True, fill="both")
+    tree.grid(row=0, column=0, sticky="nsew")
 
     tree.tag_configure("verde", background="#e3f9e5")
     tree.tag_configure("naranja", background="#fff4e5")
     tree.tag_configure("amarillo", background="#fffce5")
 
+    # Estado de la tabla virtual: 'claves' tiene todas las partidas en orden,
+    # 'posiciones' el índice de cada una en 'claves', 'primera' es la posición
+    # de la fila de arriba y 'seleccion' guarda las partidas seleccionadas
+    # aunque no estén dibujadas. 'total_general' se ajusta con cada cambio.
+    claves = list(partidas_detectadas)
+    posiciones = {partida: i for i, partida in enumerate(claves)}
+    seleccion = set()
+    total_general = sum(datos["cantidad"] * datos["precio_unitario"]
+                        for datos in partidas_detectadas.values())
+    primera = 0
+    visibles = 1
+    alto_encabezado = 30
     entry_editable = None  # Variable para widget Entry temporal
 
+    def valores_fila(partida):
+        datos = partidas_detectadas[partida]
+        return (
+            partida,
+            datos["descripcion"],
+            datos["unidad_medida"],
+            datos["precio_unitario"],
+            datos["cantidad"],
+            datos["cantidad"] * datos["precio_unitario"],
+            datos["similitud"],
+            datos["palabra_coincidente"],
+            datos.get("texto_evaluado", "")
+        )
+
+    def dibujar():
+        nonlocal primera, entry_editable
+        if entry_editable:
+            # La celda que se editaba ya no estará en el mismo lugar
+            entry_editable.destroy()
+            entry_editable = None
+        primera = max(0, min(primera, len(claves) - visibles))
+        mostradas = claves[primera:primera + visibles + FILAS_RESERVA]
+        tree.delete(*tree.get_children())
+        for partida in mostradas:
+            tree.insert("", "end", iid=partida, values=valores_fila(partida),
+                        tags=(etiqueta_similitud(partidas_detectadas[partida]["similitud"]),))
+        tree.selection_set([partida for partida in mostradas if partida in seleccion])
+        tree.yview_moveto(0)
+        total = max(len(claves), 1)
+        scrollbar_vertical.set(primera / total, min(1.0, (primera + visibles) / total))
+
+    def desplazar(*args):
+        # Recibe los mismos argumentos que yview: ("moveto", fracción) o
+        # ("scroll", cantidad, "units"/"pages")
+        nonlocal primera
+        if args[0] == "moveto":
+            primera = int(float(args[1]) * len(claves))
+        elif args[0] == "scroll":
+            primera += int(args[1]) * (visibles if args[2] == "pages" else 1)
+        dibujar()
+
+    scrollbar_vertical = ttk.Scrollbar(frame_principal, orient="vertical", command=desplazar)
+    scrollbar_vertical.grid(row=0, column=1, sticky="ns")
+
+    scrollbar_horizontal = ttk.Scrollbar(frame_principal, orient="horizontal", command=tree.xview)
+    scrollbar_horizontal.grid(row=1, column=0, sticky="ew")
+
+    tree.configure(xscrollcommand=scrollbar_horizontal.set)
+
+    def redimensionar(event):
+        nonlocal visibles, alto_encabezado
+        hijos = tree.get_children()
+        caja = tree.bbox(hijos[0]) if hijos else None
+        if caja:
+            alto_encabezado = caja[1]
+        visibles = max(1, (event.height - alto_encabezado) // 26)
+        dibujar()
+
+    tree.bind("<Configure>", redimensionar)
+
+    def rueda(event):
+        if event.num == 4 or event.delta > 0:
+            desplazar("scroll", -3, "units")
+        else:
+            desplazar("scroll", 3, "units")
+        return "break"
+
+    tree.bind("<MouseWheel>", rueda)
+    tree.bind("<Button-4>", rueda)
+    tree.bind("<Button-5>", rueda)
+
+    def mover_foco(event):
+        # Las flechas y RePág/AvPág recorren todas las partidas, no sólo las dibujadas
+        nonlocal primera
+        if not claves:
+            return "break"
+        foco = tree.focus()
+        actual = posiciones.get(foco, primera)
+        pasos = {"Up": -1, "Down": 1, "Prior": -visibles, "Next": visibles}
+        if event.keysym == "Home":
+            nuevo = 0
+        elif event.keysym == "End":
+            nuevo = len(claves) - 1
+        else:
+            nuevo = max(0, min(actual + pasos[event.keysym], len(claves) - 1))
+        if nuevo < primera:
+            primera = nuevo
+        elif nuevo >= primera + visibles:
+            primera = nuevo - visibles + 1
+        seleccion.clear()
+        seleccion.add(claves[nuevo])
+        dibujar()
+        tree.focus(claves[nuevo])
+        return "break"
+
+    for tecla in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Home>", "<End>"):
+        tree.bind(tecla, mover_foco)
+
+    def actualizar_seleccion(event):
+        # Sólo las filas dibujadas pueden haber cambiado de selección
+        seleccion.difference_update(tree.get_children())
+        seleccion.update(tree.selection())
+
+    tree.bind("<<TreeviewSelect>>", actualizar_seleccion)
+    # Un clic sin Ctrl ni Shift también quita la selección de las filas no dibujadas
+    tree.bind("<Button-1>", lambda event: seleccion.clear())
+    tree.bind("<Control-Button-1>", lambda event: None)
+    tree.bind("<Shift-Button-1>", lambda event: None)
+
     def editar_cantidad(event):
         nonlocal entry_editable
 
@@ -136,7 +290,9 @@ def mostrar_resultados(partidas_detectadas):
         entry_editable.focus()
 
         def guardar_cambio(event=None):
-            nonlocal entry_editable
+            nonlocal entry_editable, total_general
+            if entry_editable is None:
+                return
             nuevo_valor = entry_editable.get()
             try:
                 nuevo_valor_num = int(nuevo_valor)
@@ -147,13 +303,11 @@ def mostrar_resultados(partidas_detectadas):
                 entry_editable.focus()
                 return
 
-            tree.set(row, "Cantidad", nuevo_valor_num)
-
-            precio_unitario = float(tree.set(row, "Precio Unitario"))
-            total = nuevo_valor_num * precio_unitario
-            tree.set(row, "Total", total)
-
-            partidas_detectadas[row]["cantidad"] = nuevo_valor_num
+            datos = partidas_detectadas[row]
+            total_general += (nuevo_valor_num - datos["cantidad"]) * datos["precio_unitario"]
+            datos["cantidad"] = nuevo_valor_num
+            tree.item(row, values=valores_fila(row))
+            actualizar_resumen()
 
             entry_editable.destroy()
             entry_editable = None
@@ -163,12 +317,37 @@ def mostrar_resultados(partidas_detectadas):
 
     tree.bind("<Double-1>", editar_cantidad)
 
-    def eliminar_item(partida):
-        if messagebox.askyesno("Eliminar", f"¿Deseas eliminar la partida {partida}?"):
-            partidas_detectadas.pop(partida, None)
-            for item in tree.get_children():
-                if tree.item(item)['values'][0] == partida:
-                    tree.delete(item)
+    def eliminar_partidas(partidas):
+        """
+        Elimina varias partidas en una sola pasada sobre 'claves' y redibuja
+        una sola vez.
+        """
+        nonlocal total_general
+        borradas = set(partidas)
+        for partida in borradas:
+            datos = partidas_detectadas.pop(partida)
+            total_general -= datos["cantidad"] * datos["precio_unitario"]
+        claves[:] = [partida for partida in claves if partida not in borradas]
+        posiciones.clear()
+        posiciones.update((partida, i) for i, partida in enumerate(claves))
+        seleccion.difference_update(borradas)
+        dibujar()
+        actualizar_resumen()
+
+    def eliminar_seleccionados(event=None):
+        # Las coincidencias exactas (similitud 100) no se pueden eliminar
+        partidas = [partida for partida in sorted(seleccion, key=posiciones.__getitem__)
+                    if partidas_detectadas[partida]["similitud"] < 100]
+        if not partidas:
+            return
+        if len(partidas) == 1:
+            pregunta = f"¿Deseas eliminar la partida {partidas[0]}?"
+        else:
+            pregunta = f"¿Deseas eliminar las {len(partidas):,} partidas seleccionadas?"
+        if messagebox.askyesno("Eliminar", pregunta):
+            eliminar_partidas(partidas)
+
+    tree.bind("<Delete>", eliminar_seleccionados)
 
     def mostrar_detalle(event):
         selected = tree.selection()
@@ -201,6 +380,14 @@ def mostrar_resultados(partidas_detectadas):
                 canvas_detalle.configure(scrollregion=canvas_detalle.bbox("all"))
             frame_detalle.bind("<Configure>", on_frame_detalle_configure)
 
+            # Filas como en Excel: la 1 es la de los encabezados. Las partidas
+            # que devuelve el servicio local no traen 'filas'
+            fila = datos.get("fila")
+            filas = datos.get("filas")
+            if filas:
+                listadas = ", ".join(str(f + 2) for f in filas[:MAXIMO_FILAS_DETALLE])
+                if len(filas) > MAXIMO_FILAS_DETALLE:
+                    listadas += f", ... ({len(filas):,} en total)"
             info = (
                 f"Partida: {item}\n\n"
                 f"Descripción:\n{datos['descripcion']}\n\n"
@@ -212,66 +399,293 @@ def mostrar_resultados(partidas_detectadas):
                 f"Palabra Detectada: \"{datos['palabra_coincidente']}\"\n\n"
                 f"Comentario Evaluado:\n{datos.get('texto_evaluado', '')}"
             )
+            if fila is not None:
+                info += f"\n\nFila del comentario en el libro: {fila + 2}"
+            if filas:
+                info += f"\nFilas que suman la cantidad: {listadas}"
             label = tk.Label(frame_detalle, text=info, justify="left", font=("Segoe UI", 10),
                              bg="#ffffff", anchor="w")
             label.pack(padx=20, pady=20, fill="both", expand=True)
 
     tree.bind("<Double-3>", mostrar_detalle)
 
-    for partida, datos in partidas_detectadas.items():
-        total = datos["cantidad"] * datos["precio_unitario"]
-        similitud = datos["similitud"]
-        tag = "verde" if similitud >= 100 else "naranja" if similitud >= 80 else "amarillo"
-        tree.insert("", "end", iid=partida, values=(
-            partida,
-            datos["descripcion"],
-            datos["unidad_medida"],
-            datos["precio_unitario"],
-            datos["cantidad"],
-            total,
-            similitud,
-            datos["palabra_coincidente"],
-            datos.get("texto_evaluado", "")
-        ), tags=(tag,))
-
     label_instruccion = tk.Label(ventana_resultados,
-                                 text="Doble clic sobre la celda 'Cantidad' para editarla",
+                                 text="Doble clic sobre la celda 'Cantidad' para editarla; Supr elimina las seleccionadas",
                                  font=("Segoe UI", 9, "italic"), bg="#f9f9f9", fg="#555")
     label_instruccion.grid(row=1, column=0, pady=(5, 10), sticky="w", padx=15)
 
+    label_resumen = tk.Label(ventana_resultados, font=("Segoe UI", 9, "bold"),
+                             bg="#f9f9f9", fg="#333")
+    label_resumen.grid(row=1, column=0, pady=(5, 10), sticky="e", padx=15)
+
+    def actualizar_resumen():
+        label_resumen.config(text=f"{len(claves):,} partidas  ·  Total: {total_general:,.2f} USD")
+
     btns = tk.Frame(ventana_resultados, bg="#f9f9f9")
     btns.grid(row=2, column=0, pady=10)
 
     btn_eliminar = tk.Button(btns, text="Eliminar Seleccionados",
-                             command=lambda: [
-                                 eliminar_item(tree.item(i)['values'][0])
-                                 for i in tree.selection()
-                                 if tree.item(i)['values'][0] in partidas_detectadas
-                                    and partidas_detectadas[tree.item(i)['values'][0]]["similitud"] < 100
-                             ],
+                             command=eliminar_seleccionados,
                              font=("Segoe UI", 10), bg="#d9534f", fg="white",
                              relief="flat", padx=10, pady=4)
     btn_eliminar.grid(row=0, column=0, padx=10)
 
-    btn_exportar = tk.Button(btns, text="Exportar a Excel",
-                             command=lambda: exportar_a_excel(partidas_detectadas),
+    btn_exportar = tk.Button(btns, text="Exportar Resultados",
+                             command=lambda: exportar_resultados(partidas_detectadas, ventana_resultados),
                              font=("Segoe UI", 10), bg="#5cb85c", fg="white",
                              relief="flat", padx=10, pady=4)
     btn_exportar.grid(row=0, column=1, padx=10)
 
-def iniciar_proceso(api_url, contrato_info):
+    dibujar()
+    actualizar_resumen()
+
+def mostrar_comparacion(resultados, reporte=None):
+    """
+    Muestra los totales de cada contrato lado a lado (partidas, cantidad e
+    importe) y permite abrir los resultados completos de cualquiera de ellos.
+    """
+    ventana = tk.Toplevel(bg="#f9f9f9")
+    ventana.title("Comparación de contratos")
+    ventana.geometry("560x260")
+
+    tabla = ttk.Treeview(ventana, columns=("Contrato", "Partidas", "Cantidad", "Importe"),
+                         show="headings", height=len(resultados))
+    for columna, ancho, alineacion in (("Contrato", 100, "w"), ("Partidas", 100, "e"),
+                                       ("Cantidad", 120, "e"), ("Importe", 180, "e")):
+        tabla.heading(columna, text=columna)
+        tabla.column(columna, width=ancho, anchor=alineacion)
+    for fila in comparar_contratos(resultados):
+        tabla.insert("", "end", values=(f"Contrato {fila['contrato']}", f"{fila['partidas']:,}",
+                                        f"{fila['cantidad']:,}", f"{fila['importe']:,.2f}"))
+    tabla.pack(fill="x", padx=15, pady=15)
+
+    btns = tk.Frame(ventana, bg="#f9f9f9")
+    btns.pack(pady=5)
+    for letra, partidas_detectadas in resultados.items():
+        # El diagnóstico es de la corrida completa; se muestra con cada contrato
+        tk.Button(btns, text=f"Ver resultados del Contrato {letra}",
+                  command=lambda p=partidas_detectadas: mostrar_resultados(p, reporte),
+                  state="normal" if partidas_detectadas else "disabled",
+                  font=("Segoe UI", 10), bg="#4a90e2", fg="white",
+                  relief="flat", padx=10, pady=4).pack(side="left", padx=10)
+
+def mostrar_historial():
+    """
+    Consulta el historial de validaciones: partidas por número, contrato,
+    rango de fechas, cantidad mínima, libro o dato del contrato (por
+    ejemplo, qué pozos cobraron una partida por encima de cierta cantidad
+    en el último trimestre).
+    """
+    try:
+        historial = Historial()
+        campos = historial.campos_info()
+    except (sqlite3.Error, OSError) as e:
+        messagebox.showerror("Error", f"No se pudo abrir el historial:\n{e}")
+        return
+
+    ventana = tk.Toplevel(bg="#f9f9f9")
+    ventana.title("Historial de Validaciones")
+    ventana.geometry("1000x600")
+    ventana.minsize(700, 400)
+    ventana.columnconfigure(0, weight=1)
+    ventana.rowconfigure(1, weight=1)
+
+    def cerrar():
+        historial.cerrar()
+        ventana.destroy()
+    ventana.protocol("WM_DELETE_WINDOW", cerrar)
+
+    filtros = tk.Frame(ventana, bg="#f9f9f9")
+    filtros.grid(row=0, column=0, sticky="ew", padx=10, pady=10)
+    entradas = {}
+    for i, (clave, texto) in enumerate((("partida", "Partida"), ("contrato", "Contrato"),
+                                        ("desde", "Desde (AAAA-MM-DD)"), ("hasta", "Hasta (AAAA-MM-DD)"),
+                                        ("cantidad_minima", "Cantidad mínima"), ("archivo", "Libro"),
+                                        ("campo", "Dato del contrato"), ("valor", "Valor"))):
+        tk.Label(filtros, text=texto, font=("Segoe UI", 9), bg="#f9f9f9").grid(
+            row=(i // 4) * 2, column=i % 4, sticky="w", padx=5)
+        if clave == "contrato":
+            entrada = ttk.Combobox(filtros, values=["", *URLS_CONTRATO], width=18)
+        elif clave == "campo":
+            entrada = ttk.Combobox(filtros, values=["", *campos], width=18)
+        else:
+            entrada = tk.Entry(filtros, width=20)
+        entrada.grid(row=(i // 4) * 2 + 1, column=i % 4, sticky="ew", padx=5, pady=(0, 5))
+        entradas[clave] = entrada
+
+    columnas = ("Fecha", "Contrato", "Libro", "Partida", "Descripción", "Cantidad",
+                "Precio Unitario", "Similitud", "Palabra Coincidente", "Datos del Contrato")
+    frame_tabla = tk.Frame(ventana, bg="#f9f9f9")
+    frame_tabla.grid(row=1, column=0, sticky="nsew", padx=10)
+    frame_tabla.columnconfigure(0, weight=1)
+    frame_tabla.rowconfigure(0, weight=1)
+    tree = ttk.Treeview(frame_tabla, columns=columnas, show="headings")
+    for col in columnas:
+        tree.heading(col, text=col)
+        tree.column(col, anchor="center", width=250 if col == "Datos del Contrato" else 100)
+    tree.grid(row=0, column=0, sticky="nsew")
+    scroll_v = ttk.Scrollbar(frame_tabla, orient="vertical", command=tree.yview)
+    scroll_v.grid(row=0, column=1, sticky="ns")
+    scroll_h = ttk.Scrollbar(frame_tabla, orient="horizontal", command=tree.xview)
+    scroll_h.grid(row=1, column=0, sticky="ew")
+    tree.configure(yscrollcommand=scroll_v.set, xscrollcommand=scroll_h.set)
+
+    label_resumen = tk.Label(ventana, text="", font=("Segoe UI", 9), bg="#f9f9f9", fg="#555", anchor="w")
+    label_resumen.grid(row=2, column=0, sticky="ew", padx=10, pady=5)
+
+    def buscar(event=None):
+        valores = {clave: entrada.get().strip() for clave, entrada in entradas.items()}
+        try:
+            for clave in ("desde", "hasta"):
+                if valores[clave]:
+                    time.strptime(valores[clave], "%Y-%m-%d")
+            cantidad = valores.pop("cantidad_minima")
+            valores["cantidad_minima"] = int(cantidad) if cantidad else None
+        except ValueError:
+            messagebox.showerror("Error", "Las fechas van como AAAA-MM-DD y la cantidad mínima "
+                                          "debe ser un número entero", parent=ventana)
+            return
+        inicio = time.perf_counter()
+        filas = historial.consultar(**{clave: valor for clave, valor in valores.items() if valor != ""})
+        transcurrido = time.perf_counter() - inicio
+        tree.delete(*tree.get_children())
+        for fila in filas:
+            tree.insert("", "end", values=tuple(fila[columna] for columna in COLUMNAS_HISTORIAL))
+        limite = "  (se muestran sólo las más recientes)" if len(filas) == MAXIMO_FILAS_HISTORIAL else ""
+        label_resumen.config(text=f"{len(filas):,} partidas en {transcurrido * 1000:,.0f} ms{limite}")
+
+    btn_buscar = tk.Button(filtros, text="Buscar", command=buscar, font=("Segoe UI", 10),
+                           bg="#4a90e2", fg="white", relief="flat", padx=10)
+    btn_buscar.grid(row=1, column=4, rowspan=3, padx=10)
+    ventana.bind("<Return>", buscar)
+    buscar()
+
+def registrar_en_historial(file_path, resultados, contratos, cola):
+    """
+    Guarda la validación en el historial. Si no se puede, sólo se avisa: los
+    resultados ya están listos.
+    """
+    try:
+        with Historial() as historial:
+            historial.registrar(file_path, resultados,
+                                {letra: info for letra, (_, info) in contratos.items()})
+    except (sqlite3.Error, OSError) as e:
+        cola.put(("aviso", f"No se pudo guardar en el historial: {e}"))
+
+def formatear_duracion(segundos):
+    minutos, segundos = divmod(int(segundos), 60)
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas}:{minutos:02d}:{segundos:02d}" if horas else f"{minutos:02d}:{segundos:02d}"
+
+def validar_con_servicio(url_servicio, contratos, file_path, cola, cancelar):
+    """
+    Envía el libro al servicio local de matching, que ya tiene los catálogos
+    compilados, y pone el resultado en 'cola' como validar_en_segundo_plano.
+    La solicitud corre en un hilo aparte para poder cancelar la espera.
+    """
+    cola.put(("estado", "Validando en el servicio local..."))
+    futuro = Future()
+
+    def enviar():
+        try:
+            futuro.set_result(validar_en_servicio(
+                url_servicio, file_path, {letra: info for letra, (_, info) in contratos.items()}))
+        except BaseException as e:
+            futuro.set_exception(e)
+    threading.Thread(target=enviar, name="servicio", daemon=True).start()
+
+    while not wait([futuro], timeout=0.2).done:
+        if cancelar.is_set():
+            raise ValidacionCancelada()
+    try:
+        resultados = futuro.result()
+    except requests.RequestException as e:
+        cola.put(("error", f"Error del servicio de validación:\n{e}"))
+        return
+    cola.put(("catalogo", f"Validado con el servicio {url_servicio}"))
+    registrar_en_historial(file_path, resultados, contratos, cola)
+    cola.put(("fin", resultados, None))
+
+def validar_en_segundo_plano(contratos, file_path, cola, cancelar, diagnostico=None, servicio=None):
+    """
+    Obtiene los catálogos, lee el archivo y aplica el matching fuera del hilo
+    de la interfaz. 'contratos' va de la letra de cada contrato a (URL de la
+    API, contrato_info); con varios, el libro se lee y se normaliza una sola
+    vez para todos. Todo lo que la ventana necesita saber se envía por 'cola'.
+
+    Los catálogos normalmente ya están compilados por la precarga; si todavía
+    se están descargando, se espera a que terminen. Con 'diagnostico', el
+    reporte de la corrida se envía junto con los resultados. Con 'servicio'
+    (su URL) el matching lo hace el servicio local y no hay diagnóstico.
+    """
+    try:
+        if servicio is not None:
+            validar_con_servicio(servicio, contratos, file_path, cola, cancelar)
+            return
+        futuros = {letra: catalogos.obtener(api_url) for letra, (api_url, _) in contratos.items()}
+        if not all(futuro.done() for futuro in futuros.values()):
+            cola.put(("estado", "Obteniendo catálogo de la API..."))
+        inicio = time.perf_counter()
+        while wait(list(futuros.values()), timeout=0.2).not_done:
+            if cancelar.is_set():
+                raise ValidacionCancelada()
+        if diagnostico is not None:
+            diagnostico.sumar("catalogo", time.perf_counter() - inicio)
+        precargas = {}
+        for letra, futuro in futuros.items():
+            try:
+                precargas[letra] = futuro.result()
+            except (requests.RequestException, ValueError):
+                cola.put(("error", "Error al obtener los datos de la API"))
+                return
+        estados = [describir_estado_catalogo(precarga["estado"]) for precarga in precargas.values()]
+        if len(contratos) > 1:
+            estados = [f"Contrato {letra}: {estado}" for letra, estado in zip(precargas, estados)]
+        cola.put(("catalogo", "  ·  ".join(estados)))
+        if cancelar.is_set():
+            raise ValidacionCancelada()
+
+        # El archivo se lee en streaming al agrupar los comentarios: mientras
+        # tanto sólo se informan las filas leídas (el total aún no se sabe) y
+        # se puede cancelar. Los comentarios que no cambiaron desde la última
+        # validación del libro no se vuelven a analizar.
+        cola.put(("estado", "Leyendo archivo de Excel..."))
+        caches = {letra: CacheResultados(file_path, precargas[letra]["catalogo"], contrato=api_url)
+                  for letra, (api_url, _) in contratos.items()}
+        resultados = analizar_archivo_contratos(
+            file_path,
+            {letra: (precargas[letra]["catalogo"], contrato_info)
+             for letra, (_, contrato_info) in contratos.items()},
+            trabajadores=TRABAJADORES,
+            progreso=lambda filas, total: cola.put(("progreso", filas, total)),
+            progreso_lectura=lambda filas: cola.put(("lectura", filas)),
+            cancelar=cancelar, caches=caches, diagnostico=diagnostico, trazar_filas=True
+        )
+        cola.put(("incremental", min(cache.reutilizados for cache in caches.values()),
+                  max(cache.analizados for cache in caches.values())))
+        reporte = diagnostico.terminar().reporte() if diagnostico is not None else None
+        registrar_en_historial(file_path, resultados, contratos, cola)
+        cola.put(("fin", resultados, reporte))
+    except ValidacionCancelada:
+        cola.put(("cancelado",))
+    except Exception as e:
+        # Cualquier otro fallo debe llegar a la ventana, que si no se queda esperando
+        cola.put(("error", f"No se pudo completar la validación:\n{e}"))
+
+def iniciar_proceso(contratos):
     """
     Realiza la validación de partidas solicitando un archivo Excel, 
     obteniendo los datos de la API, y aplicando el proceso de matching.
+
+    El trabajo pesado corre en un hilo aparte; una ventana muestra el avance
+    (filas, filas/s y tiempo restante) y permite cancelarlo. Los resultados
+    se muestran sólo cuando la validación termina.
     
-    Se recibe además un diccionario 'contrato_info' con la información
-    adicional proporcionada para el contrato, la cual se guardará en cada registro.
+    'contratos' va de la letra de cada contrato a (URL de la API,
+    contrato_info), el diccionario con la información adicional del contrato
+    que se guardará en cada registro. Con varios contratos se muestra además
+    la comparación de sus totales.
     """
-    response = requests.get(api_url)
-    if response.status_code != 200:
-        messagebox.showerror("Error", "Error al obtener los datos de la API")
-        return
-
     file_path = filedialog.askopenfilename(
         title="Seleccionar archivo de Excel", 
         filetypes=[("Excel files", "*.xlsx")]
@@ -280,172 +694,115 @@ def iniciar_proceso(api_url, contrato_info):
         messagebox.showerror("Error", "No se seleccionó ningún archivo")
         return
 
-    df_excel = pd.read_excel(file_path)
-    df_excel.rename(columns={
-        "Palabra Relacionada": "palabra",
-        "Partida": "partida",
-        "Descripción": "descripcion",
-        "Unidad de Medida": "unidad_medida",
-        "Precio Unitario (USD)": "precio_unitario",
-        "Etapa": "etapa",
-        "Comments": "comments"
-    }, inplace=True)
-
-    api_data = response.json()
-    # Normalizamos las palabras de la API usando la función normalizar_texto
-    for item in api_data:
-        item["palabras_limpias"] = {
-            normalizar_texto(p.strip()) 
-            for p in item.get("palabra", "").lower().split(",") if p.strip()
-        }
-
-    partidas_detectadas = {}
-
-    # Procesamos cada fila del Excel
-    for _, row in df_excel.iterrows():
-      comment = normalizar_texto(row.get("comments", ""))
-    for item in api_data:
-        for palabra in item["palabras_limpias"]:
-            palabra_encontrada = ''
-            match = re.search(rf'\b{re.escape(palabra)}\b', comment)
-            if match:
-                similitud = 100
-                palabra_encontrada = match.group()
-            else:
-                similitud = mejor_fuzzy_score(palabra, comment)
-                if similitud < 60:
-                    continue
-
-                palabras_en_comentario = comment.split()
-                palabras_validas = [w for w in palabras_en_comentario if len(w) >= 3]
-                candidatas = [w for w in palabras_validas if palabra in w]
-
-                if candidatas:
-                    mejor_match = max(candidatas, key=lambda w: mejor_fuzzy_score(palabra, w))
-                elif palabras_validas:
-                    mejor_match = max(palabras_validas, key=lambda w: mejor_fuzzy_score(palabra, w))
-                else:
-                    mejor_match = max(palabras_en_comentario, key=lambda w: mejor_fuzzy_score(palabra, w))
-                palabra_encontrada = mejor_match
-
-            # Guardar o actualizar partidas_detectadas
-            partida = item["partida"]
-            if partida not in partidas_detectadas:
-                partidas_detectadas[partida] = {
-                    "descripcion": item["descripcion"],
-                    "unidad_medida": item["unidadMedida"],
-                    "precio_unitario": item["precioUnitario"],
-                    "cantidad": 1,
-                    "similitud": similitud,
-                    "palabra_coincidente": palabra_encontrada,
-                    "texto_evaluado": comment,
-                    "contrato_info": str(contrato_info)
-                }
-            else:
-                partidas_detectadas[partida]["cantidad"] += 1
-                if similitud > partidas_detectadas[partida]["similitud"]:
-                    partidas_detectadas[partida]["similitud"] = similitud
-                    partidas_detectadas[partida]["palabra_coincidente"] = palabra_encontrada
-                    partidas_detectadas[partida]["texto_evaluado"] = comment
-
-    for item in api_data:
-        for palabra in item["palabras_limpias"]:
-            palabra_encontrada = ''
-            # Buscar coincidencia exacta en el comentario
-            match = re.search(rf'\b{re.escape(palabra)}\b', comment)
-            if match:
-                similitud = 100
-                palabra_encontrada = match.group()  # palabra realmente detectada
+    cola = queue.Queue()
+    cancelar = threading.Event()
+    inicio_analisis = None
+    diagnostico = Diagnostico() if registrar_diagnostico.get() else None
+    servicio = URL_SERVICIO if usar_servicio.get() else None
+
+    ventana_progreso = tk.Toplevel(bg="#f9f9f9")
+    ventana_progreso.title("Validando partidas")
+    ventana_progreso.geometry("440x195")
+    ventana_progreso.resizable(False, False)
+    ventana_progreso.grab_set()  # Evita lanzar otra validación mientras tanto
+
+    label_estado = tk.Label(ventana_progreso, text="Iniciando...", font=("Segoe UI", 10),
+                            bg="#f9f9f9", anchor="w")
+    label_estado.pack(fill="x", padx=15, pady=(15, 5))
+
+    barra = ttk.Progressbar(ventana_progreso, mode="indeterminate")
+    barra.pack(fill="x", padx=15, pady=5)
+    barra.start(10)
+
+    label_avance = tk.Label(ventana_progreso, text="", font=("Segoe UI", 9),
+                            bg="#f9f9f9", fg="#555", anchor="w")
+    label_avance.pack(fill="x", padx=15)
+
+    label_catalogo = tk.Label(ventana_progreso, text="", font=("Segoe UI", 9),
+                              bg="#f9f9f9", fg="#555", anchor="w")
+    label_catalogo.pack(fill="x", padx=15)
+
+    def cancelar_validacion():
+        cancelar.set()
+        btn_cancelar.config(state="disabled")
+        label_estado.config(text="Cancelando...")
+
+    btn_cancelar = tk.Button(ventana_progreso, text="Cancelar", command=cancelar_validacion,
+                             font=("Segoe UI", 10), bg="#d9534f", fg="white",
+                             relief="flat", padx=10, pady=4)
+    btn_cancelar.pack(pady=10)
+    ventana_progreso.protocol("WM_DELETE_WINDOW", cancelar_validacion)
+
+    def revisar_cola():
+        nonlocal inicio_analisis
+        while True:
+            try:
+                mensaje = cola.get_nowait()
+            except queue.Empty:
+                break
+            tipo = mensaje[0]
+            if tipo == "estado":
+                if not cancelar.is_set():
+                    label_estado.config(text=mensaje[1])
+            elif tipo == "catalogo":
+                label_catalogo.config(text=mensaje[1])
+                barra_estado.config(text=f"{mensaje[1]}  ·  {time.strftime('%H:%M')}")
+            elif tipo == "incremental":
+                reutilizados, analizados = mensaje[1], mensaje[2]
+                if reutilizados:
+                    barra_estado.config(text=f"{barra_estado.cget('text')}  ·  {reutilizados:,} comentarios "
+                                             f"de la validación anterior, {analizados:,} analizados")
+            elif tipo == "lectura":
+                # Aún no se sabe cuántas filas tiene el archivo
+                if inicio_analisis is None:
+                    label_avance.config(text=f"{mensaje[1]:,} filas leídas")
+            elif tipo == "aviso":
+                barra_estado.config(text=f"{barra_estado.cget('text')}  ·  {mensaje[1]}")
+            elif tipo == "progreso":
+                filas, total = mensaje[1], mensaje[2]
+                if inicio_analisis is None:
+                    inicio_analisis = time.perf_counter()
+                    barra.stop()
+                    barra.config(mode="determinate", maximum=max(total, 1))
+                    if not cancelar.is_set():
+                        label_estado.config(text="Analizando comentarios...")
+                barra.config(value=filas)
+                transcurrido = time.perf_counter() - inicio_analisis
+                velocidad = filas / transcurrido if transcurrido > 0 else 0
+                restante = (total - filas) / velocidad if velocidad else 0
+                label_avance.config(text=f"{filas:,} de {total:,} filas  ·  {velocidad:,.0f} filas/s  ·  "
+                                         f"restante {formatear_duracion(restante)}")
             else:
-                similitud = mejor_fuzzy_score(palabra, comment)
-                if similitud >= 60:
-                    palabras_en_comentario = comment.split()
-                    # Mejor palabra detectada según fuzzy matching
-                    mejor_match = max(
-                        palabras_en_comentario,
-                        key=lambda w: mejor_fuzzy_score(palabra, w)
-                    )
-                    palabra_encontrada = mejor_match
-                else:
-                    continue
-
-            if similitud >= 60:
-                partida = item["partida"]
-                if partida not in partidas_detectadas:
-                    partidas_detectadas[partida] = {
-                        "descripcion": item["descripcion"],
-                        "unidad_medida": item["unidadMedida"],
-                        "precio_unitario": item["precioUnitario"],
-                        "cantidad": 1,
-                        "similitud": similitud,
-                        "palabra_coincidente": palabra_encontrada,  # palabra detectada guardada
-                        "texto_evaluado": comment,
-                        "contrato_info": str(contrato_info)
-                    }
-                else:
-                    partidas_detectadas[partida]["cantidad"] += 1
-                    # Actualizar sólo si similitud mejora
-                    if similitud > partidas_detectadas[partida]["similitud"]:
-                        partidas_detectadas[partida]["similitud"] = similitud
-                        partidas_detectadas[partida]["palabra_coincidente"] = palabra_encontrada
-                        partidas_detectadas[partida]["texto_evaluado"] = comment
-        comment = normalizar_texto(row.get("comments", ""))
-      
-      
-        for item in api_data:
-            for palabra in item["palabras_limpias"]:
-                palabra_encontrada = ''
-                # Se busca coincidencia exacta con límite de palabra
-                match = re.search(rf'\b{re.escape(palabra)}\b', comment)
-                if match:
-                    similitud = 100
-                    palabra_encontrada = match.group()
-                else:
-                    similitud = mejor_fuzzy_score(palabra, comment)
-                    if similitud >= 60:
-                        # Seleccionamos la palabra en el comentario con mayor similitud
-                        palabras_en_comentario = comment.split()
-                        mejor_match = max(palabras_en_comentario, 
-                                          key=lambda w: mejor_fuzzy_score(palabra, w))
-                        palabra_encontrada = mejor_match
-                    else:
-                        continue  # No cumple el umbral
-
-                if similitud >= 60:
-                    partida = item["partida"]
-                    if partida not in partidas_detectadas:
-                        partidas_detectadas[partida] = {
-                            "descripcion": item["descripcion"],
-                            "unidad_medida": item["unidadMedida"],
-                            "precio_unitario": item["precioUnitario"],
-                            "cantidad": 1,
-                            "similitud": similitud,
-                            "palabra_coincidente": palabra_encontrada,
-                            "texto_evaluado": comment,
-                            "contrato_info": str(contrato_info)  # Se guarda esta info si la necesitas para otro fin
-                        }
+                ventana_progreso.grab_release()
+                ventana_progreso.destroy()
+                if tipo == "fin":
+                    resultados, reporte = mensaje[1], mensaje[2]
+                    if len(resultados) > 1:
+                        mostrar_comparacion(resultados, reporte)
+                    elif any(resultados.values()):
+                        mostrar_resultados(next(iter(resultados.values())), reporte)
                     else:
-                        partidas_detectadas[partida]["cantidad"] += 1
-                        if similitud > partidas_detectadas[partida]["similitud"]:
-                            partidas_detectadas[partida]["similitud"] = similitud
-                            partidas_detectadas[partida]["palabra_coincidente"] = palabra_encontrada
-                            partidas_detectadas[partida]["texto_evaluado"] = comment
-
-    if partidas_detectadas:
-        mostrar_resultados(partidas_detectadas)
-    else:
-        messagebox.showinfo("Validación Completada", "No se encontraron coincidencias en los comentarios.")
+                        messagebox.showinfo("Validación Completada",
+                                            "No se encontraron coincidencias en los comentarios.")
+                elif tipo == "error":
+                    messagebox.showerror("Error", mensaje[1])
+                return
+        ventana_progreso.after(100, revisar_cola)
+
+    threading.Thread(target=validar_en_segundo_plano,
+                     args=(contratos, file_path, cola, cancelar, diagnostico, servicio),
+                     daemon=True).start()
+    ventana_progreso.after(100, revisar_cola)
 
 # =============================================================================
 # INTERFAZ GRÁFICA: INFORMACIÓN ADICIONAL POR CONTRATO
 # =============================================================================
 
-def iniciar_analisis_contratoA():
+def info_contratoA():
     """
-    Captura la información ingresada en el formulario de Contrato A, 
-    y luego invoca el proceso de validación utilizando la URL correspondiente.
+    Devuelve la información ingresada en el formulario de Contrato A.
     """
-    info = {
+    return {
         "Agujero": entryA_agujero.get(),
         "Diámetro Barrena": entryA_diam_barrena.get(),
         "Temperatura Fondo": entryA_temp_fondo.get(),
@@ -462,16 +819,20 @@ def iniciar_analisis_contratoA():
         "Centrífuga Decantadora": entryA_centrifuga.get(),
         "Recolección y Transporte de Recortes": entryA_recortes.get()
     }
-    # URL para Contrato A (puedes cambiarla según corresponda)
-    api_url = "https://python.apiigrtec.site/api/PalabrasRelacionadas"
-    iniciar_proceso(api_url, info)
 
-def iniciar_analisis_contratoB():
+def iniciar_analisis_contratoA():
     """
-    Captura la información ingresada en el formulario de Contrato B, 
+    Captura la información ingresada en el formulario de Contrato A, 
     y luego invoca el proceso de validación utilizando la URL correspondiente.
     """
-    info = {
+    # URL para Contrato A (puedes cambiarla en URLS_CONTRATO)
+    iniciar_proceso({"A": (URLS_CONTRATO["A"], info_contratoA())})
+
+def info_contratoB():
+    """
+    Devuelve la información ingresada en el formulario de Contrato B.
+    """
+    return {
         "Agujero": entryB_agujero.get(),
         "Diámetro Barrena": entryB_diam_barrena.get(),
         "Temperatura Fondo": entryB_temp_fondo.get(),
@@ -488,249 +849,313 @@ def iniciar_analisis_contratoB():
         "Centrífuga Decantadora": entryB_centrifuga.get(),
         "Recolección y Transporte de Recortes": entryB_recortes.get()
     }
-    # URL para Contrato B (puedes cambiarla según corresponda)
-    api_url = "https://python.apiigrtec.site/api/PalabrasRelacionadas/GetPalabrasRelacionadas1"
-    iniciar_proceso(api_url, info)
+
+def iniciar_analisis_contratoB():
+    """
+    Captura la información ingresada en el formulario de Contrato B, 
+    y luego invoca el proceso de validación utilizando la URL correspondiente.
+    """
+    # URL para Contrato B (puedes cambiarla en URLS_CONTRATO)
+    iniciar_proceso({"B": (URLS_CONTRATO["B"], info_contratoB())})
+
+def iniciar_analisis_ambos_contratos():
+    """
+    Valida el mismo archivo contra los catálogos de ambos contratos, cada uno
+    con la información de su formulario, leyendo el archivo una sola vez.
+    """
+    iniciar_proceso({
+        "A": (URLS_CONTRATO["A"], info_contratoA()),
+        "B": (URLS_CONTRATO["B"], info_contratoB()),
+    })
 # =============================================================================
 # VENTANA PRINCIPAL Y NOTEBOOK
 # =============================================================================
 
-root = tk.Tk()
-root.title("Validador de Partidas y Datos de Contrato")
-root.geometry("900x700")
-root.minsize(700, 500)
-root.configure(bg="#f4f6f8")
-
-# Configurar la grilla para que el frame principal se expanda
-root.columnconfigure(0, weight=1)
-root.rowconfigure(0, weight=1)
-
-# Frame principal que contendrá el canvas y scrollbars
-main_frame = tk.Frame(root)
-main_frame.grid(row=0, column=0, sticky="nsew")
-main_frame.columnconfigure(0, weight=1)
-main_frame.rowconfigure(0, weight=1)
-
-# Canvas para scroll
-canvas_root = tk.Canvas(main_frame, bg="#f4f6f8", highlightthickness=0)
-canvas_root.grid(row=0, column=0, sticky="nsew")
-
-# Barras de scroll vertical y horizontal
-scrollbar_root_v = ttk.Scrollbar(main_frame, orient="vertical", command=canvas_root.yview)
-scrollbar_root_v.grid(row=0, column=1, sticky="ns")
-
-scrollbar_root_h = ttk.Scrollbar(main_frame, orient="horizontal", command=canvas_root.xview)
-scrollbar_root_h.grid(row=1, column=0, sticky="ew")
-
-canvas_root.configure(yscrollcommand=scrollbar_root_v.set, xscrollcommand=scrollbar_root_h.set)
-
-# Frame interior donde irá el notebook
-frame_interior_root = tk.Frame(canvas_root, bg="#f4f6f8")
-canvas_root.create_window((0, 0), window=frame_interior_root, anchor="nw")
-
-def on_frame_configure_root(event):
-    canvas_root.configure(scrollregion=canvas_root.bbox("all"))
-frame_interior_root.bind("<Configure>", on_frame_configure_root)
-
-# Ahora creamos el notebook como hijo del frame interior (scrollable)
-notebook = ttk.Notebook(frame_interior_root)
-notebook.pack(expand=True, fill="both", padx=10, pady=10)
-
-# ----- Pestaña Contrato A -----
-pestaña_A = ttk.Frame(notebook)
-notebook.add(pestaña_A, text="Contrato A")
-
-# Información General para Contrato A
-frame_infoA = ttk.LabelFrame(pestaña_A, text="Información General")
-frame_infoA.pack(fill="both", expand=True, padx=5, pady=5)
-frame_infoA.columnconfigure(1, weight=1)
-
-tk.Label(frame_infoA, text="Agujero:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryA_agujero = tk.Entry(frame_infoA)
-entryA_agujero.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_infoA, text="Diámetro de Barrena:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-entryA_diam_barrena = tk.Entry(frame_infoA)
-entryA_diam_barrena.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_infoA, text="Temperatura de Fondo:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
-entryA_temp_fondo = tk.Entry(frame_infoA)
-entryA_temp_fondo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-
-# LODO para Contrato A
-frame_lodoA = ttk.LabelFrame(pestaña_A, text="Lodo")
-frame_lodoA.pack(fill="both", expand=True, padx=5, pady=5)
-frame_lodoA.columnconfigure(1, weight=1)
-
-tk.Label(frame_lodoA, text="Tipo de Lodo:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryA_tipo_lodo = tk.Entry(frame_lodoA)
-entryA_tipo_lodo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_lodoA, text="Densidad de Lodo:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-entryA_dens_lodo = tk.Entry(frame_lodoA)
-entryA_dens_lodo.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_lodoA, text="Aditivos:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
-entryA_aditivos_lodo = tk.Entry(frame_lodoA)
-entryA_aditivos_lodo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-
-# CEMENTO para Contrato A
-frame_cemA = ttk.LabelFrame(pestaña_A, text="Cemento")
-frame_cemA.pack(fill="both", expand=True, padx=5, pady=5)
-frame_cemA.columnconfigure(1, weight=1)
-
-tk.Label(frame_cemA, text="Densidad Lechada de Amarre:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryA_dens_amarre = tk.Entry(frame_cemA)
-entryA_dens_amarre.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_cemA, text="Densidad Lechada de Línea:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-entryA_dens_linea = tk.Entry(frame_cemA)
-entryA_dens_linea.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_cemA, text="Aditivos:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
-entryA_aditivos_cem = tk.Entry(frame_cemA)
-entryA_aditivos_cem.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-
-# TR para Contrato A
-frame_trA = ttk.LabelFrame(pestaña_A, text="TR")
-frame_trA.pack(fill="both", expand=True, padx=5, pady=5)
-frame_trA.columnconfigure(1, weight=1)
-
-tk.Label(frame_trA, text="Diámetro TR (ej. 20, 13 3/8, 9 5/8, etc.):").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryA_diam_tr = tk.Entry(frame_trA)
-entryA_diam_tr.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-# Equipo de Control de Sólidos para Contrato A
-frame_solidosA = ttk.LabelFrame(pestaña_A, text="Equipo de Control de Sólidos")
-frame_solidosA.pack(fill="both", expand=True, padx=5, pady=5)
-frame_solidosA.columnconfigure(1, weight=1)
-
-tk.Label(frame_solidosA, text="Tornillo:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryA_tornillo = tk.Entry(frame_solidosA)
-entryA_tornillo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_solidosA, text="Temblorina:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-entryA_temblorina = tk.Entry(frame_solidosA)
-entryA_temblorina.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_solidosA, text="Limpia Lodo:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
-entryA_limpia_lodo = tk.Entry(frame_solidosA)
-entryA_limpia_lodo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_solidosA, text="Centrífuga Decantadora:").grid(row=3, column=0, padx=5, pady=5, sticky="e")
-entryA_centrifuga = tk.Entry(frame_solidosA)
-entryA_centrifuga.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
-
-# Servicios Adicionales para Contrato A
-frame_serviciosA = ttk.LabelFrame(pestaña_A, text="Servicios Adicionales")
-frame_serviciosA.pack(fill="both", expand=True, padx=5, pady=5)
-frame_serviciosA.columnconfigure(1, weight=1)
-
-tk.Label(frame_serviciosA, text="Recolección y Transporte de Recortes:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryA_recortes = tk.Entry(frame_serviciosA)
-entryA_recortes.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-btn_iniciarA = tk.Button(pestaña_A, text="Cargar Archivo y Analizar (Contrato A)", 
-                         bg="#4a90e2", fg="white", command=iniciar_analisis_contratoA)
-btn_iniciarA.pack(pady=10)
-
-# ----- Pestaña Contrato B -----
-pestaña_B = ttk.Frame(notebook)
-notebook.add(pestaña_B, text="Contrato B")
-
-# Información General para Contrato B
-frame_infoB = ttk.LabelFrame(pestaña_B, text="Información General")
-frame_infoB.pack(fill="both", expand=True, padx=5, pady=5)
-frame_infoB.columnconfigure(1, weight=1)
-
-tk.Label(frame_infoB, text="Agujero:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryB_agujero = tk.Entry(frame_infoB)
-entryB_agujero.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_infoB, text="Diámetro de Barrena:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-entryB_diam_barrena = tk.Entry(frame_infoB)
-entryB_diam_barrena.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_infoB, text="Temperatura de Fondo:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
-entryB_temp_fondo = tk.Entry(frame_infoB)
-entryB_temp_fondo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-
-# LODO para Contrato B
-frame_lodoB = ttk.LabelFrame(pestaña_B, text="Lodo")
-frame_lodoB.pack(fill="both", expand=True, padx=5, pady=5)
-frame_lodoB.columnconfigure(1, weight=1)
-
-tk.Label(frame_lodoB, text="Tipo de Lodo:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryB_tipo_lodo = tk.Entry(frame_lodoB)
-entryB_tipo_lodo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_lodoB, text="Densidad de Lodo:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-entryB_dens_lodo = tk.Entry(frame_lodoB)
-entryB_dens_lodo.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_lodoB, text="Aditivos:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
-entryB_aditivos_lodo = tk.Entry(frame_lodoB)
-entryB_aditivos_lodo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-
-# CEMENTO para Contrato B
-frame_cemB = ttk.LabelFrame(pestaña_B, text="Cemento")
-frame_cemB.pack(fill="both", expand=True, padx=5, pady=5)
-frame_cemB.columnconfigure(1, weight=1)
-
-tk.Label(frame_cemB, text="Densidad Lechada de Amarre:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryB_dens_amarre = tk.Entry(frame_cemB)
-entryB_dens_amarre.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_cemB, text="Densidad Lechada de Línea:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-entryB_dens_linea = tk.Entry(frame_cemB)
-entryB_dens_linea.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_cemB, text="Aditivos:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
-entryB_aditivos_cem = tk.Entry(frame_cemB)
-entryB_aditivos_cem.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-
-# TR para Contrato B
-frame_trB = ttk.LabelFrame(pestaña_B, text="TR")
-frame_trB.pack(fill="both", expand=True, padx=5, pady=5)
-frame_trB.columnconfigure(1, weight=1)
-
-tk.Label(frame_trB, text="Diámetro TR (ej. 20, 13 3/8, 9 5/8, etc.):").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryB_diam_tr = tk.Entry(frame_trB)
-entryB_diam_tr.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-# Equipo de Control de Sólidos para Contrato B
-frame_solidosB = ttk.LabelFrame(pestaña_B, text="Equipo de Control de Sólidos")
-frame_solidosB.pack(fill="both", expand=True, padx=5, pady=5)
-frame_solidosB.columnconfigure(1, weight=1)
-
-tk.Label(frame_solidosB, text="Tornillo:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryB_tornillo = tk.Entry(frame_solidosB)
-entryB_tornillo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_solidosB, text="Temblorina:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
-entryB_temblorina = tk.Entry(frame_solidosB)
-entryB_temblorina.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_solidosB, text="Limpia Lodo:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
-entryB_limpia_lodo = tk.Entry(frame_solidosB)
-entryB_limpia_lodo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-
-tk.Label(frame_solidosB, text="Centrífuga Decantadora:").grid(row=3, column=0, padx=5, pady=5, sticky="e")
-entryB_centrifuga = tk.Entry(frame_solidosB)
-entryB_centrifuga.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
-
-# Servicios Adicionales para Contrato B
-frame_serviciosB = ttk.LabelFrame(pestaña_B, text="Servicios Adicionales")
-frame_serviciosB.pack(fill="both", expand=True, padx=5, pady=5)
-frame_serviciosB.columnconfigure(1, weight=1)
-
-tk.Label(frame_serviciosB, text="Recolección y Transporte de Recortes:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-entryB_recortes = tk.Entry(frame_serviciosB)
-entryB_recortes.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-btn_iniciarB = tk.Button(pestaña_B, text="Cargar Archivo y Analizar (Contrato B)", 
-                         bg="#4a90e2", fg="white", command=iniciar_analisis_contratoB)
-btn_iniciarB.pack(pady=10)
-
-root.mainloop()
-
+if __name__ == "__main__":
+    # Necesario para que los procesos del matching arranquen en el ejecutable
+    multiprocessing.freeze_support()
+
+    root = tk.Tk()
+    root.title("Validador de Partidas y Datos de Contrato")
+    root.geometry("900x700")
+    root.minsize(700, 500)
+    root.configure(bg="#f4f6f8")
+
+    # Configurar la grilla para que el frame principal se expanda
+    root.columnconfigure(0, weight=1)
+    root.rowconfigure(0, weight=1)
+
+    # Barra de estado: de dónde salió el catálogo de la última validación, y
+    # la opción de registrar el diagnóstico de rendimiento de cada validación
+    frame_estado = tk.Frame(root, bg="#e9ecef")
+    frame_estado.grid(row=1, column=0, sticky="ew")
+    frame_estado.columnconfigure(0, weight=1)
+    barra_estado = tk.Label(frame_estado, text="Precargando catálogos...", font=("Segoe UI", 9),
+                            bg="#e9ecef", fg="#555", anchor="w", padx=10)
+    barra_estado.grid(row=0, column=0, sticky="ew")
+    registrar_diagnostico = tk.BooleanVar(value=False)
+    tk.Checkbutton(frame_estado, text="Registrar diagnóstico", variable=registrar_diagnostico,
+                   font=("Segoe UI", 9), bg="#e9ecef", fg="#555",
+                   activebackground="#e9ecef").grid(row=0, column=1, padx=10)
+    # Con ANALIZADOR_SERVICIO definida se puede validar con el servicio local
+    usar_servicio = tk.BooleanVar(value=bool(URL_SERVICIO))
+    if URL_SERVICIO:
+        tk.Checkbutton(frame_estado, text="Usar servicio local", variable=usar_servicio,
+                       font=("Segoe UI", 9), bg="#e9ecef", fg="#555",
+                       activebackground="#e9ecef").grid(row=0, column=2, padx=10)
+
+    # Los catálogos de ambos contratos se descargan y compilan mientras el
+    # usuario llena el formulario
+    catalogos = CatalogosPrecargados()
+    precargas = {letra: catalogos.obtener(url) for letra, url in URLS_CONTRATO.items()}
+
+    def revisar_precarga():
+        if not all(futuro.done() for futuro in precargas.values()):
+            root.after(200, revisar_precarga)
+            return
+        partes = []
+        for letra, futuro in precargas.items():
+            if futuro.exception() is None:
+                partes.append(f"Contrato {letra}: {describir_estado_catalogo(futuro.result()['estado'])}")
+            else:
+                partes.append(f"Contrato {letra}: no se pudo precargar el catálogo")
+        barra_estado.config(text="  ·  ".join(partes))
+    root.after(200, revisar_precarga)
+
+    # Frame principal que contendrá el canvas y scrollbars
+    main_frame = tk.Frame(root)
+    main_frame.grid(row=0, column=0, sticky="nsew")
+    main_frame.columnconfigure(0, weight=1)
+    main_frame.rowconfigure(0, weight=1)
+
+    # Canvas para scroll
+    canvas_root = tk.Canvas(main_frame, bg="#f4f6f8", highlightthickness=0)
+    canvas_root.grid(row=0, column=0, sticky="nsew")
+
+    # Barras de scroll vertical y horizontal
+    scrollbar_root_v = ttk.Scrollbar(main_frame, orient="vertical", command=canvas_root.yview)
+    scrollbar_root_v.grid(row=0, column=1, sticky="ns")
+
+    scrollbar_root_h = ttk.Scrollbar(main_frame, orient="horizontal", command=canvas_root.xview)
+    scrollbar_root_h.grid(row=1, column=0, sticky="ew")
+
+    canvas_root.configure(yscrollcommand=scrollbar_root_v.set, xscrollcommand=scrollbar_root_h.set)
+
+    # Frame interior donde irá el notebook
+    frame_interior_root = tk.Frame(canvas_root, bg="#f4f6f8")
+    canvas_root.create_window((0, 0), window=frame_interior_root, anchor="nw")
+
+    def on_frame_configure_root(event):
+        canvas_root.configure(scrollregion=canvas_root.bbox("all"))
+    frame_interior_root.bind("<Configure>", on_frame_configure_root)
+
+    # Ahora creamos el notebook como hijo del frame interior (scrollable)
+    notebook = ttk.Notebook(frame_interior_root)
+    notebook.pack(expand=True, fill="both", padx=10, pady=10)
+
+    # ----- Pestaña Contrato A -----
+    pestaña_A = ttk.Frame(notebook)
+    notebook.add(pestaña_A, text="Contrato A")
+
+    # Información General para Contrato A
+    frame_infoA = ttk.LabelFrame(pestaña_A, text="Información General")
+    frame_infoA.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_infoA.columnconfigure(1, weight=1)
+
+    tk.Label(frame_infoA, text="Agujero:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryA_agujero = tk.Entry(frame_infoA)
+    entryA_agujero.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_infoA, text="Diámetro de Barrena:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+    entryA_diam_barrena = tk.Entry(frame_infoA)
+    entryA_diam_barrena.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_infoA, text="Temperatura de Fondo:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+    entryA_temp_fondo = tk.Entry(frame_infoA)
+    entryA_temp_fondo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+
+    # LODO para Contrato A
+    frame_lodoA = ttk.LabelFrame(pestaña_A, text="Lodo")
+    frame_lodoA.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_lodoA.columnconfigure(1, weight=1)
+
+    tk.Label(frame_lodoA, text="Tipo de Lodo:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryA_tipo_lodo = tk.Entry(frame_lodoA)
+    entryA_tipo_lodo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_lodoA, text="Densidad de Lodo:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+    entryA_dens_lodo = tk.Entry(frame_lodoA)
+    entryA_dens_lodo.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_lodoA, text="Aditivos:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+    entryA_aditivos_lodo = tk.Entry(frame_lodoA)
+    entryA_aditivos_lodo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+
+    # CEMENTO para Contrato A
+    frame_cemA = ttk.LabelFrame(pestaña_A, text="Cemento")
+    frame_cemA.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_cemA.columnconfigure(1, weight=1)
+
+    tk.Label(frame_cemA, text="Densidad Lechada de Amarre:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryA_dens_amarre = tk.Entry(frame_cemA)
+    entryA_dens_amarre.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_cemA, text="Densidad Lechada de Línea:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+    entryA_dens_linea = tk.Entry(frame_cemA)
+    entryA_dens_linea.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_cemA, text="Aditivos:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+    entryA_aditivos_cem = tk.Entry(frame_cemA)
+    entryA_aditivos_cem.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+
+    # TR para Contrato A
+    frame_trA = ttk.LabelFrame(pestaña_A, text="TR")
+    frame_trA.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_trA.columnconfigure(1, weight=1)
+
+    tk.Label(frame_trA, text="Diámetro TR (ej. 20, 13 3/8, 9 5/8, etc.):").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryA_diam_tr = tk.Entry(frame_trA)
+    entryA_diam_tr.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    # Equipo de Control de Sólidos para Contrato A
+    frame_solidosA = ttk.LabelFrame(pestaña_A, text="Equipo de Control de Sólidos")
+    frame_solidosA.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_solidosA.columnconfigure(1, weight=1)
+
+    tk.Label(frame_solidosA, text="Tornillo:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryA_tornillo = tk.Entry(frame_solidosA)
+    entryA_tornillo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_solidosA, text="Temblorina:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+    entryA_temblorina = tk.Entry(frame_solidosA)
+    entryA_temblorina.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_solidosA, text="Limpia Lodo:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+    entryA_limpia_lodo = tk.Entry(frame_solidosA)
+    entryA_limpia_lodo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_solidosA, text="Centrífuga Decantadora:").grid(row=3, column=0, padx=5, pady=5, sticky="e")
+    entryA_centrifuga = tk.Entry(frame_solidosA)
+    entryA_centrifuga.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
+
+    # Servicios Adicionales para Contrato A
+    frame_serviciosA = ttk.LabelFrame(pestaña_A, text="Servicios Adicionales")
+    frame_serviciosA.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_serviciosA.columnconfigure(1, weight=1)
+
+    tk.Label(frame_serviciosA, text="Recolección y Transporte de Recortes:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryA_recortes = tk.Entry(frame_serviciosA)
+    entryA_recortes.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    btn_iniciarA = tk.Button(pestaña_A, text="Cargar Archivo y Analizar (Contrato A)", 
+                             bg="#4a90e2", fg="white", command=iniciar_analisis_contratoA)
+    btn_iniciarA.pack(pady=10)
+
+    # ----- Pestaña Contrato B -----
+    pestaña_B = ttk.Frame(notebook)
+    notebook.add(pestaña_B, text="Contrato B")
+
+    # Información General para Contrato B
+    frame_infoB = ttk.LabelFrame(pestaña_B, text="Información General")
+    frame_infoB.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_infoB.columnconfigure(1, weight=1)
+
+    tk.Label(frame_infoB, text="Agujero:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryB_agujero = tk.Entry(frame_infoB)
+    entryB_agujero.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_infoB, text="Diámetro de Barrena:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+    entryB_diam_barrena = tk.Entry(frame_infoB)
+    entryB_diam_barrena.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_infoB, text="Temperatura de Fondo:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+    entryB_temp_fondo = tk.Entry(frame_infoB)
+    entryB_temp_fondo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+
+    # LODO para Contrato B
+    frame_lodoB = ttk.LabelFrame(pestaña_B, text="Lodo")
+    frame_lodoB.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_lodoB.columnconfigure(1, weight=1)
+
+    tk.Label(frame_lodoB, text="Tipo de Lodo:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryB_tipo_lodo = tk.Entry(frame_lodoB)
+    entryB_tipo_lodo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_lodoB, text="Densidad de Lodo:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+    entryB_dens_lodo = tk.Entry(frame_lodoB)
+    entryB_dens_lodo.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_lodoB, text="Aditivos:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+    entryB_aditivos_lodo = tk.Entry(frame_lodoB)
+    entryB_aditivos_lodo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+
+    # CEMENTO para Contrato B
+    frame_cemB = ttk.LabelFrame(pestaña_B, text="Cemento")
+    frame_cemB.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_cemB.columnconfigure(1, weight=1)
+
+    tk.Label(frame_cemB, text="Densidad Lechada de Amarre:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryB_dens_amarre = tk.Entry(frame_cemB)
+    entryB_dens_amarre.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_cemB, text="Densidad Lechada de Línea:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+    entryB_dens_linea = tk.Entry(frame_cemB)
+    entryB_dens_linea.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_cemB, text="Aditivos:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+    entryB_aditivos_cem = tk.Entry(frame_cemB)
+    entryB_aditivos_cem.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+
+    # TR para Contrato B
+    frame_trB = ttk.LabelFrame(pestaña_B, text="TR")
+    frame_trB.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_trB.columnconfigure(1, weight=1)
+
+    tk.Label(frame_trB, text="Diámetro TR (ej. 20, 13 3/8, 9 5/8, etc.):").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryB_diam_tr = tk.Entry(frame_trB)
+    entryB_diam_tr.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    # Equipo de Control de Sólidos para Contrato B
+    frame_solidosB = ttk.LabelFrame(pestaña_B, text="Equipo de Control de Sólidos")
+    frame_solidosB.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_solidosB.columnconfigure(1, weight=1)
+
+    tk.Label(frame_solidosB, text="Tornillo:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryB_tornillo = tk.Entry(frame_solidosB)
+    entryB_tornillo.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_solidosB, text="Temblorina:").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+    entryB_temblorina = tk.Entry(frame_solidosB)
+    entryB_temblorina.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_solidosB, text="Limpia Lodo:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+    entryB_limpia_lodo = tk.Entry(frame_solidosB)
+    entryB_limpia_lodo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+
+    tk.Label(frame_solidosB, text="Centrífuga Decantadora:").grid(row=3, column=0, padx=5, pady=5, sticky="e")
+    entryB_centrifuga = tk.Entry(frame_solidosB)
+    entryB_centrifuga.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
+
+    # Servicios Adicionales para Contrato B
+    frame_serviciosB = ttk.LabelFrame(pestaña_B, text="Servicios Adicionales")
+    frame_serviciosB.pack(fill="both", expand=True, padx=5, pady=5)
+    frame_serviciosB.columnconfigure(1, weight=1)
+
+    tk.Label(frame_serviciosB, text="Recolección y Transporte de Recortes:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    entryB_recortes = tk.Entry(frame_serviciosB)
+    entryB_recortes.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    btn_iniciarB = tk.Button(pestaña_B, text="Cargar Archivo y Analizar (Contrato B)", 
+                             bg="#4a90e2", fg="white", command=iniciar_analisis_contratoB)
+    btn_iniciarB.pack(pady=10)
+
+    # Ambos contratos a la vez, cada uno con los datos de su pestaña
+    btn_iniciar_ambos = tk.Button(frame_interior_root, text="Cargar Archivo y Analizar con Ambos Contratos",
+                                  bg="#4a90e2", fg="white", command=iniciar_analisis_ambos_contratos)
+    btn_iniciar_ambos.pack(pady=(0, 10))
+
+    btn_historial = tk.Button(frame_interior_root, text="Historial de Validaciones",
+                              bg="#6c757d", fg="white", command=mostrar_historial)
+    btn_historial.pack(pady=(0, 10))
+
+    root.mainloop()
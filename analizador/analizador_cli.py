@@ -0,0 +1,173 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+from collections import Counter
+from motor import (FORMATOS_SALIDA, RUTA_HISTORIAL, TRABAJADORES, URLS_CONTRATO, CacheResultados,
+                   Diagnostico, Historial, analizar_archivo_contratos, cargar_catalogo, cargar_catalogo_cache,
+                   comparar_contratos, crear_sesion, describir_estado_catalogo, guardar_reporte,
+                   guardar_resultados, preparar_catalogo)
+
+# =============================================================================
+# VALIDACIÓN POR LOTES DESDE LA LÍNEA DE COMANDOS
+# =============================================================================
+
+def leer_contrato_info(args):
+    """
+    Arma el diccionario contrato_info a partir de --info-json y de los
+    --info CAMPO=VALOR (estos últimos tienen prioridad).
+    """
+    contrato_info = {}
+    if args.info_json:
+        with open(args.info_json, encoding="utf-8") as archivo:
+            contrato_info.update(json.load(archivo))
+    for par in args.info:
+        campo, separador, valor = par.partition("=")
+        if not separador:
+            raise ValueError(f"--info debe tener la forma CAMPO=VALOR: {par!r}")
+        contrato_info[campo.strip()] = valor.strip()
+    return contrato_info
+
+def nombres_salida(archivos):
+    """
+    Nombre base de los resultados de cada archivo: el del archivo sin
+    extensión. Si dos archivos del lote se llaman igual (ej. a/pozo1.xlsx y
+    b/pozo1.xlsx), se antepone el nombre de su directorio y, si aun así se
+    repiten, se numeran, para que ningún resultado sobrescriba a otro.
+    """
+    nombres = [os.path.splitext(os.path.basename(file_path))[0] for file_path in archivos]
+    repetidos = {nombre for nombre, veces in Counter(map(os.path.normcase, nombres)).items() if veces > 1}
+    for i, file_path in enumerate(archivos):
+        if os.path.normcase(nombres[i]) in repetidos:
+            padre = os.path.basename(os.path.dirname(os.path.abspath(file_path)))
+            nombres[i] = f"{padre}_{nombres[i]}" if padre else nombres[i]
+    usados = set()
+    for i, nombre in enumerate(nombres):
+        candidato = nombre
+        numero = 1
+        while os.path.normcase(candidato) in usados:
+            numero += 1
+            candidato = f"{nombre}_{numero}"
+        usados.add(os.path.normcase(candidato))
+        nombres[i] = candidato
+    return nombres
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        description="Valida partidas de uno o más archivos de Excel sin abrir la interfaz gráfica."
+    )
+    parser.add_argument("archivos", nargs="+", help="Archivos .xlsx a validar")
+    fuente = parser.add_mutually_exclusive_group(required=True)
+    fuente.add_argument("--contrato", choices=sorted(URLS_CONTRATO), action="append",
+                        help="Usa el catálogo de la API del contrato indicado; se puede repetir "
+                             "(ej. --contrato A --contrato B) y entonces cada libro se lee una vez "
+                             "y se valida contra todos")
+    fuente.add_argument("--catalogo",
+                        help="URL de la API o archivo JSON local con el catálogo de PalabrasRelacionadas")
+    parser.add_argument("--sin-cache", action="store_true",
+                        help="No usa ni actualiza la caché local del catálogo ni la de resultados por libro")
+    parser.add_argument("--info", action="append", default=[], metavar="CAMPO=VALOR",
+                        help="Dato del contrato (se puede repetir), ej. --info \"Agujero=12 1/4\"")
+    parser.add_argument("--info-json", metavar="ARCHIVO",
+                        help="Archivo JSON con los datos del contrato")
+    parser.add_argument("--salida", default=".", metavar="DIRECTORIO",
+                        help="Directorio donde se escriben los resultados (por defecto, el actual)")
+    parser.add_argument("--formato", choices=FORMATOS_SALIDA, default="xlsx",
+                        help="Formato de los resultados (por defecto, xlsx)")
+    parser.add_argument("--trabajadores", type=int, default=TRABAJADORES,
+                        help=f"Procesos para el matching (por defecto, {TRABAJADORES})")
+    parser.add_argument("--historial", default=RUTA_HISTORIAL, metavar="ARCHIVO",
+                        help="Base SQLite donde se registra cada validación (por defecto, la de la interfaz)")
+    parser.add_argument("--sin-historial", action="store_true",
+                        help="No registra las validaciones en el historial")
+    parser.add_argument("--diagnostico", action="store_true",
+                        help="Escribe junto a cada resultado un reporte JSON con el tiempo de cada etapa")
+    return parser
+
+def main(argv=None):
+    parser = crear_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        contrato_info = leer_contrato_info(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    # Con varios contratos el libro se lee una sola vez y se valida contra todos
+    if args.contrato:
+        fuentes = {letra: URLS_CONTRATO[letra] for letra in dict.fromkeys(args.contrato)}
+    else:
+        fuentes = {"": args.catalogo}
+    catalogos = {}
+    sesion = crear_sesion()
+    for letra, fuente in fuentes.items():
+        try:
+            if fuente.startswith(("http://", "https://")) and not args.sin_cache:
+                api_data, estado_catalogo = cargar_catalogo_cache(fuente, sesion=sesion)
+                prefijo = f"Contrato {letra}: " if letra else ""
+                print(prefijo + describir_estado_catalogo(estado_catalogo), file=sys.stderr)
+            else:
+                api_data = cargar_catalogo(fuente, sesion=sesion)
+        except (OSError, ValueError) as e:
+            # requests.RequestException también es OSError
+            print(f"Error al obtener el catálogo de {fuente}: {e}", file=sys.stderr)
+            return 2
+        catalogos[letra] = preparar_catalogo(api_data)
+    contratos = {letra: (catalogo, contrato_info) for letra, catalogo in catalogos.items()}
+
+    os.makedirs(args.salida, exist_ok=True)
+    errores = 0
+    for file_path, nombre in zip(args.archivos, nombres_salida(args.archivos)):
+        # Con un solo contrato el nombre del resultado no cambia
+        sufijos = {letra: f"_{letra}" if len(fuentes) > 1 else "" for letra in fuentes}
+        destinos = {letra: os.path.join(args.salida, f"{nombre}_partidas{sufijo}.{args.formato}")
+                    for letra, sufijo in sufijos.items()}
+        try:
+            diagnostico = Diagnostico() if args.diagnostico else None
+            caches = None if args.sin_cache else {
+                letra: CacheResultados(file_path, catalogos[letra], contrato=fuente)
+                for letra, fuente in fuentes.items()}
+            resultados = analizar_archivo_contratos(file_path, contratos, trabajadores=args.trabajadores,
+                                                    caches=caches, diagnostico=diagnostico)
+            for letra, partidas_detectadas in resultados.items():
+                guardar_resultados(partidas_detectadas, destinos[letra])
+            if diagnostico is not None:
+                reporte = diagnostico.terminar().reporte()
+                guardar_reporte(reporte, os.path.join(args.salida, f"{nombre}_diagnostico.json"))
+        except Exception as e:
+            # Un archivo dañado no debe detener el resto del lote
+            print(f"{file_path}: error: {e}", file=sys.stderr)
+            errores += 1
+            continue
+        for letra, partidas_detectadas in resultados.items():
+            contrato = f" (contrato {letra})" if len(fuentes) > 1 else ""
+            print(f"{file_path}: {len(partidas_detectadas)} partidas{contrato} -> {destinos[letra]}")
+        if not args.sin_historial:
+            # Con --catalogo el contrato se registra con el nombre de su fuente
+            try:
+                with Historial(args.historial) as historial:
+                    historial.registrar(file_path, {letra or fuentes[letra]: partidas_detectadas
+                                                    for letra, partidas_detectadas in resultados.items()},
+                                        {letra or fuentes[letra]: contrato_info for letra in fuentes})
+            except (sqlite3.Error, OSError) as e:
+                print(f"{file_path}: no se pudo guardar en el historial: {e}", file=sys.stderr)
+        if len(fuentes) > 1:
+            for fila in comparar_contratos(resultados):
+                print(f"{file_path}: contrato {fila['contrato']}: {fila['partidas']} partidas, "
+                      f"cantidad {fila['cantidad']:,}, total {fila['importe']:,.2f}")
+        for letra, cache in (caches or {}).items():
+            if cache.reutilizados:
+                contrato = f" (contrato {letra})" if len(fuentes) > 1 else ""
+                print(f"{file_path}: {cache.reutilizados} comentarios de la validación anterior, "
+                      f"{cache.analizados} analizados{contrato}", file=sys.stderr)
+        if diagnostico is not None:
+            print(f"{file_path}: {reporte['filas_por_segundo'] or 0:,.0f} filas/s, diagnóstico en "
+                  f"{nombre}_diagnostico.json", file=sys.stderr)
+
+    return 1 if errores else 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+from motor import iterar_comentarios, leer_comentarios
+
+# =============================================================================
+# BENCHMARK: LECTURA DE COMENTARIOS DEL EXCEL
+# =============================================================================
+#
+# Compara el tiempo y la memoria pico (RSS) de leer los comentarios con
+# pd.read_excel (leer_comentarios) y en streaming (iterar_comentarios).
+# Cada modo se mide en un proceso aparte para que la memoria no se mezcle:
+#
+#     python benchmarks/lectura_excel.py --filas 200000
+
+MODOS = {
+    "pandas": leer_comentarios,
+    "streaming": iterar_comentarios,
+}
+
+FRASES = [
+    "Cambio de barrena 9 1/2", "Circuló y acondicionó lodo", "Perforó de 1200 a 1350 m",
+    "Viaje corto a zapata", "Bajó TR 13 3/8", "Cementó TR 9 5/8 con lechada de amarre",
+    "Armó y probó temblorina", "Operó centrífuga decantadora", "Recolección de recortes",
+    "Tomó registro eléctrico", "Densidad de lodo 1.85 gr/cc", "Esperó fraguado",
+]
+
+def rss_pico_mb():
+    """
+    Memoria pico del proceso en MB, o None si no se puede medir.
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 2**20
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo reporta en KB y macOS en bytes
+    return pico / 2**20 if sys.platform == "darwin" else pico / 2**10
+
+def generar_libro(file_path, filas, semilla=0):
+    """
+    Escribe un libro con columnas parecidas a un reporte de campo real.
+    """
+    aleatorio = random.Random(semilla)
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    hoja.append(["Fecha", "Pozo", "Etapa", "Profundidad", "Partida", "Descripción",
+                 "Unidad de Medida", "Precio Unitario (USD)", "Responsable", "Comments"])
+    for i in range(filas):
+        comentario = " y ".join(aleatorio.sample(FRASES, aleatorio.randint(1, 3)))
+        hoja.append([f"2024-{i % 12 + 1:02d}-01", f"POZO-{i % 40}", "Perforación",
+                     1000 + i % 3000, f"P{i % 500:04d}", "Descripción de la actividad",
+                     "Servicio", round(aleatorio.random() * 1000, 2), "Supervisor", comentario])
+    libro.save(file_path)
+
+def medir(modo, file_path):
+    inicio = time.perf_counter()
+    grupos = Counter(MODOS[modo](file_path))
+    return {
+        "modo": modo,
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "rss_pico_mb": rss_pico_mb(),
+        "filas": sum(grupos.values()),
+        "comentarios_distintos": len(grupos),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compara la lectura de comentarios con pandas y en streaming.")
+    parser.add_argument("--filas", type=int, default=200000)
+    parser.add_argument("--archivo", help="Libro existente a medir en lugar de generar uno")
+    parser.add_argument("--medir", choices=sorted(MODOS), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.medir:
+        print(json.dumps(medir(args.medir, args.archivo)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as directorio:
+        file_path = args.archivo
+        if not file_path:
+            file_path = os.path.join(directorio, "comentarios.xlsx")
+            generar_libro(file_path, args.filas)
+        resultados = []
+        for modo in MODOS:
+            salida = subprocess.run([sys.executable, os.path.abspath(__file__),
+                                     "--medir", modo, "--archivo", file_path],
+                                    check=True, capture_output=True, text=True).stdout
+            resultados.append(json.loads(salida))
+
+    print(json.dumps(resultados, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
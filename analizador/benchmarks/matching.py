@@ -0,0 +1,189 @@
+import argparse
+import copy
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from motor import (ContextoValidacion, analizar_comentario, normalizar_texto, preparar_catalogo,
+                   procesar_comentarios, puntajes_en_cascada, registrar_partida)
+from sinteticos import generar_catalogo, generar_comentarios
+
+# =============================================================================
+# BENCHMARK: COSTO DEL MATCHING SEGÚN EL CATÁLOGO Y EL LIBRO
+# =============================================================================
+#
+# Mide por separado cada fase de la validación sobre datos sintéticos, para
+# cada combinación de tamaño de catálogo, filas y tasa de duplicación:
+#
+#     python benchmarks/matching.py --partidas 500 2000 --filas 20000 \
+#         --duplicacion 0.5 0.9 --salida matching.json
+#
+# El resultado es un JSON con el entorno (versión, Python, CPU) y los tiempos
+# de cada corrida. Con --comparar se muestra el cociente contra un resultado
+# anterior, para detectar regresiones entre versiones.
+
+FASES = ("normalizacion", "agrupacion", "preparacion", "exacta", "candidatas", "fuzzy",
+         "analisis", "agregacion", "total")
+
+def version_codigo():
+    """
+    Commit actual del repositorio, o None si no se puede obtener.
+    """
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def entorno():
+    return {
+        "version": version_codigo(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+def cronometrar(funcion, repeticiones):
+    """
+    Ejecuta 'funcion' varias veces y devuelve (mejor tiempo, último resultado).
+    """
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor, resultado
+
+def medir_corrida(partidas, filas, duplicacion, repeticiones, semilla):
+    catalogo = generar_catalogo(partidas, semilla=semilla)
+    crudos = generar_comentarios(filas, duplicacion, semilla=semilla)
+    tiempos = {}
+
+    tiempos["normalizacion"], comentarios = cronometrar(
+        lambda: [normalizar_texto(c) for c in crudos], repeticiones)
+    tiempos["agrupacion"], grupos = cronometrar(
+        lambda: list(Counter(comentarios).items()), repeticiones)
+    distintos = [comment for comment, _ in grupos]
+
+    # preparar_catalogo agrega 'palabras_limpias', así que cada repetición
+    # parte de una copia limpia, hecha antes de medir
+    copias = iter([copy.deepcopy(catalogo) for _ in range(repeticiones)])
+
+    tiempos["preparacion"], catalogo = cronometrar(lambda: preparar_catalogo(next(copias)), repeticiones)
+
+    tiempos["exacta"], exactas = cronometrar(
+        lambda: [catalogo.automata.buscar(comment) for comment in distintos], repeticiones)
+    tiempos["candidatas"], filtradas = cronometrar(
+        lambda: [catalogo.indice.filtrar(comment) for comment in distintos], repeticiones)
+    # Igual que en el análisis: las palabras ya encontradas exactas no se puntúan
+    candidatas = []
+    pendientes = []
+    for (posiciones, cota_token_set, cota_parcial), encontradas in zip(filtradas, exactas):
+        palabras = [catalogo.indice.palabras[i] for i in posiciones]
+        quedan = np.array([p not in encontradas for p in palabras], dtype=bool)
+        candidatas.append(palabras)
+        pendientes.append(([p for p, q in zip(palabras, quedan) if q],
+                           cota_token_set[quedan], cota_parcial[quedan]))
+    tiempos["fuzzy"], _ = cronometrar(
+        lambda: [puntajes_en_cascada(comment, *pendiente) for comment, pendiente in zip(distintos, pendientes)],
+        repeticiones)
+
+    # Análisis completo por comentario (exacta + candidatas + fuzzy + selección de palabra)
+    tiempos["analisis"], coincidencias = cronometrar(
+        lambda: [analizar_comentario(comment, catalogo) for comment in distintos],
+        repeticiones)
+
+    def agregar():
+        partidas_detectadas = {}
+        # Cada grupo se identifica por su posición, como la fila en la validación
+        contexto = ContextoValidacion(dict(enumerate(distintos)), {})
+        for fila, ((_, veces), encontradas) in enumerate(zip(grupos, coincidencias)):
+            for item, similitud, palabra_encontrada in encontradas:
+                registrar_partida(partidas_detectadas, item, similitud, palabra_encontrada,
+                                  fila, contexto, veces)
+        return partidas_detectadas
+    tiempos["agregacion"], partidas_detectadas = cronometrar(agregar, repeticiones)
+
+    tiempos["total"], _ = cronometrar(
+        lambda: procesar_comentarios([normalizar_texto(c) for c in crudos], catalogo, {}),
+        repeticiones)
+
+    return {
+        "partidas": partidas,
+        "filas": filas,
+        "duplicacion": duplicacion,
+        "semilla": semilla,
+        "comentarios_distintos": len(distintos),
+        "palabras_catalogo": len(catalogo.palabras),
+        "candidatas_promedio": round(sum(map(len, candidatas)) / max(len(distintos), 1), 1),
+        "coincidencias": sum(map(len, coincidencias)),
+        "partidas_detectadas": len(partidas_detectadas),
+        "segundos": {fase: round(tiempos[fase], 4) for fase in FASES},
+    }
+
+def clave_corrida(corrida):
+    return (corrida["partidas"], corrida["filas"], corrida["duplicacion"], corrida["semilla"])
+
+def comparar(actual, anterior):
+    """
+    Imprime, por corrida y fase, el cociente tiempo actual / tiempo anterior.
+    """
+    previas = {clave_corrida(corrida): corrida for corrida in anterior["corridas"]}
+    print(f"Comparación contra {anterior['entorno'].get('version')} "
+          f"({anterior['entorno'].get('fecha')}); > 1 es más lento")
+    for corrida in actual["corridas"]:
+        previa = previas.get(clave_corrida(corrida))
+        if previa is None:
+            continue
+        cocientes = "  ".join(
+            f"{fase} {corrida['segundos'][fase] / previa['segundos'][fase]:.2f}x"
+            for fase in FASES if previa["segundos"].get(fase))
+        print(f"  partidas={corrida['partidas']} filas={corrida['filas']} "
+              f"duplicacion={corrida['duplicacion']}: {cocientes}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mide cada fase del matching sobre catálogos y libros sintéticos.")
+    parser.add_argument("--partidas", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--filas", type=int, nargs="+", default=[20000])
+    parser.add_argument("--duplicacion", type=float, nargs="+", default=[0.5, 0.9])
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="Se reporta el mejor tiempo de las repeticiones")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default="benchmark_matching.json",
+                        help="Archivo JSON con los resultados")
+    parser.add_argument("--comparar", metavar="ANTERIOR",
+                        help="Resultado de una versión anterior contra el cual comparar")
+    args = parser.parse_args(argv)
+
+    resultado = {"entorno": entorno(), "corridas": []}
+    for partidas, filas, duplicacion in itertools.product(args.partidas, args.filas, args.duplicacion):
+        corrida = medir_corrida(partidas, filas, duplicacion, args.repeticiones, args.semilla)
+        resultado["corridas"].append(corrida)
+        print(f"partidas={partidas} filas={filas} duplicacion={duplicacion}: "
+              + "  ".join(f"{fase} {segundos:.3f}s" for fase, segundos in corrida["segundos"].items()))
+
+    with open(args.salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+    print(f"Resultados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            comparar(resultado, json.load(archivo))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
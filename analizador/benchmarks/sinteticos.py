@@ -0,0 +1,140 @@
+import argparse
+import json
+import random
+import sys
+
+import openpyxl
+
+# =============================================================================
+# DATOS SINTÉTICOS: CATÁLOGO DE PALABRAS RELACIONADAS Y LIBROS DE COMENTARIOS
+# =============================================================================
+#
+# Genera catálogos con la estructura de la API de PalabrasRelacionadas y
+# libros de comentarios de campo con el tamaño y la tasa de duplicación que
+# se pidan. Con la misma semilla se generan siempre los mismos datos:
+#
+#     python benchmarks/sinteticos.py --partidas 2000 --filas 100000 \
+#         --duplicacion 0.9 --catalogo catalogo.json --libro comentarios.xlsx
+
+TERMINOS = [
+    "barrena", "tricónica", "pdc", "lodo", "lodo base aceite", "lodo base agua", "lechada",
+    "lechada de amarre", "lechada de llenado", "cemento", "tr", "tubería de revestimiento",
+    "liner", "zapata", "cople", "temblorina", "centrífuga decantadora", "limpia lodo",
+    "tornillo", "recortes", "transporte de recortes", "registro eléctrico", "toma de información",
+    "núcleo", "bentonita", "barita", "obturante", "densificante", "desgasificador",
+    "unidad de alta presión", "empacador", "martillo", "estabilizador", "motor de fondo",
+    "herramienta direccional", "preventor", "conexión", "viaje corto", "pesca", "molino",
+]
+MEDIDAS = ["30", "20", "16", "13 3/8", "12 1/4", "9 5/8", "8 1/2", "7", "6 1/8", "5 1/2", "4 1/2"]
+VERBOS = [
+    "cambió", "circuló", "acondicionó", "bajó", "sacó", "armó", "probó", "operó", "perforó",
+    "cementó", "tomó", "recolectó", "transportó", "instaló", "desmanteló", "rebajó",
+]
+RELLENO = [
+    "en pozo", "con equipo", "a zapata", "hasta fondo", "sin problemas", "por falla",
+    "según programa", "por indicación de supervisor", "en etapa", "con", "y", "de", "se",
+]
+UNIDADES = ["pza", "m", "m3", "ton", "día", "servicio", "viaje", "lote"]
+
+def _con_ruido(aleatorio, texto, tasa):
+    """
+    Simula la captura en campo: quita acentos, cambia mayúsculas o comete un
+    error de tecleo en una parte de las palabras.
+    """
+    palabras = []
+    for palabra in texto.split():
+        if aleatorio.random() < tasa and len(palabra) > 3:
+            cambio = aleatorio.randrange(3)
+            if cambio == 0:
+                palabra = palabra.translate(str.maketrans("áéíóú", "aeiou"))
+            elif cambio == 1:
+                palabra = palabra.upper()
+            else:
+                i = aleatorio.randrange(len(palabra) - 1)
+                palabra = palabra[:i] + palabra[i + 1] + palabra[i] + palabra[i + 2:]
+        palabras.append(palabra)
+    return " ".join(palabras)
+
+def _termino(aleatorio):
+    termino = aleatorio.choice(TERMINOS)
+    if aleatorio.random() < 0.4:
+        termino = f"{termino} {aleatorio.choice(MEDIDAS)}"
+    return termino
+
+def generar_catalogo(partidas, palabras_por_partida=(1, 4), semilla=0):
+    """
+    Devuelve una lista de partidas como las de la API: partida, descripcion,
+    unidadMedida, precioUnitario y 'palabra' con términos separados por comas.
+    """
+    aleatorio = random.Random(semilla)
+    catalogo = []
+    for i in range(partidas):
+        terminos = list(dict.fromkeys(_termino(aleatorio)
+                                      for _ in range(aleatorio.randint(*palabras_por_partida))))
+        catalogo.append({
+            "partida": f"{i // 100 + 1}.{i % 100 + 1:02d}",
+            "descripcion": f"Servicio de {terminos[0]} ({i})",
+            "unidadMedida": aleatorio.choice(UNIDADES),
+            "precioUnitario": round(aleatorio.uniform(50, 25000), 2),
+            "palabra": ", ".join(terminos),
+        })
+    return catalogo
+
+def generar_comentarios(filas, duplicacion=0.5, ruido=0.15, semilla=0):
+    """
+    Devuelve 'filas' comentarios de reporte de perforación. 'duplicacion' es
+    la fracción de filas que repiten un comentario anterior (0 = todos
+    distintos) y 'ruido' la fracción de palabras con errores de captura.
+    """
+    aleatorio = random.Random(semilla)
+    distintos = max(1, round(filas * (1 - duplicacion))) if filas else 0
+    comentarios = []
+    for i in range(distintos):
+        partes = [f"{aleatorio.choice(VERBOS)} {_termino(aleatorio)}"
+                  for _ in range(aleatorio.randint(1, 3))]
+        partes += aleatorio.sample(RELLENO, aleatorio.randint(0, 3))
+        aleatorio.shuffle(partes)
+        # La profundidad hace que cada comentario base sea distinto
+        partes.append(f"a {1000 + i} m")
+        comentarios.append(_con_ruido(aleatorio, " ".join(partes), ruido))
+    comentarios += [aleatorio.choice(comentarios) for _ in range(filas - distintos)]
+    aleatorio.shuffle(comentarios)
+    return comentarios
+
+def escribir_libro(file_path, comentarios):
+    """
+    Escribe los comentarios en un libro con la columna 'Comments', como los
+    reportes que se validan.
+    """
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    hoja.append(["Fecha", "Pozo", "Comments"])
+    for i, comentario in enumerate(comentarios):
+        hoja.append([f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"POZO-{i % 40}", comentario])
+    libro.save(file_path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Genera un catálogo y un libro de comentarios sintéticos.")
+    parser.add_argument("--partidas", type=int, default=1000)
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--duplicacion", type=float, default=0.5)
+    parser.add_argument("--ruido", type=float, default=0.15)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--catalogo", help="Archivo JSON donde escribir el catálogo")
+    parser.add_argument("--libro", help="Archivo .xlsx donde escribir los comentarios")
+    args = parser.parse_args(argv)
+    if not args.catalogo and not args.libro:
+        parser.error("indique --catalogo, --libro o ambos")
+
+    if args.catalogo:
+        with open(args.catalogo, "w", encoding="utf-8") as archivo:
+            json.dump(generar_catalogo(args.partidas, semilla=args.semilla), archivo,
+                      ensure_ascii=False, indent=1)
+    if args.libro:
+        escribir_libro(args.libro, generar_comentarios(args.filas, args.duplicacion,
+                                                       args.ruido, args.semilla))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2166 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import pandas as pd
+import numpy as np
+import openpyxl
+from openpyxl.cell.cell import ERROR_CODES
+from openpyxl.utils.exceptions import InvalidFileException
+import hashlib
+import heapq
+import contextlib
+import csv
+import functools
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+import zipfile
+from array import array
+from collections import Counter
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor
+from rapidfuzz import fuzz, process, utils
+from rapidfuzz.distance import Indel, Levenshtein
+
+# =============================================================================
+# FUNCIONES DE PROCESAMIENTO
+# =============================================================================
+
+class _TablaSinMarcas(dict):
+    """
+    Tabla para str.translate que elimina las marcas combinantes (categoría
+    'Mn') y deja los demás caracteres. Se llena a medida que aparecen
+    caracteres nuevos.
+    """
+
+    def __missing__(self, codigo):
+        traduccion = self[codigo] = None if unicodedata.category(chr(codigo)) == 'Mn' else codigo
+        return traduccion
+
+_SIN_MARCAS = _TablaSinMarcas()
+# Bloque de diacríticos combinantes (todos 'Mn'): los de los acentos y la tilde
+_DIACRITICOS = re.compile('[\u0300-\u036f]+')
+# Se conservan números, letras, puntos, comas y espacios
+_NO_PERMITIDOS = re.compile(r'[^a-z0-9., ]+')
+_NO_PERMITIDOS_ASCII = bytes(c for c in range(128) if _NO_PERMITIDOS.fullmatch(chr(c)))
+# Textos normalizados que se recuerdan: los comentarios de campo se repiten mucho
+MAXIMO_TEXTOS_NORMALIZADOS = 1 << 16
+
+# Medidas en forma canónica, iguales en los comentarios y en el catálogo:
+# "13 3/8", "13-3/8\"" y "13.3750 pulg" quedan como "13.375in" y "20'" como
+# "20in"; densidades como "1.2gcc" o "10.5ppg"; temperaturas como "150c" o
+# "300f"; y cualquier otro decimal sin ceros de sobra ("1.20" como "1.2").
+_UNIDAD_PULGADAS = r'[ \t]*(?:"|\'\'|\'|”|″|pulgadas|pulgada|pulg|plg|in)(?![a-z0-9])'
+_FRACCION = re.compile(r'(?<![\d./])(?:(\d+)[ \t-]+)?(\d+)/(2|4|8|16|32|64)(?![\d/])'
+                       r'(?:' + _UNIDAD_PULGADAS + ')?')
+_PULGADAS = re.compile(r'(?<![\d.])(\d+(?:\.\d+)?)' + _UNIDAD_PULGADAS)
+_DENSIDAD = re.compile(r'(?<![\d.,])(\d+(?:[.,]\d+)?)[ \t]*(?:(?:grs|gr|g)[ \t]*/[ \t]*(?:cm3|cm³|cc)'
+                       r'|(lb[ \t]*/[ \t]*gal|ppg))(?![a-z0-9])')
+_TEMPERATURA = re.compile(r'(?<![\d.,])(\d+(?:[.,]\d+)?)[ \t]*(?:°|º|grados?)[ \t]*(c|f)(?![a-z0-9])')
+# Decimales sueltos de hasta 6 cifras (los que _decimal escribe igual)
+_DECIMAL = re.compile(r'(?<![\w.,])\d+\.\d{1,6}(?!\w|[.,]\d)')
+# Medidas ya canónicas en un texto normalizado: sólo números con unidad
+_MEDIDA = re.compile(r'(?<![\w.])\d+(?:\.\d+)?(?:in|gcc|ppg|c|f)(?!\w)')
+# Números sueltos, sin unidad ("tr 20 a fondo")
+_NUMERO = re.compile(r'(?<![\w.])\d+(?:\.\d+)?(?!\w|\.\d)')
+
+def _decimal(valor):
+    return f"{valor:.6f}".rstrip("0").rstrip(".")
+
+def _numero(texto):
+    return _decimal(float(texto.replace(",", ".")))
+
+def _fraccion(m):
+    entero, numerador, denominador = m.groups()
+    if int(numerador) >= int(denominador):
+        return m.group(0)
+    return _decimal(int(entero or 0) + int(numerador) / int(denominador)) + "in"
+
+def _pulgadas(m):
+    return _numero(m.group(1)) + "in"
+
+def canonizar_medidas(texto):
+    """
+    Convierte las medidas de un texto en minúsculas y sin diacríticos a su
+    forma canónica: fracciones de pulgada y pulgadas a decimal con 'in',
+    densidades con 'gcc' o 'ppg', temperaturas con 'c' o 'f' y los demás
+    decimales sin ceros de sobra.
+    """
+    if "/" in texto:
+        texto = _FRACCION.sub(_fraccion, texto)
+    texto = _PULGADAS.sub(_pulgadas, texto)
+    if "/" in texto or "ppg" in texto:
+        texto = _DENSIDAD.sub(lambda m: _numero(m.group(1)) + ("ppg" if m.group(2) else "gcc"), texto)
+    texto = _TEMPERATURA.sub(lambda m: _numero(m.group(1)) + m.group(2), texto)
+    if "." in texto:
+        texto = _DECIMAL.sub(lambda m: _numero(m.group(0)), texto)
+    return texto
+
+def medidas_texto(texto):
+    """
+    Conjunto de medidas canónicas con unidad de un texto ya normalizado; los
+    números sueltos ("0.5 dia") no cuentan.
+    """
+    return set(_MEDIDA.findall(texto))
+
+def _valor_y_unidad(medida):
+    valor = medida.rstrip("abcdefghijklmnopqrstuvwxyz")
+    return valor, medida[len(valor):]
+
+@functools.lru_cache(maxsize=MAXIMO_TEXTOS_NORMALIZADOS)
+def _normalizar_cadena(texto):
+    texto = texto.lower()
+    if not texto.isascii():
+        # Remover diacríticos (ej.: "cáscara" -> "cascara")
+        texto = _DIACRITICOS.sub('', unicodedata.normalize('NFD', texto))
+        if not texto.isascii():
+            texto = texto.translate(_SIN_MARCAS)
+    # Medidas en forma canónica (ej.: "9 1/2" -> "9.5in", "20'" -> "20in")
+    if any(c.isdigit() for c in texto):
+        texto = canonizar_medidas(texto)
+    if texto.isascii():
+        texto = texto.encode('ascii').translate(None, _NO_PERMITIDOS_ASCII).decode('ascii')
+    else:
+        texto = _NO_PERMITIDOS.sub('', texto)
+    # Después de quitar los demás caracteres, los espacios son el único blanco
+    return " ".join(texto.split())
+
+def normalizar_texto(texto):
+    """
+    Convierte el texto a minúsculas, remueve diacríticos, lleva las medidas
+    a su forma canónica (ver canonizar_medidas) y elimina caracteres no
+    deseados.
+    """
+    return _normalizar_cadena(str(texto))
+
+def normalizar_columna(valores):
+    """
+    Normaliza una columna completa (una Series de pandas o cualquier
+    secuencia) y devuelve una lista con normalizar_texto de cada valor. Cada
+    texto distinto se normaliza una sola vez.
+    """
+    textos = pd.Series(valores, dtype=object)
+    if pd.api.types.infer_dtype(textos, skipna=False) != "string":
+        # Se agrupa por el texto y no por el valor: 1, 1.0 y True son iguales
+        # para pandas pero su texto no
+        textos = textos.map(str)
+    codigos, unicos = pd.factorize(textos)
+    # Los valores ya son distintos: no vale la pena pasar por la caché
+    normalizados = np.array([_normalizar_cadena.__wrapped__(texto) for texto in unicos], dtype=object)
+    return normalizados[codigos].tolist()
+
+UMBRAL_SIMILITUD = 60
+
+def ratio_parcial(a, b):
+    """
+    partial_ratio con el mismo algoritmo que fuzzywuzzy: compara el texto
+    corto contra las ventanas del largo alineadas con cada bloque coincidente.
+    rapidfuzz.fuzz.partial_ratio busca la ventana óptima y puede dar un
+    puntaje mayor, así que aquí sólo se usa como cota superior.
+    """
+    if a == b:
+        return 100
+    if not a or not b:
+        return 0
+    if len(a) <= len(b):
+        corto, largo = a, b
+    else:
+        corto, largo = b, a
+    mejor = 0
+    for bloque in Levenshtein.opcodes(corto, largo).as_matching_blocks():
+        inicio = max(bloque.b - bloque.a, 0)
+        r = Indel.normalized_similarity(corto, largo[inicio:inicio + len(corto)])
+        if r > .995:
+            return 100
+        mejor = max(mejor, r)
+    return int(round(100 * mejor))
+
+def mejor_fuzzy_score(a, b):
+    """
+    Devuelve el máximo entre distintos métodos de fuzzy matching.
+
+    Primero los baratos (ratio y token_sort_ratio); token_set_ratio y
+    partial_ratio se piden con score_cutoff en el mejor puntaje hasta ahora,
+    así rapidfuzz los abandona en cuanto no pueden superarlo, y el
+    partial_ratio exacto sólo se calcula si el de rapidfuzz (su cota
+    superior) lo supera. El resultado es el mismo que calcularlos todos.
+    """
+    if a == b:
+        return 100
+    a_proc, b_proc = utils.default_process(a), utils.default_process(b)
+    mejor = max(int(round(fuzz.ratio(a, b))), int(round(fuzz.token_sort_ratio(a_proc, b_proc))))
+    # Medio punto más: con menos, el método redondeado no supera a 'mejor'
+    mejor = max(mejor, int(round(fuzz.token_set_ratio(a_proc, b_proc, score_cutoff=mejor + 0.5))))
+    if fuzz.partial_ratio(a, b, score_cutoff=mejor + 0.5):
+        mejor = max(mejor, ratio_parcial(a, b))
+    return mejor
+
+def _matriz_metodo(metodo, palabras, comentarios, corte):
+    """
+    Puntajes de un método de rapidfuzz para todos los pares (comentario,
+    palabra), calculados en lote; los pares por debajo de 'corte' quedan en 0.
+    """
+    return process.cdist(palabras, comentarios, scorer=metodo,
+                         score_cutoff=corte, dtype=np.float64).T
+
+def matriz_fuzzy(comentarios, palabras, umbral=UMBRAL_SIMILITUD):
+    """
+    Calcula de una sola vez mejor_fuzzy_score(palabra, comentario) de cada
+    comentario contra toda la lista de palabras y devuelve una matriz de
+    enteros de len(comentarios) x len(palabras).
+
+    Los pares que no pueden alcanzar 'umbral' se abandonan en cuanto se sabe
+    y quedan en la matriz con un puntaje menor a 'umbral' (normalmente 0);
+    los que lo alcanzan tienen exactamente el mismo puntaje que mejor_fuzzy_score.
+    """
+    if not comentarios or not palabras:
+        return np.zeros((len(comentarios), len(palabras)), dtype=int)
+    # fuzzywuzzy redondea cada método al entero más cercano: 59.5 ya cuenta como 60
+    corte = max(umbral - 0.5, 0)
+
+    comentarios_proc = [utils.default_process(c) for c in comentarios]
+    palabras_proc = [utils.default_process(p) for p in palabras]
+    puntajes = np.rint(np.maximum.reduce([
+        _matriz_metodo(fuzz.ratio, palabras, comentarios, corte),
+        _matriz_metodo(fuzz.token_sort_ratio, palabras_proc, comentarios_proc, corte),
+        _matriz_metodo(fuzz.token_set_ratio, palabras_proc, comentarios_proc, corte),
+    ])).astype(int)
+
+    # El partial_ratio de rapidfuzz es cota superior del de fuzzywuzzy: sólo
+    # se recalcula de forma exacta donde podría superar a los otros métodos.
+    cota_parcial = np.rint(_matriz_metodo(fuzz.partial_ratio, palabras, comentarios, corte))
+    for i, j in zip(*np.nonzero(cota_parcial > puntajes)):
+        puntajes[i, j] = max(puntajes[i, j], ratio_parcial(palabras[j], comentarios[i]))
+    return puntajes
+
+def puntajes_en_cascada(comment, palabras, cota_token_set, cota_parcial, umbral=UMBRAL_SIMILITUD,
+                        contadores=None):
+    """
+    Lo mismo que matriz_fuzzy([comment], palabras)[0], por niveles:
+
+      1. ratio y token_sort_ratio, los métodos baratos, para todas las palabras;
+      2. token_set_ratio sólo donde su cota (de IndiceCandidatos.filtrar)
+         puede superar el puntaje que ya se tiene o alcanzar el umbral;
+      3. partial_ratio de rapidfuzz, igual, con la cota de ratio_parcial;
+      4. ratio_parcial exacto sólo donde el de rapidfuzz supera el puntaje.
+
+    Con 'contadores' (un Counter) se suman los pares que cada nivel se ahorró.
+    """
+    if not palabras:
+        return np.zeros(0, dtype=int)
+    corte = max(umbral - 0.5, 0)
+    comment_proc = utils.default_process(comment)
+    palabras_proc = [utils.default_process(p) for p in palabras]
+    puntajes = np.rint(np.maximum(
+        _matriz_metodo(fuzz.ratio, palabras, [comment], corte)[0],
+        _matriz_metodo(fuzz.token_sort_ratio, palabras_proc, [comment_proc], corte)[0],
+    )).astype(int)
+
+    def por_calcular(cota):
+        # Un método redondeado sólo cambia el resultado si supera al puntaje
+        # actual por medio punto o si alcanza el corte
+        return np.flatnonzero(100 * cota + 1e-6 >= np.maximum(puntajes + 0.5, corte))
+
+    con_token_set = por_calcular(cota_token_set)
+    if len(con_token_set):
+        puntajes[con_token_set] = np.maximum(puntajes[con_token_set], np.rint(_matriz_metodo(
+            fuzz.token_set_ratio, [palabras_proc[j] for j in con_token_set], [comment_proc], corte)[0]))
+
+    con_parcial = por_calcular(cota_parcial)
+    exactos = []
+    if len(con_parcial):
+        cota_rapidfuzz = np.rint(_matriz_metodo(
+            fuzz.partial_ratio, [palabras[j] for j in con_parcial], [comment], corte)[0])
+        exactos = con_parcial[cota_rapidfuzz > puntajes[con_parcial]].tolist()
+        for j in exactos:
+            puntajes[j] = max(puntajes[j], ratio_parcial(palabras[j], comment))
+
+    if contadores is not None:
+        contadores["token_set_omitidos"] += len(palabras) - len(con_token_set)
+        contadores["partial_omitidos"] += len(palabras) - len(con_parcial)
+        contadores["partial_exacto_omitidos"] += len(con_parcial) - len(exactos)
+    return puntajes
+
+def es_caracter_palabra(c):
+    """
+    Equivalente a la clase \\w de re para el texto ya normalizado.
+    """
+    return c.isalnum() or c == "_"
+
+def es_limite_palabra(texto, posicion):
+    """
+    Equivalente a \\b de re: hay límite si exactamente uno de los caracteres
+    a los lados de la posición es de palabra.
+    """
+    antes = posicion > 0 and es_caracter_palabra(texto[posicion - 1])
+    despues = posicion < len(texto) and es_caracter_palabra(texto[posicion])
+    return antes != despues
+
+class AutomataPalabras:
+    """
+    Autómata de Aho-Corasick con todas las palabras normalizadas del catálogo.
+
+    Encuentra en una sola pasada lineal todas las palabras que aparecen en un
+    comentario con límite de palabra en ambos extremos, con el mismo resultado
+    que re.search(rf'\\b{re.escape(palabra)}\\b', comentario) por cada palabra.
+    """
+
+    def __init__(self, palabras):
+        # Estado 0 = raíz. Las transiciones de todos los estados están en un
+        # solo diccionario con clave (estado << 21) | ord(carácter), más
+        # compacto que un diccionario por estado. Cada estado tiene su enlace
+        # de fallo y la tupla de palabras que terminan en él (incluidas las
+        # heredadas); los estados sin palabras comparten la tupla vacía.
+        self.transiciones = {}
+        self.fallo = [0]
+        self.salidas = [()]
+        self.hay_palabra_vacia = False
+
+        self.palabras = list(dict.fromkeys(palabras))
+        # Sólo hacen falta mientras se construye el autómata
+        padres, claves, profundidades = [0], [0], [0]
+        for palabra in self.palabras:
+            if not palabra:
+                self.hay_palabra_vacia = True
+                continue
+            estado = 0
+            for c in palabra:
+                clave = (estado << 21) | ord(c)
+                siguiente = self.transiciones.get(clave)
+                if siguiente is None:
+                    siguiente = self.transiciones[clave] = len(self.fallo)
+                    self.fallo.append(0)
+                    self.salidas.append(())
+                    padres.append(estado)
+                    claves.append(ord(c))
+                    profundidades.append(profundidades[estado] + 1)
+                estado = siguiente
+            self.salidas[estado] += (palabra,)
+
+        # Enlaces de fallo en orden de profundidad, como en un recorrido a lo ancho
+        for estado in sorted(range(1, len(self.fallo)), key=profundidades.__getitem__):
+            codigo = claves[estado]
+            f = self.fallo[padres[estado]]
+            while f and ((f << 21) | codigo) not in self.transiciones:
+                f = self.fallo[f]
+            destino = self.transiciones.get((f << 21) | codigo, 0)
+            self.fallo[estado] = destino if destino != estado else 0
+            self.salidas[estado] += self.salidas[self.fallo[estado]]
+
+    def buscar(self, texto):
+        """
+        Devuelve el conjunto de palabras del catálogo encontradas en 'texto'
+        con límite de palabra.
+        """
+        encontradas = set()
+        if self.hay_palabra_vacia and any(es_limite_palabra(texto, i) for i in range(len(texto) + 1)):
+            encontradas.add("")
+        transiciones = self.transiciones
+        estado = 0
+        for fin, c in enumerate(texto, start=1):
+            codigo = ord(c)
+            while estado and ((estado << 21) | codigo) not in transiciones:
+                estado = self.fallo[estado]
+            estado = transiciones.get((estado << 21) | codigo, 0)
+            if not self.salidas[estado] or not es_limite_palabra(texto, fin):
+                continue
+            for palabra in self.salidas[estado]:
+                if palabra not in encontradas and es_limite_palabra(texto, fin - len(palabra)):
+                    encontradas.add(palabra)
+        return encontradas
+
+class IndiceCandidatos:
+    """
+    Índice de las palabras del catálogo para descartar, antes del fuzzy
+    matching, las que no pueden alcanzar el umbral contra un comentario.
+
+    Guarda por palabra el conteo de cada letra y dígito (una fila por palabra,
+    una columna por carácter) y un índice invertido token -> palabras.
+
+    Garantía de recall: candidatas() nunca descarta una palabra cuyo
+    mejor_fuzzy_score con el comentario sea >= umbral. Cada método es un
+    ratio 2*LCS/(len1+len2) sobre textos derivados de la palabra y del
+    comentario, y la LCS no puede superar los caracteres que tienen en común.
+    Con 'a' letras/dígitos en común:
+      - ratio <= 2z/(len_p + len_c), con z = a más los signos (espacios,
+        puntos, comas) de la palabra;
+      - partial_ratio compara la palabra contra ventanas del comentario de su
+        mismo largo: <= 2z/(len_p + z), contando en 'a' cada carácter como
+        mucho tantas veces como aparece en la mejor ventana de ese largo
+        (si el comentario es el más corto, la cota es la de ratio con
+        min(len_p, len_c));
+      - token_sort_ratio <= 2z/(len_p + len_c) sobre los tokens ordenados,
+        con z = a más los espacios de la palabra;
+      - token_set_ratio: la intersección 'S' de tokens se calcula exacta con
+        el índice invertido, así que ratio(S, palabra) y ratio(S, comentario)
+        se conocen; el tercer ratio se acota como token_sort_ratio sobre los
+        tokens sin repetir.
+    Una palabra se descarta sólo si todas las cotas quedan por debajo del
+    umbral, por lo que el resultado es idéntico al de puntuar todas. Las
+    cotas de token_set_ratio y de partial_ratio de las que quedan sirven
+    además para no calcular esos métodos donde no pueden cambiar el puntaje
+    (ver puntajes_en_cascada).
+
+    Además, una palabra con medidas (ver canonizar_medidas) se descarta sin
+    puntuar si el comentario trae otra medida de la misma unidad y no la
+    suya, ni con unidad ni como número suelto: "tr 13.625in" y "tr 13.375in"
+    se parecen en más del 90% pero no son la misma partida, mientras que
+    "se bajo tr 20 a fondo" sigue siendo candidata para "tr 20in".
+    """
+
+    def __init__(self, palabras, umbral=UMBRAL_SIMILITUD):
+        self.palabras = list(palabras)
+        # fuzzywuzzy redondea cada método: basta con alcanzar umbral - 0.5
+        self.minimo = max(umbral - 0.5, 0) / 100
+        self.columnas = {c: i for i, c in enumerate(sorted(
+            {c for palabra in self.palabras for c in palabra if c.isalnum()}))}
+        self.conteos = np.zeros((len(self.palabras), len(self.columnas)), dtype=np.int32)
+        por_token = {}
+        por_unidad = {}
+        medidas = []
+
+        for j, palabra in enumerate(self.palabras):
+            for medida in medidas_texto(palabra):
+                por_unidad.setdefault(_valor_y_unidad(medida)[1], []).append((j, medida))
+            for c in palabra:
+                if c in self.columnas:
+                    self.conteos[j, self.columnas[c]] += 1
+            tokens = utils.default_process(palabra).split()
+            for token in set(tokens):
+                por_token.setdefault(token, []).append(j)
+            ordenados = " ".join(sorted(tokens))
+            sin_repetir = " ".join(sorted(set(tokens)))
+            medidas.append((
+                len(palabra),
+                sum(1 for c in palabra if not c.isalnum()),
+                len(ordenados),
+                ordenados.count(" "),
+                len(sin_repetir),
+                sin_repetir.count(" "),
+            ))
+
+        self.por_token = {token: np.array(ids, dtype=np.int64) for token, ids in por_token.items()}
+        # Por unidad: las medidas distintas y, por cada aparición, la palabra y
+        # cuál de ellas es
+        self.por_unidad = {}
+        for unidad, apariciones in por_unidad.items():
+            distintas = sorted({medida for _, medida in apariciones})
+            indice = {medida: k for k, medida in enumerate(distintas)}
+            self.por_unidad[unidad] = (
+                [(medida, _valor_y_unidad(medida)[0]) for medida in distintas],
+                np.array([j for j, _ in apariciones], dtype=np.int64),
+                np.array([indice[medida] for _, medida in apariciones], dtype=np.int64),
+            )
+        medidas = np.array(medidas, dtype=np.float64).reshape(-1, 6)
+        (self.longitudes, self.signos, self.largo_ordenados, self.espacios_ordenados,
+         self.largo_sin_repetir, self.espacios_sin_repetir) = medidas.T
+        self.largos_distintos, self.grupo_largo = np.unique(
+            self.longitudes.astype(np.int64), return_inverse=True)
+
+    def _alcanza(self, en_comun, largo):
+        """2*en_comun / largo >= minimo, sin dividir (largo puede ser 0)."""
+        # Pequeña tolerancia para no descartar por redondeo de punto flotante
+        return 2 * en_comun - self.minimo * largo >= -1e-9
+
+    @staticmethod
+    def _cota(en_comun, largo):
+        """2*en_comun / largo, o 1 si largo es 0 (no se puede acotar)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(largo > 0, 2 * en_comun / largo, 1.0)
+
+    def filtrar(self, comment, contadores=None):
+        """
+        Devuelve (posiciones, cota_token_set, cota_parcial): las posiciones en
+        'palabras' de las que podrían alcanzar el umbral contra 'comment' y,
+        para cada una, la cota superior (de 0 a 1) de token_set_ratio y de
+        ratio_parcial. Con 'contadores' se suman las palabras revisadas y las
+        descartadas por medida y por cotas.
+        """
+        if not self.palabras:
+            return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+        con_medidas = np.ones(len(self.palabras), dtype=bool)
+        medidas_comentario = medidas_texto(comment) if self.por_unidad else ()
+        if medidas_comentario:
+            numeros = set(_NUMERO.findall(comment))
+            for unidad in {_valor_y_unidad(medida)[1] for medida in medidas_comentario}:
+                if unidad not in self.por_unidad:
+                    continue
+                distintas, ids, cual = self.por_unidad[unidad]
+                # Medidas de esta unidad que el comentario tiene, con unidad o sin ella
+                tiene = np.array([medida in medidas_comentario or valor in numeros
+                                  for medida, valor in distintas])
+                con_medidas[ids[~tiene[cual]]] = False
+        # Conteos acumulados por carácter a lo largo del comentario
+        acumulados = np.zeros((len(comment) + 1, len(self.columnas)), dtype=np.int32)
+        for i, c in enumerate(comment, start=1):
+            if c in self.columnas:
+                acumulados[i, self.columnas[c]] = 1
+        acumulados = acumulados.cumsum(axis=0)
+        conteo_comentario = acumulados[-1]
+        en_comun = np.minimum(self.conteos, conteo_comentario).sum(axis=1)
+
+        # Máximo de cada carácter en una ventana de cada largo de palabra
+        por_ventana = np.empty((len(self.largos_distintos), len(self.columnas)), dtype=np.int32)
+        for g, largo in enumerate(self.largos_distintos):
+            if largo == 0 or largo >= len(comment):
+                por_ventana[g] = conteo_comentario
+            else:
+                por_ventana[g] = (acumulados[largo:] - acumulados[:-largo]).max(axis=0)
+        en_comun_ventana = np.minimum(self.conteos, por_ventana[self.grupo_largo]).sum(axis=1)
+
+        tokens = utils.default_process(comment).split()
+        largo_ordenados = len(" ".join(tokens))
+        tokens_sin_repetir = set(tokens)
+        largo_sin_repetir = len(" ".join(tokens_sin_repetir))
+        # Largo de la intersección de tokens unida con espacios
+        interseccion = np.full(len(self.palabras), -1.0)
+        for token in tokens_sin_repetir:
+            ids = self.por_token.get(token)
+            if ids is not None:
+                interseccion[ids] += len(token) + 1
+        interseccion = np.maximum(interseccion, 0)
+
+        z_directo = en_comun + self.signos
+        z_ventana = en_comun_ventana + self.signos
+        z_ordenados = en_comun + self.espacios_ordenados
+        z_sin_repetir = en_comun + self.espacios_sin_repetir
+        posiciones = np.flatnonzero(con_medidas & (
+            self._alcanza(z_directo, self.longitudes + len(comment))
+            | self._alcanza(z_ventana, np.minimum(self.longitudes, len(comment)) + z_ventana)
+            | self._alcanza(z_ordenados, self.largo_ordenados + largo_ordenados)
+            | self._alcanza(interseccion, interseccion + self.largo_sin_repetir)
+            | self._alcanza(interseccion, interseccion + largo_sin_repetir)
+            | self._alcanza(z_sin_repetir, self.largo_sin_repetir + largo_sin_repetir)
+        ))
+        if contadores is not None:
+            contadores["palabras_revisadas"] += len(self.palabras)
+            contadores["descartadas_por_medida"] += len(self.palabras) - int(con_medidas.sum())
+            contadores["descartadas_por_cotas"] += int(con_medidas.sum()) - len(posiciones)
+
+        # Cotas de los métodos caros, sólo para las que quedan
+        interseccion, z_sin_repetir = interseccion[posiciones], z_sin_repetir[posiciones]
+        largo_palabra = self.largo_sin_repetir[posiciones]
+        cota_token_set = np.maximum.reduce([
+            self._cota(interseccion, interseccion + largo_palabra),
+            self._cota(interseccion, interseccion + largo_sin_repetir),
+            self._cota(z_sin_repetir, largo_palabra + largo_sin_repetir),
+        ])
+        z_ventana = z_ventana[posiciones]
+        cota_parcial = self._cota(z_ventana, np.minimum(self.longitudes[posiciones], len(comment)) + z_ventana)
+        return posiciones, cota_token_set, cota_parcial
+
+    def candidatas(self, comment):
+        """
+        Devuelve las palabras que podrían alcanzar el umbral contra 'comment'.
+        """
+        return [self.palabras[j] for j in self.filtrar(comment)[0]]
+
+def limpiar_palabras(item):
+    """
+    Normaliza la lista de palabras de una partida de la API. Sin repetidos y
+    en el orden del catálogo, para que los empates se resuelvan igual en
+    cualquier proceso.
+    """
+    return list(dict.fromkeys(
+        normalizar_texto(p.strip())
+        for p in item.get("palabra", "").lower().split(",") if p.strip()
+    ))
+
+class CatalogoCompilado:
+    """
+    Catálogo listo para el matching. Cada palabra normalizada distinta se
+    guarda una sola vez (las 'palabras_limpias' de las partidas apuntan a la
+    misma cadena) y se puntúa una sola vez por comentario, aunque la
+    compartan muchas partidas.
+
+    Las apariciones de las palabras en el catálogo se numeran en el orden de
+    las partidas y de sus palabras; 'item_aparicion' y 'palabra_aparicion'
+    guardan la partida (su posición en 'items') y la palabra de cada una. El
+    mapa inverso palabra -> apariciones está en formato CSR: las apariciones
+    de la palabra j son apariciones[limites[j]:limites[j + 1]], en orden.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        posicion_palabra = {}
+        palabras = []
+        item_aparicion = []
+        palabra_aparicion = []
+        for i, item in enumerate(items):
+            limpias = item["palabras_limpias"]
+            for k, palabra in enumerate(limpias):
+                j = posicion_palabra.get(palabra)
+                if j is None:
+                    j = posicion_palabra[palabra] = len(palabras)
+                    palabras.append(palabra)
+                else:
+                    limpias[k] = palabras[j]  # Misma cadena para todas las partidas
+                item_aparicion.append(i)
+                palabra_aparicion.append(j)
+        self.posicion_palabra = posicion_palabra
+        self.item_aparicion = np.array(item_aparicion, dtype=np.int32)
+        self.palabra_aparicion = np.array(palabra_aparicion, dtype=np.int32)
+        self.apariciones = np.argsort(self.palabra_aparicion, kind="stable").astype(np.int32)
+        self.limites = np.zeros(len(palabras) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.palabra_aparicion, minlength=len(palabras)), out=self.limites[1:])
+
+        self.automata = AutomataPalabras(palabras)
+        self.palabras = self.automata.palabras
+        self.indice = IndiceCandidatos(self.palabras)
+
+    def apariciones_de(self, palabras):
+        """
+        Devuelve, ordenadas, las apariciones en el catálogo de las palabras dadas.
+        """
+        tramos = [self.apariciones[self.limites[j]:self.limites[j + 1]]
+                  for j in map(self.posicion_palabra.__getitem__, palabras)]
+        if not tramos:
+            return self.apariciones[:0]
+        return np.sort(np.concatenate(tramos))
+
+    def __len__(self):
+        return len(self.items)
+
+def preparar_catalogo(api_data):
+    """
+    Normaliza las palabras de cada partida de la API (en 'palabras_limpias')
+    y compila el catálogo: el autómata para la búsqueda de coincidencias
+    exactas, el índice de candidatas para el fuzzy matching y el mapa de
+    cada palabra a sus partidas. Las partidas que ya traen 'palabras_limpias'
+    (por ejemplo, desde la caché) no se vuelven a normalizar.
+    """
+    for item in api_data:
+        if "palabras_limpias" not in item:
+            item["palabras_limpias"] = limpiar_palabras(item)
+    return CatalogoCompilado(api_data)
+
+# Puntajes (palabra del catálogo, palabra del comentario) que se recuerdan
+# entre comentarios: el vocabulario de los reportes es chico y se repite
+MAXIMO_PUNTAJES_PALABRA = 1 << 16
+
+@functools.lru_cache(maxsize=MAXIMO_PUNTAJES_PALABRA)
+def puntaje_palabra(palabra, token):
+    """
+    mejor_fuzzy_score(palabra, token) con caché LRU; puntaje_palabra.cache_info()
+    da los aciertos y fallos del proceso.
+    """
+    return mejor_fuzzy_score(palabra, token)
+
+def seleccionar_palabra(palabra, comment):
+    """
+    Elige la palabra del comentario más parecida a la palabra del catálogo,
+    dando preferencia a las que la contienen y a las de 3 o más letras.
+    """
+    palabras_en_comentario = comment.split()
+    palabras_validas = [w for w in palabras_en_comentario if len(w) >= 3]
+    candidatas = [w for w in palabras_validas if palabra in w]
+    puntaje = functools.partial(puntaje_palabra, palabra)
+
+    if candidatas:
+        return max(candidatas, key=puntaje)
+    elif palabras_validas:
+        return max(palabras_validas, key=puntaje)
+    return max(palabras_en_comentario, key=puntaje)
+
+def coincidencias_comentario(comment, catalogo, diagnostico=None):
+    """
+    Compara un comentario ya normalizado contra las palabras del catálogo
+    compilado. Devuelve una lista de (posición de la partida, similitud,
+    palabra_encontrada) por cada palabra de cada partida que coincide
+    exactamente o con similitud de al menos UMBRAL_SIMILITUD, en el orden
+    del catálogo. Cada palabra distinta se puntúa una sola vez; sólo se
+    recorren las partidas de las palabras que coinciden.
+    Con 'diagnostico' se mide el tiempo de cada etapa (ver Diagnostico).
+    """
+    medicion = diagnostico.medir_comentario(comment) if diagnostico is not None else None
+    contadores = diagnostico.contadores if diagnostico is not None else None
+    exactas = catalogo.automata.buscar(comment)
+    if medicion:
+        medicion.marcar("exacta")
+    posiciones, cota_token_set, cota_parcial = catalogo.indice.filtrar(comment, contadores)
+    if exactas:
+        # Las exactas ya tienen 100: no se puntúan
+        sin_exactas = [catalogo.palabras[j] not in exactas for j in posiciones.tolist()]
+        posiciones, cota_token_set, cota_parcial = (
+            posiciones[sin_exactas], cota_token_set[sin_exactas], cota_parcial[sin_exactas])
+    pendientes = [catalogo.palabras[j] for j in posiciones.tolist()]
+    if medicion:
+        medicion.marcar("candidatas")
+    puntajes = puntajes_en_cascada(comment, pendientes, cota_token_set, cota_parcial,
+                                   contadores=contadores).tolist()
+    if medicion:
+        medicion.marcar("fuzzy")
+    # (similitud, palabra_encontrada) de cada palabra que coincide
+    encontradas = {palabra: (100, palabra) for palabra in exactas}
+    for palabra, similitud in zip(pendientes, puntajes):
+        if similitud >= UMBRAL_SIMILITUD:
+            encontradas[palabra] = (similitud, seleccionar_palabra(palabra, comment))
+            if medicion:
+                medicion.palabra(palabra)
+    apariciones = catalogo.apariciones_de(encontradas)
+    palabras = catalogo.palabras
+    coincidencias = [(i,) + encontradas[palabras[j]] for i, j in zip(
+        catalogo.item_aparicion[apariciones].tolist(), catalogo.palabra_aparicion[apariciones].tolist())]
+    if medicion:
+        medicion.terminar(len(pendientes))
+    return coincidencias
+
+def analizar_comentario(comment, catalogo, diagnostico=None):
+    """
+    Como coincidencias_comentario, pero con la partida (el item de la API)
+    en lugar de su posición.
+    """
+    items = catalogo.items
+    return [(items[i], similitud, palabra_encontrada)
+            for i, similitud, palabra_encontrada in coincidencias_comentario(comment, catalogo, diagnostico)]
+
+class ContextoValidacion:
+    """
+    Lo que comparten las partidas detectadas de una validación contra un
+    contrato: el contrato_info como texto, armado una sola vez, y 'textos',
+    el comentario de cada fila a la que apunta alguna partida (el mismo
+    diccionario para todos los contratos de la validación).
+    """
+    __slots__ = ("textos", "contrato_info")
+
+    def __init__(self, textos, contrato_info):
+        self.textos = textos
+        self.contrato_info = str(contrato_info)
+
+class PartidaDetectada:
+    """
+    Resultado de una partida: la cantidad, la mejor similitud y su palabra,
+    y la fila del comentario con esa similitud (su posición en los
+    comentarios; en un libro de Excel, la fila fila + 2). La descripción,
+    la unidad y el precio se leen del item del catálogo, y texto_evaluado y
+    contrato_info del contexto, sólo cuando se piden.
+
+    'filas', si se pidió, es un array con todas las filas que la sumaron.
+    Se lee también como diccionario (datos["cantidad"], datos.get(...)),
+    con las claves de CAMPOS.
+    """
+    __slots__ = ("item", "cantidad", "similitud", "palabra_coincidente", "fila", "filas", "contexto")
+    CAMPOS = ("descripcion", "unidad_medida", "precio_unitario", "cantidad", "similitud",
+              "palabra_coincidente", "texto_evaluado", "contrato_info", "fila", "filas")
+
+    def __init__(self, item, cantidad, similitud, palabra_coincidente, fila, contexto, filas=None):
+        self.item = item
+        self.cantidad = cantidad
+        self.similitud = similitud
+        self.palabra_coincidente = palabra_coincidente
+        self.fila = fila
+        self.contexto = contexto
+        self.filas = None if filas is None else array("I", filas)
+
+    @property
+    def descripcion(self):
+        return self.item["descripcion"]
+
+    @property
+    def unidad_medida(self):
+        return self.item["unidadMedida"]
+
+    @property
+    def precio_unitario(self):
+        return self.item["precioUnitario"]
+
+    @property
+    def texto_evaluado(self):
+        return self.contexto.textos.get(self.fila, "")
+
+    @property
+    def contrato_info(self):
+        return self.contexto.contrato_info
+
+    def __getitem__(self, campo):
+        if campo not in self.CAMPOS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __setitem__(self, campo, valor):
+        if campo not in self.CAMPOS:
+            raise KeyError(campo)
+        setattr(self, campo, valor)
+
+    def __contains__(self, campo):
+        return campo in self.CAMPOS
+
+    def get(self, campo, defecto=None):
+        return getattr(self, campo) if campo in self.CAMPOS else defecto
+
+    def keys(self):
+        return self.CAMPOS
+
+    def como_diccionario(self):
+        """
+        Los campos en un diccionario que se puede convertir a JSON.
+        """
+        datos = {campo: self[campo] for campo in self.CAMPOS}
+        if datos["filas"] is not None:
+            datos["filas"] = datos["filas"].tolist()
+        return datos
+
+def registrar_partida(partidas_detectadas, item, similitud, palabra_encontrada, fila, contexto,
+                      veces=1, filas=None):
+    """
+    Guarda o actualiza la partida en partidas_detectadas: suma la cantidad
+    ('veces' cuando varias filas tienen el mismo comentario) y conserva la
+    palabra y la fila del comentario de mayor similitud. Con 'filas' (las
+    filas con ese comentario) se acumulan también en la partida.
+    """
+    partida = item["partida"]
+    datos = partidas_detectadas.get(partida)
+    if datos is None:
+        partidas_detectadas[partida] = PartidaDetectada(item, veces, similitud, palabra_encontrada,
+                                                        fila, contexto, filas)
+    else:
+        datos.cantidad += veces
+        if similitud > datos.similitud:
+            datos.similitud = similitud
+            datos.palabra_coincidente = palabra_encontrada
+            datos.fila = fila
+        if filas is not None:
+            datos.filas.extend(filas)
+
+# Procesos para el matching en paralelo. Con menos comentarios distintos que
+# MINIMO_PARALELO se procesa en serie: arrancar los procesos cuesta más.
+TRABAJADORES = os.cpu_count() or 1
+MINIMO_PARALELO = 500
+# Comentarios distintos por bloque como máximo, para que el avance y la
+# cancelación respondan pronto aun con pocos procesos
+MAXIMO_BLOQUE = 200
+# Filas leídas entre una revisión de la cancelación y la siguiente mientras
+# se recorre el archivo, antes de saber cuántas filas tiene
+FILAS_AVANCE_LECTURA = 2000
+
+class ValidacionCancelada(Exception):
+    """
+    Se lanza cuando se cancela una validación en curso.
+    """
+
+# Catálogos compilados que cada proceso recibe una sola vez al arrancar
+_catalogos_trabajador = None
+
+def _iniciar_trabajador(catalogos):
+    global _catalogos_trabajador
+    _catalogos_trabajador = catalogos
+
+def _coincidencias_bloque(tarea):
+    # Cada bloque devuelve también su propio diagnóstico, que se combina en el proceso principal
+    pendientes, diagnosticar = tarea
+    diagnostico = Diagnostico() if diagnosticar else None
+    resultados = [[coincidencias_comentario(comment, _catalogos_trabajador[nombre], diagnostico)
+                   for nombre in nombres]
+                  for comment, _, nombres in pendientes]
+    if diagnostico is not None:
+        diagnostico.registrar_puntajes()
+    return resultados, diagnostico
+
+class GrupoProcesos:
+    """
+    Procesos de trabajo que siguen vivos entre validaciones con los
+    catálogos compilados ya cargados, para no arrancar procesos ni volver a
+    enviarles los catálogos en cada una (por ejemplo, en el servicio).
+
+    Los catálogos se identifican por su nombre. Si una validación trae otra
+    versión de alguno (otro CatalogoCompilado, como el que arma
+    CatalogosPrecargados cuando el catálogo cambió), se arranca un grupo
+    nuevo con los vigentes; el anterior termina los bloques que ya tenía.
+    """
+
+    def __init__(self, trabajadores=TRABAJADORES):
+        self.trabajadores = trabajadores
+        self.catalogos = {}
+        self.ejecutor = None
+        self.arranques = 0
+        self.candado = threading.Lock()
+
+    def _arrancar(self, catalogos):
+        if self.ejecutor is not None:
+            self.ejecutor.shutdown(wait=False)
+        self.catalogos = catalogos
+        self.ejecutor = ProcessPoolExecutor(max_workers=self.trabajadores, initializer=_iniciar_trabajador,
+                                            initargs=(catalogos,))
+        self.arranques += 1
+
+    def enviar(self, funcion, tareas, catalogos):
+        """
+        Envía funcion(tarea) por cada tarea a procesos que tienen cargados
+        'catalogos' ({nombre: CatalogoCompilado}) y devuelve los Future en
+        el mismo orden.
+        """
+        with self.candado:
+            vigentes = self.ejecutor is not None and all(
+                self.catalogos.get(nombre) is catalogo for nombre, catalogo in catalogos.items())
+            if not vigentes:
+                self._arrancar({**self.catalogos, **catalogos})
+            try:
+                return [self.ejecutor.submit(funcion, tarea) for tarea in tareas]
+            except BrokenExecutor:
+                # Algún proceso murió en una validación anterior: se arranca de nuevo
+                self._arrancar(self.catalogos)
+                return [self.ejecutor.submit(funcion, tarea) for tarea in tareas]
+
+    def cerrar(self):
+        with self.candado:
+            if self.ejecutor is not None:
+                self.ejecutor.shutdown(wait=False, cancel_futures=True)
+                self.ejecutor = None
+
+def _en_paralelo(funcion, grupos, trabajadores, catalogos, diagnosticar=False, procesos=None):
+    """
+    Reparte 'grupos' en bloques entre procesos que reciben los catálogos
+    compilados una vez, y entrega (bloque, funcion((bloque, diagnosticar)))
+    en el orden de los bloques. Con 'procesos' (un GrupoProcesos) se usan
+    sus procesos en lugar de arrancar otros.
+    """
+    if procesos is not None:
+        trabajadores = procesos.trabajadores
+    # Varios bloques por proceso para repartir mejor los comentarios largos
+    tam_bloque = min(-(-len(grupos) // (trabajadores * 4)), MAXIMO_BLOQUE)
+    bloques = [grupos[i:i + tam_bloque] for i in range(0, len(grupos), tam_bloque)]
+    tareas = [(bloque, diagnosticar) for bloque in bloques]
+    if procesos is None:
+        ejecutor = ProcessPoolExecutor(max_workers=trabajadores, initializer=_iniciar_trabajador,
+                                       initargs=(catalogos,))
+        futuros = [ejecutor.submit(funcion, tarea) for tarea in tareas]
+    else:
+        ejecutor = None
+        futuros = procesos.enviar(funcion, tareas, catalogos)
+    try:
+        for bloque, futuro in zip(bloques, futuros):
+            yield bloque, futuro.result()
+    except BaseException:
+        # No esperar a los bloques pendientes si se cancela o algo falla
+        for futuro in futuros:
+            futuro.cancel()
+        if ejecutor is not None:
+            ejecutor.shutdown(wait=False, cancel_futures=True)
+        raise
+    if ejecutor is not None:
+        ejecutor.shutdown()
+
+def procesar_contratos(comentarios, contratos, agrupar=True, trabajadores=1, progreso=None,
+                       cancelar=None, caches=None, diagnostico=None, trazar_filas=False,
+                       progreso_lectura=None, procesos=None):
+    """
+    Aplica el matching a cada comentario ya normalizado contra el catálogo de
+    cada contrato, en una sola pasada sobre los comentarios. 'contratos' va
+    del nombre de cada contrato a (catalogo, contrato_info); devuelve
+    {nombre: partidas_detectadas}.
+
+    Con 'agrupar', los comentarios idénticos se analizan una sola vez (en el
+    orden de su primera aparición) y su resultado se suma tantas veces como
+    filas los repiten; partidas_detectadas queda igual que fila por fila.
+    Cada partida (una PartidaDetectada) guarda la fila de su mejor
+    comentario y sólo se conservan los comentarios de esas filas; con
+    'trazar_filas' guarda además todas las filas que la sumaron.
+
+    Con 'trabajadores' > 1 los comentarios se reparten en bloques entre
+    procesos, que reciben los catálogos compilados una vez. Las
+    coincidencias se registran siempre en el orden de los comentarios, así
+    que el resultado es el mismo que en serie. Con 'procesos' (un
+    GrupoProcesos) se usan sus procesos, ya arrancados y con los catálogos
+    cargados, y 'trabajadores' no cuenta.
+
+    'progreso(filas, total)' se llama a medida que avanzan las filas y, si el
+    evento 'cancelar' se activa, se lanza ValidacionCancelada. Mientras se
+    recorren los comentarios (por ejemplo, al leer el archivo) la
+    cancelación se revisa cada FILAS_AVANCE_LECTURA filas y se llama a
+    'progreso_lectura(filas)' con las leídas hasta ese momento.
+
+    'caches' puede tener una CacheResultados por contrato: cada comentario se
+    analiza sólo contra los catálogos cuya caché no lo tiene, y el resultado
+    es el mismo que sin caché.
+
+    Con 'diagnostico' (un Diagnostico) se registran los tiempos y conteos de
+    cada etapa, también los de los procesos de trabajo.
+    """
+    if diagnostico is not None:
+        inicio = time.perf_counter()
+        normalizacion_previa = diagnostico.etapas["normalizacion"]
+    def leer():
+        # (fila, comentario) de cada fila, revisando la cancelación cada tanto
+        for fila, comment in enumerate(comentarios):
+            if fila and fila % FILAS_AVANCE_LECTURA == 0:
+                if cancelar is not None and cancelar.is_set():
+                    raise ValidacionCancelada()
+                if progreso_lectura:
+                    progreso_lectura(fila)
+            yield fila, comment
+
+    # Primera fila de cada comentario distinto y, con 'trazar_filas', todas
+    if agrupar:
+        primeras = {}
+        filas_comentario = {} if trazar_filas else None
+        conteo = Counter()
+        for fila, comment in leer():
+            if comment not in primeras:
+                primeras[comment] = fila
+                if trazar_filas:
+                    filas_comentario[comment] = array("I")
+            conteo[comment] += 1
+            if trazar_filas:
+                filas_comentario[comment].append(fila)
+        grupos = list(conteo.items())
+        primeras = [primeras[comment] for comment, _ in grupos]
+        filas_grupo = [filas_comentario[comment] for comment, _ in grupos] if trazar_filas else None
+    else:
+        grupos = [(comment, 1) for _, comment in leer()]
+        primeras = range(len(grupos))
+        filas_grupo = [array("I", [fila]) for fila in primeras] if trazar_filas else None
+    if diagnostico is not None:
+        # Al agrupar se recorre el archivo; la normalización se mide aparte
+        normalizacion = diagnostico.etapas["normalizacion"] - normalizacion_previa
+        diagnostico.sumar("lectura", time.perf_counter() - inicio - normalizacion)
+
+    total = sum(veces for _, veces in grupos)
+    filas = 0
+
+    def avance(veces):
+        nonlocal filas
+        if cancelar is not None and cancelar.is_set():
+            raise ValidacionCancelada()
+        filas += veces
+        if progreso:
+            progreso(filas, total)
+
+    caches = caches or {}
+    catalogos = {nombre: catalogo for nombre, (catalogo, _) in contratos.items()}
+    if diagnostico is not None:
+        diagnostico.contadores["filas"] += total
+        diagnostico.contadores["comentarios_distintos"] += len(grupos)
+
+    # Coincidencias de la validación anterior por contrato; 'faltantes' tiene,
+    # por cada grupo, los contratos contra los que hay que analizarlo
+    conocidas = {nombre: {} for nombre in contratos}
+    faltantes = []
+    pendientes = []
+    for comment, veces in grupos:
+        faltan = []
+        for nombre in contratos:
+            cache = caches.get(nombre)
+            coincidencias = None if cache is None else cache.buscar(comment)
+            if coincidencias is None:
+                faltan.append(nombre)
+            else:
+                conocidas[nombre][comment] = coincidencias
+        faltantes.append(bool(faltan))
+        if faltan:
+            pendientes.append((comment, veces, tuple(faltan)))
+    avance(total - sum(veces for _, veces, _ in pendientes))
+    if diagnostico is not None:
+        diagnostico.contadores["comentarios_reutilizados"] += len(grupos) - len(pendientes)
+
+    def analizar_pendientes():
+        # Entrega las coincidencias de cada pendiente, en orden
+        paralelos = procesos.trabajadores if procesos is not None else trabajadores
+        if paralelos <= 1 or len(pendientes) < MINIMO_PARALELO:
+            for comment, _, nombres in pendientes:
+                yield [coincidencias_comentario(comment, catalogos[nombre], diagnostico)
+                       for nombre in nombres]
+            return
+        for bloque, (resultados, diagnostico_bloque) in _en_paralelo(
+                _coincidencias_bloque, pendientes, trabajadores, catalogos, diagnostico is not None,
+                procesos):
+            if diagnostico is not None:
+                diagnostico.combinar(diagnostico_bloque)
+            yield from resultados
+
+    resultados = {nombre: {} for nombre in contratos}
+    textos = {}
+    contextos = {nombre: ContextoValidacion(textos, contrato_info)
+                 for nombre, (_, contrato_info) in contratos.items()}
+    analizados = analizar_pendientes()
+    indice_pendiente = 0
+    for indice_grupo, ((comment, veces), falta) in enumerate(zip(grupos, faltantes)):
+        nuevas = {}
+        if falta:
+            _, _, nombres = pendientes[indice_pendiente]
+            indice_pendiente += 1
+            nuevas = dict(zip(nombres, next(analizados)))
+        inicio = time.perf_counter() if diagnostico is not None else 0
+        for nombre, (catalogo, _) in contratos.items():
+            if nombre in nuevas:
+                compactas = nuevas[nombre]
+                if nombre in caches:
+                    caches[nombre].agregar(comment, compactas)
+                coincidencias = [(catalogo.items[i], similitud, palabra) for i, similitud, palabra in compactas]
+            else:
+                coincidencias = conocidas[nombre][comment]
+            for item, similitud, palabra_encontrada in coincidencias:
+                registrar_partida(resultados[nombre], item, similitud, palabra_encontrada,
+                                  primeras[indice_grupo], contextos[nombre], veces,
+                                  None if filas_grupo is None else filas_grupo[indice_grupo])
+        if diagnostico is not None:
+            diagnostico.sumar("agregacion", time.perf_counter() - inicio)
+        if falta:
+            avance(veces)
+
+    # Sólo se conservan los comentarios de las filas a las que apunta alguna partida
+    usadas = {datos.fila for partidas_detectadas in resultados.values()
+              for datos in partidas_detectadas.values()}
+    if trazar_filas:
+        # Las filas se sumaron por comentario; se dejan en el orden del libro
+        for partidas_detectadas in resultados.values():
+            for datos in partidas_detectadas.values():
+                datos.filas = array("I", sorted(datos.filas))
+    textos.update((fila, comment) for (comment, _), fila in zip(grupos, primeras) if fila in usadas)
+    return resultados
+
+def procesar_comentarios(comentarios, catalogo, contrato_info,
+                         agrupar=True, trabajadores=1, progreso=None, cancelar=None, cache=None,
+                         diagnostico=None):
+    """
+    Aplica el matching a cada comentario ya normalizado y devuelve las
+    partidas detectadas: es procesar_contratos con un solo contrato. Con
+    'cache' (una CacheResultados) sólo se analizan los comentarios que no
+    están en la validación anterior del mismo libro.
+    """
+    return procesar_contratos(comentarios, {"": (catalogo, contrato_info)}, agrupar=agrupar,
+                              trabajadores=trabajadores, progreso=progreso, cancelar=cancelar,
+                              caches=None if cache is None else {"": cache},
+                              diagnostico=diagnostico)[""]
+
+def comparar_contratos(resultados):
+    """
+    Totales de cada contrato para verlos lado a lado: una fila por contrato
+    con el número de partidas, la cantidad total y el importe (cantidad por
+    precio unitario).
+    """
+    return [{
+        "contrato": nombre,
+        "partidas": len(partidas_detectadas),
+        "cantidad": sum(datos["cantidad"] for datos in partidas_detectadas.values()),
+        "importe": sum(datos["cantidad"] * datos["precio_unitario"]
+                       for datos in partidas_detectadas.values()),
+    } for nombre, partidas_detectadas in resultados.items()]
+
+# =============================================================================
+# CATÁLOGO, ARCHIVOS DE ENTRADA Y RESULTADOS
+# =============================================================================
+
+URLS_CONTRATO = {
+    "A": "https://python.apiigrtec.site/api/PalabrasRelacionadas",
+    "B": "https://python.apiigrtec.site/api/PalabrasRelacionadas/GetPalabrasRelacionadas1",
+}
+# Segundos de espera máximos por la conexión y por la respuesta de la API
+TIEMPO_CONEXION_API = 10
+TIEMPO_ESPERA_API = 60
+# Reintentos ante fallas de red o errores 5xx pasajeros, con espera creciente
+REINTENTOS_API = 3
+
+COLUMNAS_EXCEL = {
+    "Palabra Relacionada": "palabra",
+    "Partida": "partida",
+    "Descripción": "descripcion",
+    "Unidad de Medida": "unidad_medida",
+    "Precio Unitario (USD)": "precio_unitario",
+    "Etapa": "etapa",
+    "Comments": "comments"
+}
+
+FORMATOS_SALIDA = ("xlsx", "csv", "json", "jsonl", "parquet")
+COLUMNAS_RESULTADOS = ("Partida", "descripcion", "unidad_medida", "precio_unitario", "cantidad",
+                       "similitud", "palabra_coincidente", "texto_evaluado", "contrato_info", "Total")
+# Filas por grupo al escribir Parquet: acota la memoria sin hacer el archivo lento de leer
+FILAS_GRUPO_PARQUET = 20_000
+
+def crear_sesion():
+    """
+    Sesión HTTP que reutiliza las conexiones con la API y reintenta las
+    fallas de red y los errores 502/503/504.
+    """
+    reintentos = Retry(total=REINTENTOS_API, backoff_factor=0.5,
+                       status_forcelist=(502, 503, 504), raise_on_status=False)
+    adaptador = HTTPAdapter(max_retries=reintentos, pool_maxsize=len(URLS_CONTRATO))
+    sesion = requests.Session()
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    return sesion
+
+def cargar_catalogo(fuente, sesion=None):
+    """
+    Obtiene el catálogo de PalabrasRelacionadas desde la URL de la API o desde
+    un archivo JSON local con la misma estructura.
+    """
+    if fuente.startswith(("http://", "https://")):
+        response = (sesion or requests).get(fuente, timeout=(TIEMPO_CONEXION_API, TIEMPO_ESPERA_API))
+        if response.status_code != 200:
+            raise requests.HTTPError(
+                f"La API respondió con el código {response.status_code}", response=response)
+        return response.json()
+    with open(fuente, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+# Caché local del catálogo: un archivo JSON por URL con la respuesta de la API
+# (ya con 'palabras_limpias'), su ETag/Last-Modified y la hora en que se
+# guardó. Dentro de VIGENCIA_CACHE segundos se usa sin consultar la API.
+DIRECTORIO_CACHE = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "analizador", "catalogos"
+)
+VIGENCIA_CACHE = 5 * 60
+# Cambiarla cuando cambie normalizar_texto, para no reutilizar palabras_limpias
+# normalizadas con la versión anterior
+VERSION_CACHE = 4
+
+def ruta_cache(url, directorio=DIRECTORIO_CACHE):
+    return os.path.join(directorio, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+def _leer_cache(ruta):
+    """
+    Devuelve el contenido de la caché, o None si no existe o está dañada.
+    """
+    try:
+        with open(ruta, encoding="utf-8") as archivo:
+            cache = json.load(archivo)
+        if not isinstance(cache.get("datos"), list) or not isinstance(cache.get("guardado"), (int, float)):
+            return None
+    except (OSError, ValueError, AttributeError):
+        return None
+    if cache.get("version") != VERSION_CACHE:
+        for item in cache["datos"]:
+            item["palabras_limpias"] = limpiar_palabras(item)
+        cache["version"] = VERSION_CACHE
+    return cache
+
+def _guardar_cache(ruta, cache):
+    """
+    Escribe la caché en un archivo temporal y lo renombra, para que otro
+    proceso nunca lea un archivo a medio escribir. No poder escribirla no
+    impide validar.
+    """
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+        try:
+            # json.dumps usa el codificador en C; json.dump escribe con el de Python
+            with os.fdopen(descriptor, "w", encoding="utf-8") as archivo:
+                archivo.write(json.dumps(cache, ensure_ascii=False))
+            os.replace(temporal, ruta)
+        except BaseException:
+            os.remove(temporal)
+            raise
+    except OSError:
+        pass
+
+def cargar_catalogo_cache(url, directorio=DIRECTORIO_CACHE, vigencia=VIGENCIA_CACHE, sesion=None):
+    """
+    Obtiene el catálogo de la API pasando por la caché local y devuelve
+    (api_data, estado). Las partidas ya traen 'palabras_limpias'.
+
+    Con una copia de menos de 'vigencia' segundos no se consulta la API. Si
+    es más vieja se revalida con If-None-Match/If-Modified-Since, y si la API
+    no responde se usa la copia local sea cual sea su antigüedad. 'estado'
+    es un diccionario con 'origen' ("cache", "revalidado", "api" o
+    "sin_conexion"), 'antiguedad', los segundos desde que se descargó o
+    confirmó la copia usada, y 'huella', el SHA-1 de la respuesta de la API
+    (None si no se conoce), que cambia sólo cuando cambia el catálogo.
+    """
+    ruta = ruta_cache(url, directorio)
+    cache = _leer_cache(ruta)
+    ahora = time.time()
+    if cache is not None and 0 <= ahora - cache["guardado"] < vigencia:
+        return cache["datos"], {"origen": "cache", "antiguedad": ahora - cache["guardado"],
+                                "huella": cache.get("huella")}
+
+    encabezados = {}
+    if cache is not None:
+        if cache.get("etag"):
+            encabezados["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            encabezados["If-Modified-Since"] = cache["last_modified"]
+    try:
+        response = (sesion or requests).get(url, headers=encabezados,
+                                            timeout=(TIEMPO_CONEXION_API, TIEMPO_ESPERA_API))
+        if response.status_code == 304 and cache is not None:
+            cache["guardado"] = ahora
+            _guardar_cache(ruta, cache)
+            return cache["datos"], {"origen": "revalidado", "antiguedad": 0,
+                                    "huella": cache.get("huella")}
+        if response.status_code != 200:
+            raise requests.HTTPError(
+                f"La API respondió con el código {response.status_code}", response=response)
+        api_data = response.json()
+    except (requests.RequestException, ValueError):
+        if cache is None:
+            raise
+        return cache["datos"], {"origen": "sin_conexion", "antiguedad": ahora - cache["guardado"],
+                                "huella": cache.get("huella")}
+
+    for item in api_data:
+        item["palabras_limpias"] = limpiar_palabras(item)
+    huella = hashlib.sha1(response.content).hexdigest()
+    _guardar_cache(ruta, {
+        "version": VERSION_CACHE,
+        "url": url,
+        "guardado": ahora,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "huella": huella,
+        "datos": api_data,
+    })
+    return api_data, {"origen": "api", "antiguedad": 0, "huella": huella}
+
+class CatalogosPrecargados:
+    """
+    Descarga y compila catálogos en hilos de fondo para que estén listos
+    cuando se necesitan. obtener(url) devuelve un Future con un diccionario
+    {"catalogo", "estado"}: el de la precarga si sigue vigente, o uno nuevo
+    que pasa por la caché local. Si la API confirma que el catálogo no
+    cambió, se reutiliza el CatalogoCompilado anterior.
+    """
+
+    def __init__(self, sesion=None, vigencia=VIGENCIA_CACHE, directorio=DIRECTORIO_CACHE):
+        self.sesion = sesion or crear_sesion()
+        self.vigencia = vigencia
+        self.directorio = directorio
+        self.futuros = {}
+        self.cargados = {}
+        self.candado = threading.Lock()
+
+    def _compilar(self, url, anterior):
+        api_data, estado = cargar_catalogo_cache(url, self.directorio, self.vigencia, self.sesion)
+        if anterior is not None and estado["huella"] and estado["huella"] == anterior["estado"]["huella"]:
+            catalogo = dict(anterior, estado=estado)
+        else:
+            catalogo = {"catalogo": preparar_catalogo(api_data), "estado": estado}
+        with self.candado:
+            self.cargados[url] = time.monotonic()
+        return catalogo
+
+    def obtener(self, url):
+        """
+        Devuelve el Future del catálogo de 'url'. Lanza una nueva carga si no
+        hay ninguna, si la anterior falló o si ya pasó la vigencia.
+        """
+        with self.candado:
+            futuro = self.futuros.get(url)
+            anterior = None
+            if futuro is not None and futuro.done():
+                if futuro.exception() is not None:
+                    futuro = None
+                elif time.monotonic() - self.cargados[url] >= self.vigencia:
+                    anterior = futuro.result()
+                    futuro = None
+            if futuro is None:
+                futuro = self.futuros[url] = Future()
+                # Hilo daemon: una API que no responde no debe impedir cerrar el programa
+                threading.Thread(target=self._cargar, args=(futuro, url, anterior),
+                                 name="catalogo", daemon=True).start()
+            return futuro
+
+    def _cargar(self, futuro, url, anterior):
+        if not futuro.set_running_or_notify_cancel():
+            return
+        try:
+            futuro.set_result(self._compilar(url, anterior))
+        except BaseException as e:
+            futuro.set_exception(e)
+
+# Resultados por libro de la última validación, para volver a analizar sólo
+# los comentarios nuevos o modificados
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(DIRECTORIO_CACHE), "resultados")
+# Los resultados de libros que no se validan hace más de VIGENCIA_RESULTADOS
+# segundos se borran, y si el directorio pasa de MAXIMO_BYTES_RESULTADOS, los
+# usados hace más tiempo
+VIGENCIA_RESULTADOS = 30 * 86400
+MAXIMO_BYTES_RESULTADOS = 256 * 1024 * 1024
+
+def huella_texto(texto):
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+def claves_items(api_data):
+    """
+    Clave de cada partida del catálogo que cambia sólo si cambian su número o
+    sus palabras, lo único de lo que dependen las coincidencias. Las
+    partidas repetidas se numeran para no confundirlas.
+    """
+    vistas = Counter()
+    claves = []
+    for item in api_data:
+        clave = huella_texto(json.dumps([item["partida"], item["palabras_limpias"]], ensure_ascii=False))
+        vistas[clave] += 1
+        claves.append(clave if vistas[clave] == 1 else f"{clave}#{vistas[clave]}")
+    return claves
+
+def podar_resultados(directorio=DIRECTORIO_RESULTADOS, vigencia=VIGENCIA_RESULTADOS,
+                     maximo_bytes=MAXIMO_BYTES_RESULTADOS, conservar=()):
+    """
+    Borra del directorio los resultados sin usar hace más de 'vigencia'
+    segundos y, si aun así ocupan más de 'maximo_bytes', los usados hace
+    más tiempo hasta quedar dentro. Los archivos de 'conservar' no se
+    borran. No poder borrarlos no impide validar.
+    """
+    conservar = {os.path.normcase(os.path.abspath(ruta)) for ruta in conservar}
+    archivos = []
+    try:
+        with os.scandir(directorio) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith(".json") and entrada.is_file():
+                    info = entrada.stat()
+                    archivos.append((info.st_mtime, info.st_size, entrada.path))
+    except OSError:
+        return
+    # Del usado hace más tiempo al más reciente
+    archivos.sort()
+    limite = time.time() - vigencia
+    total = sum(tamano for _, tamano, _ in archivos)
+    for usado, tamano, ruta in archivos:
+        if usado >= limite and total <= maximo_bytes:
+            break
+        if os.path.normcase(os.path.abspath(ruta)) in conservar:
+            continue
+        try:
+            os.remove(ruta)
+        except OSError:
+            continue
+        total -= tamano
+
+class CacheResultados:
+    """
+    Coincidencias por comentario de la última validación de un libro. Cada
+    coincidencia guarda la posición de la partida en 'items', la lista de
+    claves del catálogo con que se validó.
+
+    Si el catálogo cambió desde entonces, las coincidencias con partidas que
+    no cambiaron se reutilizan, las de partidas eliminadas o modificadas se
+    descartan y cada comentario reutilizado se compara sólo contra las
+    partidas nuevas o modificadas. Si cambió más de la mitad del catálogo,
+    o la versión del matching, la caché se descarta completa.
+
+    Al guardar sólo se conservan los comentarios del libro actual y se
+    podan los resultados de otros libros (ver podar_resultados). Con
+    'contrato' (por ejemplo, la URL del catálogo) cada contrato tiene su
+    propia caché del libro.
+    """
+
+    def __init__(self, file_path, catalogo, directorio=DIRECTORIO_RESULTADOS, contrato=""):
+        ruta_libro = os.path.normcase(os.path.abspath(file_path))
+        if contrato:
+            ruta_libro = f"{ruta_libro}\n{contrato}"
+        self.directorio = directorio
+        self.ruta = os.path.join(directorio, huella_texto(ruta_libro) + ".json")
+        api_data = catalogo.items
+        self.api_data = api_data
+        self.claves = claves_items(api_data)
+        self.posicion_clave = {clave: i for i, clave in enumerate(self.claves)}
+        self.actuales = {}
+        self.reutilizados = 0
+        self.analizados = 0
+
+        try:
+            with open(self.ruta, encoding="utf-8") as archivo:
+                guardada = json.load(archivo)
+            valida = (guardada.get("version") == VERSION_CACHE
+                      and guardada.get("umbral") == UMBRAL_SIMILITUD
+                      and isinstance(guardada.get("items"), list)
+                      and isinstance(guardada.get("comentarios"), dict))
+        except (OSError, ValueError, AttributeError):
+            valida = False
+        if not valida:
+            guardada = {"items": [], "comentarios": {}}
+        self.anteriores = guardada["items"]
+        vigentes = set(self.anteriores)
+        # Posiciones de las partidas nuevas o modificadas, y su catálogo
+        # compilado aparte (se arma la primera vez que hace falta)
+        self.nuevos = [i for i, clave in enumerate(self.claves) if clave not in vigentes]
+        self.catalogo_nuevos = None
+        # Posición actual de cada partida de la validación anterior (None si ya no está)
+        self.traduccion = [self.posicion_clave.get(clave) for clave in self.anteriores]
+        # Sólo hace falta reordenar las coincidencias si hay partidas nuevas o
+        # si el catálogo cambió de orden
+        presentes = [i for i in self.traduccion if i is not None]
+        self.reordenar = bool(self.nuevos) or any(a > b for a, b in zip(presentes, presentes[1:]))
+        if len(self.nuevos) > len(api_data) // 2:
+            self.guardados = {}
+        else:
+            self.guardados = guardada["comentarios"]
+
+    def buscar(self, comment):
+        """
+        Devuelve las coincidencias (item, similitud, palabra_encontrada) del
+        comentario en el orden del catálogo, o None si hay que analizarlo.
+        """
+        huella = huella_texto(comment)
+        compactas = self.actuales.get(huella)
+        if compactas is None:
+            guardadas = self.guardados.get(huella)
+            if guardadas is None:
+                return None
+            try:
+                compactas = [(self.traduccion[i], similitud, palabra)
+                             for i, similitud, palabra in guardadas if self.traduccion[i] is not None]
+            except (IndexError, TypeError, ValueError):
+                return None  # Entrada dañada: se vuelve a analizar
+            if self.nuevos:
+                if self.catalogo_nuevos is None:
+                    self.catalogo_nuevos = CatalogoCompilado([self.api_data[i] for i in self.nuevos])
+                compactas += [(self.nuevos[i], similitud, palabra) for i, similitud, palabra
+                              in coincidencias_comentario(comment, self.catalogo_nuevos)]
+            if self.reordenar:
+                # Estable: dentro de una partida se conserva el orden de sus palabras
+                compactas.sort(key=lambda coincidencia: coincidencia[0])
+            self.actuales[huella] = compactas
+            self.reutilizados += 1
+        return [(self.api_data[i], similitud, palabra) for i, similitud, palabra in compactas]
+
+    def agregar(self, comment, compactas):
+        self.actuales[huella_texto(comment)] = compactas
+        self.analizados += 1
+
+    def guardar(self):
+        sin_cambios = (self.analizados == 0 and len(self.actuales) == len(self.guardados)
+                       and self.claves == self.anteriores)
+        if sin_cambios:
+            # Se marca como usada, para que no se pode por antigua
+            try:
+                os.utime(self.ruta)
+            except OSError:
+                pass
+        else:
+            _guardar_cache(self.ruta, {
+                "version": VERSION_CACHE,
+                "umbral": UMBRAL_SIMILITUD,
+                "items": self.claves,
+                "comentarios": self.actuales,
+            })
+        podar_resultados(self.directorio, conservar=(self.ruta,))
+
+def formatear_antiguedad(segundos):
+    if segundos < 60:
+        return "unos segundos"
+    if segundos < 3600:
+        return f"{int(segundos // 60)} min"
+    if segundos < 2 * 86400:
+        return f"{int(segundos // 3600)} h"
+    return f"{int(segundos // 86400)} días"
+
+def describir_estado_catalogo(estado):
+    """
+    Texto para mostrar al usuario de dónde salió el catálogo.
+    """
+    antiguedad = formatear_antiguedad(estado["antiguedad"])
+    if estado["origen"] == "cache":
+        return f"Catálogo de la caché local (descargado hace {antiguedad})"
+    if estado["origen"] == "revalidado":
+        return "Catálogo de la caché local (la API confirmó que no cambió)"
+    if estado["origen"] == "sin_conexion":
+        return f"Sin conexión con la API: se usa la copia local de hace {antiguedad}"
+    return "Catálogo descargado de la API"
+
+def leer_comentarios(file_path):
+    """
+    Lee el archivo de Excel y devuelve la lista de comentarios normalizados,
+    uno por fila.
+    """
+    df_excel = pd.read_excel(file_path)
+    df_excel.rename(columns=COLUMNAS_EXCEL, inplace=True)
+    return normalizar_columna(df_excel.get("comments", [""] * len(df_excel)))
+
+# Textos que pd.read_excel lee como NaN con sus na_values por defecto
+# (pandas._libs.parsers.STR_NA_VALUES); sólo si la celda es exactamente así
+TEXTOS_NA = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+
+def _valor_celda(valor):
+    """
+    Convierte el valor de una celda como lo hace pd.read_excel: vacías,
+    errores y los textos de TEXTOS_NA como NaN, y los números enteros
+    guardados como float a int.
+    """
+    if valor is None or (isinstance(valor, str) and (valor in TEXTOS_NA or valor in ERROR_CODES)):
+        return float("nan")
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+class ArchivoInvalido(ValueError):
+    """
+    Se lanza cuando el archivo no es un libro de Excel (.xlsx) que se pueda
+    abrir: no es un zip, o le faltan partes del libro.
+    """
+
+def iterar_comentarios(file_path, diagnostico=None):
+    """
+    Recorre la primera hoja del archivo de Excel en modo de sólo lectura y va
+    entregando el comentario normalizado de cada fila, sin cargar la hoja en
+    memoria ni convertir las demás columnas.
+
+    Entrega lo mismo que leer_comentarios: la primera fila son los
+    encabezados, las celdas vacías, los errores y los textos de TEXTOS_NA
+    ("N/A", "null", "None"...) se leen como NaN y las filas vacías del
+    final se descartan. Difiere sólo si todas las celdas con valor de la
+    columna de comentarios son números: pandas convierte entonces la columna
+    a float (5 queda como "5.0") y aquí cada celda se lee sola ("5"). Eso
+    no se puede saber sin leer la columna completa antes de entregar nada.
+    Con 'diagnostico' se suma el tiempo de normalización. Si el archivo no
+    es un libro de Excel válido se lanza ArchivoInvalido.
+    """
+    try:
+        libro = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError) as e:
+        # KeyError: el zip no tiene alguna de las partes del libro
+        raise ArchivoInvalido("El archivo no es un libro de Excel (.xlsx) válido") from e
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezados = next(filas, ())
+        columna = next((i for i, encabezado in enumerate(encabezados)
+                        if COLUMNAS_EXCEL.get(encabezado, encabezado) == "comments"), None)
+        sin_comentario = "" if columna is None else normalizar_texto(float("nan"))
+
+        # Las filas vacías se cuentan y sólo se entregan si después hay datos
+        vacias = 0
+        for fila in filas:
+            if all(valor is None or valor == "" for valor in fila):
+                vacias += 1
+                continue
+            for _ in range(vacias):
+                yield sin_comentario
+            vacias = 0
+            if columna is None or columna >= len(fila):
+                yield sin_comentario
+            elif diagnostico is None:
+                yield normalizar_texto(_valor_celda(fila[columna]))
+            else:
+                inicio = time.perf_counter()
+                comment = normalizar_texto(_valor_celda(fila[columna]))
+                diagnostico.sumar("normalizacion", time.perf_counter() - inicio)
+                yield comment
+    finally:
+        libro.close()
+
+def analizar_archivo_contratos(file_path, contratos, trabajadores=1, progreso=None, cancelar=None,
+                               caches=None, diagnostico=None, trazar_filas=False, progreso_lectura=None,
+                               procesos=None):
+    """
+    Valida un archivo de Excel contra el catálogo ya preparado de cada
+    contrato ('contratos' como en procesar_contratos) y devuelve
+    {nombre: partidas_detectadas}. El archivo se lee y se normaliza una sola
+    vez para todos. Las cachés de 'caches' se guardan al terminar. Con
+    'diagnostico' se registra el costo de cada etapa y con 'trazar_filas'
+    cada partida guarda todas las filas que la sumaron. La cancelación y
+    'progreso_lectura' funcionan ya durante la lectura, y 'procesos' es un
+    GrupoProcesos (ver procesar_contratos).
+    """
+    resultados = procesar_contratos(iterar_comentarios(file_path, diagnostico), contratos,
+                                    trabajadores=trabajadores, progreso=progreso, cancelar=cancelar,
+                                    caches=caches, diagnostico=diagnostico, trazar_filas=trazar_filas,
+                                    progreso_lectura=progreso_lectura, procesos=procesos)
+    for cache in (caches or {}).values():
+        with diagnostico.etapa("cache") if diagnostico is not None else contextlib.nullcontext():
+            cache.guardar()
+    return resultados
+
+def analizar_archivo(file_path, catalogo, contrato_info, trabajadores=1,
+                     progreso=None, cancelar=None, cache=None, diagnostico=None):
+    """
+    Valida un archivo de Excel contra un catálogo ya preparado y devuelve
+    partidas_detectadas. Los comentarios se leen en streaming. Con 'cache'
+    (una CacheResultados del mismo libro) sólo se analizan los comentarios
+    nuevos y la caché se guarda al terminar. Con 'diagnostico' se registra el
+    costo de cada etapa.
+    """
+    return analizar_archivo_contratos(file_path, {"": (catalogo, contrato_info)},
+                                      trabajadores=trabajadores, progreso=progreso,
+                                      cancelar=cancelar,
+                                      caches=None if cache is None else {"": cache},
+                                      diagnostico=diagnostico)[""]
+
+def tabla_resultados(partidas_detectadas):
+    """
+    Convierte partidas_detectadas en un DataFrame con una fila por partida y
+    la columna Total.
+    """
+    return pd.DataFrame(list(filas_resultados(partidas_detectadas)), columns=list(COLUMNAS_RESULTADOS))
+
+def filas_resultados(partidas_detectadas):
+    """
+    Entrega una tupla por partida con los valores de COLUMNAS_RESULTADOS, sin
+    armar la tabla completa.
+    """
+    for partida, datos in partidas_detectadas.items():
+        yield (partida, datos["descripcion"], datos["unidad_medida"], datos["precio_unitario"],
+               datos["cantidad"], datos["similitud"], datos["palabra_coincidente"],
+               datos["texto_evaluado"], datos["contrato_info"],
+               datos["cantidad"] * datos["precio_unitario"])
+
+def _escribir_xlsx(filas, file_path):
+    # Con XlsxWriter (si está instalado) en modo constant_memory, o con openpyxl
+    # en modo write_only: los dos escriben cada fila al disco en cuanto la reciben
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+    if xlsxwriter is not None:
+        libro = xlsxwriter.Workbook(file_path, {"constant_memory": True, "strings_to_urls": False,
+                                                "strings_to_formulas": False})
+        hoja = libro.add_worksheet("Sheet1")
+        hoja.write_row(0, 0, COLUMNAS_RESULTADOS)
+        for numero, fila in enumerate(filas, start=1):
+            hoja.write_row(numero, 0, fila)
+        libro.close()
+        return
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet("Sheet1")
+    hoja.append(COLUMNAS_RESULTADOS)
+    for fila in filas:
+        hoja.append(fila)
+    libro.save(file_path)
+
+def _escribir_csv(filas, file_path):
+    # utf-8-sig para que Excel abra bien los acentos
+    with open(file_path, "w", encoding="utf-8-sig", newline="") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(COLUMNAS_RESULTADOS)
+        escritor.writerows(filas)
+
+def _escribir_json(filas, file_path):
+    # Un arreglo de registros, como to_json(orient="records"), escrito registro por registro
+    with open(file_path, "w", encoding="utf-8") as archivo:
+        archivo.write("[")
+        for i, fila in enumerate(filas):
+            archivo.write(",\n  " if i else "\n  ")
+            archivo.write(json.dumps(dict(zip(COLUMNAS_RESULTADOS, fila)), ensure_ascii=False))
+        archivo.write("\n]\n")
+
+def _escribir_jsonl(filas, file_path):
+    with open(file_path, "w", encoding="utf-8") as archivo:
+        for fila in filas:
+            archivo.write(json.dumps(dict(zip(COLUMNAS_RESULTADOS, fila)), ensure_ascii=False))
+            archivo.write("\n")
+
+def _escribir_parquet(filas, file_path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Para exportar a Parquet hace falta instalar pyarrow") from None
+
+    # Partida puede ser número o texto según el catálogo; se guarda como texto
+    esquema = pa.schema([
+        ("Partida", pa.string()), ("descripcion", pa.string()), ("unidad_medida", pa.string()),
+        ("precio_unitario", pa.float64()), ("cantidad", pa.int64()), ("similitud", pa.int64()),
+        ("palabra_coincidente", pa.string()), ("texto_evaluado", pa.string()),
+        ("contrato_info", pa.string()), ("Total", pa.float64()),
+    ])
+    def escribir_grupo(grupo):
+        columnas = list(zip(*grupo))
+        escritor.write_table(pa.Table.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, esquema)],
+            schema=esquema))
+
+    with pq.ParquetWriter(file_path, esquema) as escritor:
+        grupo = []
+        for fila in filas:
+            grupo.append((str(fila[0]),) + fila[1:])
+            if len(grupo) == FILAS_GRUPO_PARQUET:
+                escribir_grupo(grupo)
+                grupo = []
+        if grupo:
+            escribir_grupo(grupo)
+
+ESCRITORES_SALIDA = {
+    "xlsx": _escribir_xlsx,
+    "csv": _escribir_csv,
+    "json": _escribir_json,
+    "jsonl": _escribir_jsonl,
+    "parquet": _escribir_parquet,
+}
+
+def guardar_resultados(partidas_detectadas, file_path):
+    """
+    Escribe los resultados en Excel, CSV, JSON, JSON Lines o Parquet según la
+    extensión del archivo. Las filas se escriben a medida que se generan,
+    sin armar un DataFrame.
+    """
+    formato = os.path.splitext(file_path)[1].lower().lstrip(".")
+    if formato not in FORMATOS_SALIDA:
+        raise ValueError(f"Formato de salida no soportado: {formato!r}")
+    ESCRITORES_SALIDA[formato](filas_resultados(partidas_detectadas), file_path)
+
+# =============================================================================
+# HISTORIAL DE VALIDACIONES (SQLITE)
+# =============================================================================
+
+# Base local con cada validación: contrato, datos del contrato, libro y las
+# partidas detectadas, para consultar el historial sin abrir los resultados
+RUTA_HISTORIAL = os.path.join(os.path.dirname(DIRECTORIO_CACHE), "historial.sqlite3")
+VERSION_HISTORIAL = 1
+MAXIMO_FILAS_HISTORIAL = 5000
+
+_ESQUEMA_HISTORIAL = """
+CREATE TABLE IF NOT EXISTS validaciones (
+    id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    contrato TEXT NOT NULL,
+    archivo TEXT NOT NULL,
+    huella_archivo TEXT NOT NULL,
+    contrato_info TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS info_validacion (
+    validacion INTEGER NOT NULL REFERENCES validaciones(id) ON DELETE CASCADE,
+    campo TEXT NOT NULL,
+    valor TEXT NOT NULL,
+    PRIMARY KEY (validacion, campo)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS partidas (
+    validacion INTEGER NOT NULL REFERENCES validaciones(id) ON DELETE CASCADE,
+    partida TEXT NOT NULL,
+    descripcion TEXT,
+    unidad_medida TEXT,
+    precio_unitario REAL,
+    cantidad INTEGER NOT NULL,
+    similitud REAL,
+    palabra_coincidente TEXT,
+    texto_evaluado TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_validaciones_fecha ON validaciones (fecha);
+CREATE INDEX IF NOT EXISTS idx_validaciones_contrato ON validaciones (contrato, fecha);
+CREATE INDEX IF NOT EXISTS idx_validaciones_huella ON validaciones (huella_archivo);
+CREATE INDEX IF NOT EXISTS idx_info_campo ON info_validacion (campo, valor);
+CREATE INDEX IF NOT EXISTS idx_partidas_partida ON partidas (partida, cantidad);
+CREATE INDEX IF NOT EXISTS idx_partidas_validacion ON partidas (validacion);
+"""
+
+COLUMNAS_HISTORIAL = ("fecha", "contrato", "archivo", "partida", "descripcion", "cantidad",
+                      "precio_unitario", "similitud", "palabra_coincidente", "contrato_info")
+
+def huella_archivo(file_path):
+    h = hashlib.sha1()
+    with open(file_path, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+class Historial:
+    """
+    Historial de validaciones en SQLite. Cada validación se escribe en una
+    sola transacción; las consultas por partida, contrato, fecha o dato del
+    contrato usan índices. Una conexión por hilo: se abre donde se usa y se
+    cierra al terminar (también sirve como 'with').
+    """
+
+    def __init__(self, ruta=RUTA_HISTORIAL):
+        if ruta != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self.conexion = sqlite3.connect(ruta, timeout=30)
+        self.conexion.execute("PRAGMA foreign_keys = ON")
+        if ruta != ":memory:":
+            # WAL: la GUI, la línea de comandos y el servicio pueden escribir y consultar a la vez
+            self.conexion.execute("PRAGMA journal_mode = WAL")
+            self.conexion.execute("PRAGMA synchronous = NORMAL")
+        # ANALYZE por muestreo: unos milisegundos aun con millones de partidas
+        self.conexion.execute("PRAGMA analysis_limit = 1000")
+        with self.conexion:
+            self.conexion.executescript(_ESQUEMA_HISTORIAL)
+            self.conexion.execute(f"PRAGMA user_version = {VERSION_HISTORIAL}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def registrar(self, file_path, resultados, contratos, fecha=None):
+        """
+        Guarda la validación de un libro: 'resultados' como los devuelve
+        analizar_archivo_contratos y 'contratos' del nombre de cada contrato a
+        su contrato_info. Devuelve los id de las validaciones.
+        """
+        fecha = fecha or time.strftime("%Y-%m-%d %H:%M:%S")
+        archivo = os.path.basename(file_path)
+        huella = huella_archivo(file_path)
+        ids = []
+        with self.conexion:
+            for nombre, partidas_detectadas in resultados.items():
+                contrato_info = contratos.get(nombre) or {}
+                cursor = self.conexion.execute(
+                    "INSERT INTO validaciones (fecha, contrato, archivo, huella_archivo, contrato_info) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (fecha, nombre, archivo, huella, json.dumps(contrato_info, ensure_ascii=False)))
+                validacion = cursor.lastrowid
+                self.conexion.executemany(
+                    "INSERT INTO info_validacion (validacion, campo, valor) VALUES (?, ?, ?)",
+                    [(validacion, str(campo), str(valor)) for campo, valor in contrato_info.items()
+                     if valor not in (None, "")])
+                self.conexion.executemany(
+                    "INSERT INTO partidas (validacion, partida, descripcion, unidad_medida, precio_unitario,"
+                    " cantidad, similitud, palabra_coincidente, texto_evaluado)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(validacion, str(partida), datos["descripcion"], datos["unidad_medida"],
+                      datos["precio_unitario"], datos["cantidad"], datos["similitud"],
+                      datos["palabra_coincidente"], datos["texto_evaluado"])
+                     for partida, datos in partidas_detectadas.items()])
+                ids.append(validacion)
+        # Sin estadísticas SQLite puede recorrer todas las partidas en vez de
+        # usar los índices de fecha o de partida
+        self.conexion.execute("ANALYZE")
+        return ids
+
+    def consultar(self, partida=None, contrato=None, desde=None, hasta=None, cantidad_minima=None,
+                  archivo=None, campo=None, valor=None, limite=MAXIMO_FILAS_HISTORIAL):
+        """
+        Partidas registradas que cumplen todos los filtros dados, de la
+        validación más reciente a la más antigua y en el orden en que se
+        registraron, como diccionarios con COLUMNAS_HISTORIAL.
+        'desde' y 'hasta' son fechas AAAA-MM-DD (inclusive); 'cantidad_minima'
+        deja las partidas con cantidad mayor o igual; 'campo' y 'valor'
+        filtran por un dato del contrato.
+        """
+        condiciones, parametros = [], []
+        if partida:
+            condiciones.append("p.partida = ?")
+            parametros.append(str(partida))
+        if cantidad_minima is not None:
+            condiciones.append("p.cantidad >= ?")
+            parametros.append(cantidad_minima)
+        if contrato:
+            condiciones.append("v.contrato = ?")
+            parametros.append(contrato)
+        if desde:
+            condiciones.append("v.fecha >= ?")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("v.fecha < date(?, '+1 day')")
+            parametros.append(hasta)
+        if archivo:
+            condiciones.append("v.archivo LIKE ?")
+            parametros.append(f"%{archivo}%")
+        if campo:
+            condiciones.append("v.id IN (SELECT validacion FROM info_validacion WHERE campo = ?"
+                               + (" AND valor = ?)" if valor else ")"))
+            parametros += [campo, valor] if valor else [campo]
+        consulta = ("SELECT v.fecha, v.contrato, v.archivo, p.partida, p.descripcion, p.cantidad,"
+                    " p.precio_unitario, p.similitud, p.palabra_coincidente, v.contrato_info"
+                    " FROM partidas p JOIN validaciones v ON v.id = p.validacion"
+                    + (" WHERE " + " AND ".join(condiciones) if condiciones else "")
+                    + " ORDER BY v.fecha DESC, v.id DESC LIMIT ?")
+        filas = self.conexion.execute(consulta, parametros + [limite]).fetchall()
+        return [dict(zip(COLUMNAS_HISTORIAL, fila)) for fila in filas]
+
+    def campos_info(self):
+        """
+        Datos del contrato que aparecen en el historial, para elegir el filtro.
+        """
+        return [campo for campo, in self.conexion.execute(
+            "SELECT DISTINCT campo FROM info_validacion ORDER BY campo")]
+
+# =============================================================================
+# DIAGNÓSTICO DE RENDIMIENTO
+# =============================================================================
+
+VERSION_DIAGNOSTICO = 2
+# Comentarios más lentos y palabras más costosas que se conservan en el reporte
+MAXIMO_LENTOS = 10
+MAXIMO_PALABRAS = 15
+
+class MedicionComentario:
+    """
+    Cronómetro de un solo comentario dentro de analizar_comentario. Cada
+    marcar() suma al Diagnostico el tiempo transcurrido desde la marca anterior.
+    """
+    __slots__ = ("diagnostico", "comment", "inicio", "anterior", "palabras")
+
+    def __init__(self, diagnostico, comment):
+        self.diagnostico = diagnostico
+        self.comment = comment
+        self.inicio = self.anterior = time.perf_counter()
+        self.palabras = Counter()
+
+    def marcar(self, etapa):
+        ahora = time.perf_counter()
+        self.diagnostico.etapas[etapa] += ahora - self.anterior
+        self.anterior = ahora
+        return ahora
+
+    def palabra(self, palabra):
+        # El tiempo de seleccionar_palabra se atribuye a la palabra del catálogo
+        ahora = self.anterior
+        transcurrido = self.marcar("seleccion_palabra") - ahora
+        self.palabras[palabra] += transcurrido
+        self.diagnostico.contadores["selecciones_palabra"] += 1
+
+    def terminar(self, evaluaciones_fuzzy):
+        diagnostico = self.diagnostico
+        self.marcar("coincidencias")
+        diagnostico.contadores["busquedas_exactas"] += 1
+        diagnostico.contadores["evaluaciones_fuzzy"] += evaluaciones_fuzzy
+        diagnostico.costo_palabras.update(self.palabras)
+        diagnostico.usos_palabras.update(self.palabras.keys())
+        diagnostico.registrar_lento(self.anterior - self.inicio, self.comment, evaluaciones_fuzzy,
+                                    self.palabras)
+
+class Diagnostico:
+    """
+    Tiempos por etapa y conteos de una validación. Se activa pasando una
+    instancia a procesar_comentarios / analizar_archivo; sin ella el matching
+    no mide nada. Es serializable, así que cada proceso de trabajo arma el
+    suyo y se combinan con combinar().
+
+    Etapas: catalogo, lectura, normalizacion, exacta, candidatas, fuzzy,
+    seleccion_palabra, coincidencias, agregacion y cache. 'exacta' es la
+    búsqueda del autómata, que reemplazó a las expresiones regulares por
+    palabra. En paralelo, las etapas del matching suman el tiempo de todos
+    los procesos, por lo que pueden superar al tiempo total.
+
+    El reporte incluye la cascada de puntajes: por cada nivel (medidas,
+    cotas, token_set_ratio, partial_ratio y partial_ratio exacto), los pares
+    (comentario, palabra) que llegaron y los que se descartaron u omitieron.
+    """
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fecha = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.segundos_total = None
+        self.etapas = Counter()
+        self.contadores = Counter()
+        self.costo_palabras = Counter()
+        self.usos_palabras = Counter()
+        # Montículo de (segundos, comentario, evaluaciones_fuzzy, palabras más costosas)
+        self.lentos = []
+        # Aciertos y fallos de puntaje_palabra al empezar, para contar sólo los de esta corrida
+        self.puntajes_base = puntaje_palabra.cache_info()[:2]
+
+    def registrar_puntajes(self):
+        """
+        Suma a los contadores los aciertos y fallos de la caché de
+        puntaje_palabra desde la última vez.
+        """
+        aciertos, fallos = puntaje_palabra.cache_info()[:2]
+        self.contadores["puntajes_palabra_en_cache"] += aciertos - self.puntajes_base[0]
+        self.contadores["puntajes_palabra_calculados"] += fallos - self.puntajes_base[1]
+        self.puntajes_base = (aciertos, fallos)
+
+    def sumar(self, etapa, segundos):
+        self.etapas[etapa] += segundos
+
+    @contextlib.contextmanager
+    def etapa(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas[nombre] += time.perf_counter() - inicio
+
+    def medir_comentario(self, comment):
+        return MedicionComentario(self, comment)
+
+    def registrar_lento(self, segundos, comment, evaluaciones_fuzzy, palabras):
+        if len(self.lentos) >= MAXIMO_LENTOS and segundos <= self.lentos[0][0]:
+            return
+        costosas = [(palabra, round(costo, 6)) for palabra, costo in palabras.most_common(3)]
+        entrada = (segundos, comment, evaluaciones_fuzzy, costosas)
+        if len(self.lentos) < MAXIMO_LENTOS:
+            heapq.heappush(self.lentos, entrada)
+        else:
+            heapq.heapreplace(self.lentos, entrada)
+
+    def combinar(self, otro):
+        """
+        Suma el diagnóstico de un proceso de trabajo (o de un bloque).
+        """
+        if otro is None:
+            return
+        self.etapas.update(otro.etapas)
+        self.contadores.update(otro.contadores)
+        self.costo_palabras.update(otro.costo_palabras)
+        self.usos_palabras.update(otro.usos_palabras)
+        for segundos, comment, evaluaciones_fuzzy, costosas in otro.lentos:
+            self.registrar_lento(segundos, comment, evaluaciones_fuzzy, Counter(dict(costosas)))
+
+    def terminar(self):
+        self.segundos_total = time.perf_counter() - self.inicio
+        self.registrar_puntajes()
+        return self
+
+    def cascada(self):
+        """
+        Pares que llegaron a cada nivel de la cascada y los que ese nivel
+        descartó (o en los que no hizo falta calcular el método).
+        """
+        c = self.contadores
+        revisadas = c["palabras_revisadas"]
+        con_medidas = revisadas - c["descartadas_por_medida"]
+        evaluaciones = c["evaluaciones_fuzzy"]
+        niveles = (
+            ("medidas", revisadas, c["descartadas_por_medida"]),
+            ("cotas", con_medidas, c["descartadas_por_cotas"]),
+            ("token_set_ratio", evaluaciones, c["token_set_omitidos"]),
+            ("partial_ratio", evaluaciones, c["partial_omitidos"]),
+            ("partial_ratio exacto", evaluaciones - c["partial_omitidos"], c["partial_exacto_omitidos"]),
+        )
+        return [{"nivel": nivel, "pares": pares, "descartados": descartados,
+                 "fraccion": round(descartados / pares, 4) if pares else None}
+                for nivel, pares, descartados in niveles]
+
+    def reporte(self):
+        """
+        Devuelve el reporte de la corrida como un diccionario serializable a JSON.
+        """
+        total = self.segundos_total if self.segundos_total is not None else time.perf_counter() - self.inicio
+        filas = self.contadores["filas"]
+        puntajes = self.contadores["puntajes_palabra_en_cache"] + self.contadores["puntajes_palabra_calculados"]
+        return {
+            "version": VERSION_DIAGNOSTICO,
+            "fecha": self.fecha,
+            "segundos_total": round(total, 4),
+            "filas": filas,
+            "comentarios_distintos": self.contadores["comentarios_distintos"],
+            "filas_por_segundo": round(filas / total, 1) if total > 0 else None,
+            "etapas": {etapa: round(segundos, 4) for etapa, segundos in self.etapas.most_common()},
+            "contadores": dict(self.contadores),
+            "aciertos_cache_puntajes": (round(self.contadores["puntajes_palabra_en_cache"] / puntajes, 4)
+                                        if puntajes else None),
+            "cascada": self.cascada(),
+            "comentarios_lentos": [
+                {"segundos": round(segundos, 6), "comentario": comment,
+                 "evaluaciones_fuzzy": evaluaciones_fuzzy,
+                 "palabras_costosas": [{"palabra": palabra, "segundos": costo}
+                                       for palabra, costo in costosas]}
+                for segundos, comment, evaluaciones_fuzzy, costosas in sorted(self.lentos, reverse=True)],
+            "palabras_costosas": [
+                {"palabra": palabra, "segundos": round(costo, 6), "usos": self.usos_palabras[palabra]}
+                for palabra, costo in self.costo_palabras.most_common(MAXIMO_PALABRAS)],
+        }
+
+def guardar_reporte(reporte, file_path):
+    with open(file_path, "w", encoding="utf-8") as archivo:
+        archivo.write(json.dumps(reporte, ensure_ascii=False, indent=2))
+
+def describir_reporte(reporte):
+    """
+    Resumen en texto del reporte de diagnóstico, para la interfaz y la consola.
+    """
+    lineas = [f"Filas: {reporte['filas']:,}  Comentarios distintos: {reporte['comentarios_distintos']:,}",
+              f"Tiempo total: {reporte['segundos_total']:.2f} s  "
+              f"Filas por segundo: {reporte['filas_por_segundo'] or 0:,.0f}",
+              "", "Tiempo por etapa:"]
+    lineas += [f"  {etapa:<20}{segundos:>10.3f} s" for etapa, segundos in reporte["etapas"].items()]
+    lineas += ["", "Contadores:"]
+    lineas += [f"  {nombre:<26}{valor:>10,}" for nombre, valor in reporte["contadores"].items()]
+    if reporte.get("aciertos_cache_puntajes") is not None:
+        lineas.append(f"  Aciertos de la caché de puntajes: {reporte['aciertos_cache_puntajes']:.1%}")
+    if reporte.get("cascada"):
+        lineas += ["", "Cascada de puntajes (pares que llegan / descartados u omitidos):"]
+        lineas += [f"  {nivel['nivel']:<22}{nivel['pares']:>12,}{nivel['descartados']:>12,}"
+                   f"  {nivel['fraccion'] or 0:>6.1%}" for nivel in reporte["cascada"]]
+    lineas += ["", "Comentarios más lentos:"]
+    for lento in reporte["comentarios_lentos"]:
+        palabras = ", ".join(p["palabra"] for p in lento["palabras_costosas"]) or "-"
+        lineas.append(f"  {lento['segundos'] * 1000:8.2f} ms  fuzzy={lento['evaluaciones_fuzzy']:<5} "
+                      f"{lento['comentario'][:70]}")
+        lineas.append(f"               palabras más costosas: {palabras}")
+    lineas += ["", "Palabras del catálogo más costosas:"]
+    lineas += [f"  {p['segundos'] * 1000:8.2f} ms  {p['usos']:>6} usos  {p['palabra']}"
+               for p in reporte["palabras_costosas"]]
+    return "\n".join(lineas)
@@ -0,0 +1,357 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from motor import (TRABAJADORES, URLS_CONTRATO, ArchivoInvalido, CatalogosPrecargados, GrupoProcesos,
+                   analizar_archivo_contratos, cargar_catalogo, comparar_contratos,
+                   describir_estado_catalogo, normalizar_texto, preparar_catalogo, procesar_contratos)
+
+# =============================================================================
+# SERVICIO LOCAL DE MATCHING
+# =============================================================================
+#
+# Mantiene compilados en memoria los catálogos de los contratos y valida
+# libros o lotes de comentarios que le envían los clientes por HTTP:
+#
+#     python servicio.py --puerto 8765 --concurrentes 2
+#
+#     GET  /estado                      catálogos cargados y validaciones en curso
+#     POST /validar?contrato=A&contrato=B
+#          cuerpo .xlsx: el libro completo; 'contratos' (opcional, en la
+#              URL) es un JSON {letra: contrato_info}
+#          cuerpo JSON: {"comentarios": [...], "contratos": {letra: contrato_info}}
+#
+# La respuesta es {"resultados": {letra: partidas_detectadas}, "comparacion": [...]}.
+# Se atienden a lo más 'concurrentes' validaciones a la vez y 'en_espera' más
+# aguardan su turno; las demás reciben 503 para reintentar después.
+
+PUERTO_SERVICIO = 8765
+# Si está definida, la interfaz gráfica ofrece validar con el servicio en esta URL
+URL_SERVICIO = os.environ.get("ANALIZADOR_SERVICIO")
+CONCURRENTES = 2
+EN_ESPERA = 8
+MAXIMO_CUERPO = 256 * 1024 * 1024
+# Bloques en que se descarta el cuerpo de una solicitud que no se atiende
+BLOQUE_DESCARTE = 64 * 1024
+TIEMPO_ESPERA_CATALOGO = 120
+TIEMPO_ESPERA_SERVICIO = 30 * 60
+
+TIPO_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+class ErrorServicio(Exception):
+    """
+    Error que se devuelve al cliente con el código HTTP indicado.
+    """
+
+    def __init__(self, codigo, mensaje):
+        super().__init__(mensaje)
+        self.codigo = codigo
+
+class ServicioMatching:
+    """
+    Catálogos compilados y grupo acotado de validaciones. 'fuentes' va de la
+    letra de cada contrato a la URL de su API o a un archivo JSON local; los
+    de la API pasan por CatalogosPrecargados, que los revalida al vencer la
+    caché, y los locales se compilan una sola vez al arrancar.
+
+    Las validaciones grandes se reparten en un solo GrupoProcesos de
+    'trabajadores' procesos, compartido por todas: los procesos siguen vivos
+    entre validaciones y sólo vuelven a recibir los catálogos cuando cambia
+    alguno.
+    """
+
+    def __init__(self, fuentes=None, concurrentes=CONCURRENTES, en_espera=EN_ESPERA, trabajadores=None):
+        self.fuentes = dict(fuentes or URLS_CONTRATO)
+        self.trabajadores = trabajadores or TRABAJADORES
+        self.procesos = GrupoProcesos(self.trabajadores)
+        self.catalogos = CatalogosPrecargados()
+        self.locales = {}
+        for letra, fuente in self.fuentes.items():
+            if fuente.startswith(("http://", "https://")):
+                self.catalogos.obtener(fuente)
+            else:
+                self.locales[letra] = {"catalogo": preparar_catalogo(cargar_catalogo(fuente)), "estado": None}
+        self.ejecutor = ThreadPoolExecutor(max_workers=concurrentes, thread_name_prefix="validacion")
+        self.espacios = threading.BoundedSemaphore(concurrentes + en_espera)
+        self.candado = threading.Lock()
+        self.en_curso = 0
+        self.atendidas = 0
+
+    def catalogo(self, letra):
+        """
+        Devuelve {"catalogo", "estado"} del contrato, esperando si todavía se
+        está descargando.
+        """
+        if letra in self.locales:
+            return self.locales[letra]
+        if letra not in self.fuentes:
+            raise ErrorServicio(400, f"Contrato desconocido: {letra!r}")
+        try:
+            return self.catalogos.obtener(self.fuentes[letra]).result(timeout=TIEMPO_ESPERA_CATALOGO)
+        except Exception as e:
+            raise ErrorServicio(502, f"No se pudo obtener el catálogo del contrato {letra}: {e}")
+
+    def estado(self):
+        contratos = {}
+        for letra, fuente in self.fuentes.items():
+            if letra in self.locales:
+                contratos[letra] = {"listo": True, "estado": f"Catálogo del archivo {fuente}"}
+                continue
+            futuro = self.catalogos.obtener(fuente)
+            if not futuro.done():
+                contratos[letra] = {"listo": False, "estado": "Descargando catálogo..."}
+            elif futuro.exception() is not None:
+                contratos[letra] = {"listo": False, "estado": f"Error: {futuro.exception()}"}
+            else:
+                contratos[letra] = {"listo": True,
+                                    "estado": describir_estado_catalogo(futuro.result()["estado"])}
+        with self.candado:
+            return {"contratos": contratos, "en_curso": self.en_curso, "atendidas": self.atendidas,
+                    "trabajadores": self.trabajadores}
+
+    @contextlib.contextmanager
+    def reservar(self):
+        """
+        Reserva el lugar de una validación mientras dura el bloque. Lanza
+        ErrorServicio(503) si ya hay demasiadas validaciones pendientes.
+        """
+        if not self.espacios.acquire(blocking=False):
+            raise ErrorServicio(503, "El servicio está ocupado; intente de nuevo en unos segundos")
+        try:
+            yield
+        finally:
+            self.espacios.release()
+
+    def validar(self, comentarios=None, file_path=None, contratos=None, reservado=False):
+        """
+        Valida una lista de comentarios sin normalizar o un libro de Excel
+        contra los contratos de 'contratos' ({letra: contrato_info}) y
+        devuelve la respuesta del servicio. Lanza ErrorServicio(503) si ya
+        hay demasiadas validaciones pendientes; con 'reservado', quien llama
+        ya tiene su lugar (ver reservar).
+        """
+        if not contratos:
+            raise ErrorServicio(400, "Indique al menos un contrato")
+        with contextlib.nullcontext() if reservado else self.reservar():
+            return self.ejecutor.submit(self._validar, comentarios, file_path, contratos).result()
+
+    def _validar(self, comentarios, file_path, contratos):
+        with self.candado:
+            self.en_curso += 1
+        try:
+            compilados = {letra: (self.catalogo(letra)["catalogo"], contrato_info)
+                          for letra, contrato_info in contratos.items()}
+            inicio = time.perf_counter()
+            if file_path is not None:
+                resultados = analizar_archivo_contratos(file_path, compilados, procesos=self.procesos)
+            else:
+                resultados = procesar_contratos(map(normalizar_texto, comentarios), compilados,
+                                                procesos=self.procesos)
+            # Las partidas se envían como diccionarios, ya con su comentario y su contrato_info
+            return {"resultados": {letra: {partida: datos.como_diccionario()
+                                           for partida, datos in partidas_detectadas.items()}
+                                   for letra, partidas_detectadas in resultados.items()},
+                    "comparacion": comparar_contratos(resultados),
+                    "segundos": round(time.perf_counter() - inicio, 3)}
+        finally:
+            with self.candado:
+                self.en_curso -= 1
+                self.atendidas += 1
+
+    def cerrar(self):
+        self.ejecutor.shutdown(wait=False, cancel_futures=True)
+        self.procesos.cerrar()
+
+def _leer_contratos(valor, letras):
+    """
+    Arma {letra: contrato_info} con las letras pedidas y la información de
+    'valor' (un dict por letra); las letras sin información usan {}.
+    """
+    if valor is None:
+        valor = {}
+    if not isinstance(valor, dict) or not all(isinstance(info, dict) for info in valor.values()):
+        raise ErrorServicio(400, "'contratos' debe ser un objeto {letra: {campo: valor}}")
+    return {letra: valor.get(letra, {}) for letra in dict.fromkeys(letras or valor)}
+
+class ManejadorServicio(BaseHTTPRequestHandler):
+    # 'servicio' lo asigna crear_servidor
+    servicio = None
+
+    def _responder(self, codigo, datos):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        if codigo == 503:
+            self.send_header("Retry-After", "5")
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        if urlsplit(self.path).path != "/estado":
+            self._responder(404, {"error": "Ruta desconocida"})
+            return
+        self._responder(200, self.servicio.estado())
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        # Bytes del cuerpo que quedan sin leer
+        pendientes = 0
+        try:
+            if url.path != "/validar":
+                raise ErrorServicio(404, "Ruta desconocida")
+            longitud = int(self.headers.get("Content-Length") or 0)
+            if longitud <= 0:
+                raise ErrorServicio(411, "Falta el cuerpo de la solicitud")
+            if longitud > MAXIMO_CUERPO:
+                raise ErrorServicio(413, "El archivo es demasiado grande")
+            pendientes = longitud
+            # El lugar se reserva antes de leer el cuerpo: si el servicio está
+            # ocupado, se responde 503 sin recibir el libro
+            with self.servicio.reservar():
+                cuerpo = self.rfile.read(longitud)
+                pendientes = 0
+                respuesta = self._atender(url, cuerpo)
+        except ErrorServicio as e:
+            self._responder(e.codigo, {"error": str(e)})
+        except ArchivoInvalido as e:
+            self._responder(400, {"error": str(e)})
+        except Exception as e:
+            self._responder(500, {"error": f"No se pudo completar la validación: {e}"})
+        else:
+            self._responder(200, respuesta)
+        finally:
+            self._descartar(pendientes)
+
+    def _atender(self, url, cuerpo):
+        """
+        Valida el cuerpo ya leído (un JSON con comentarios o un libro de
+        Excel) con el lugar ya reservado y devuelve la respuesta.
+        """
+        consulta = parse_qs(url.query)
+        letras = consulta.get("contrato", [])
+        if self.headers.get_content_type() == "application/json":
+            try:
+                datos = json.loads(cuerpo)
+            except ValueError:
+                raise ErrorServicio(400, "El cuerpo no es un JSON válido")
+            comentarios = datos.get("comentarios") if isinstance(datos, dict) else None
+            if not isinstance(comentarios, list):
+                raise ErrorServicio(400, "Falta la lista 'comentarios'")
+            contratos = _leer_contratos(datos.get("contratos"), letras)
+            return self.servicio.validar(comentarios=comentarios, contratos=contratos, reservado=True)
+        try:
+            contratos = _leer_contratos(json.loads(consulta.get("contratos", ["{}"])[0]), letras)
+        except ValueError:
+            raise ErrorServicio(400, "'contratos' no es un JSON válido")
+        # openpyxl necesita un archivo; se borra al terminar
+        descriptor, temporal = tempfile.mkstemp(suffix=".xlsx")
+        try:
+            with os.fdopen(descriptor, "wb") as archivo:
+                archivo.write(cuerpo)
+            return self.servicio.validar(file_path=temporal, contratos=contratos, reservado=True)
+        finally:
+            os.remove(temporal)
+
+    def _descartar(self, pendientes):
+        """
+        Lee y descarta, por bloques y sin guardarlo, el cuerpo que no se
+        atendió, para que el cliente reciba la respuesta en lugar de una
+        conexión cortada.
+        """
+        while pendientes > 0:
+            try:
+                bloque = self.rfile.read(min(pendientes, BLOQUE_DESCARTE))
+            except OSError:
+                return
+            if not bloque:
+                return
+            pendientes -= len(bloque)
+
+    def log_message(self, formato, *args):
+        print(f"{self.address_string()} - {formato % args}", file=sys.stderr)
+
+def crear_servidor(servicio, host="127.0.0.1", puerto=PUERTO_SERVICIO):
+    """
+    Servidor HTTP (un hilo por conexión) que atiende con 'servicio'. Con
+    puerto 0 el sistema elige uno libre (server_address lo indica).
+    """
+    manejador = type("Manejador", (ManejadorServicio,), {"servicio": servicio})
+    return ThreadingHTTPServer((host, puerto), manejador)
+
+# =============================================================================
+# CLIENTE
+# =============================================================================
+
+def validar_en_servicio(url_servicio, file_path, contratos, sesion=None):
+    """
+    Envía el libro al servicio y devuelve {letra: partidas_detectadas}.
+    'contratos' va de la letra de cada contrato a su contrato_info.
+    """
+    with open(file_path, "rb") as archivo:
+        response = (sesion or requests).post(
+            url_servicio.rstrip("/") + "/validar",
+            params={"contrato": list(contratos), "contratos": json.dumps(contratos, ensure_ascii=False)},
+            data=archivo, headers={"Content-Type": TIPO_XLSX}, timeout=(10, TIEMPO_ESPERA_SERVICIO))
+    if response.status_code != 200:
+        try:
+            mensaje = response.json()["error"]
+        except (ValueError, KeyError, TypeError):
+            mensaje = f"El servicio respondió con el código {response.status_code}"
+        raise requests.HTTPError(mensaje, response=response)
+    return response.json()["resultados"]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Servicio HTTP local que valida libros contra los catálogos ya compilados.")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Dirección en la que escucha (por defecto, sólo este equipo)")
+    parser.add_argument("--puerto", type=int, default=PUERTO_SERVICIO)
+    parser.add_argument("--catalogo", action="append", default=[], metavar="LETRA=FUENTE",
+                        help="URL o archivo JSON del catálogo de un contrato (se puede repetir); "
+                             "por defecto, los de URLS_CONTRATO")
+    parser.add_argument("--concurrentes", type=int, default=CONCURRENTES,
+                        help=f"Validaciones simultáneas (por defecto, {CONCURRENTES})")
+    parser.add_argument("--en-espera", type=int, default=EN_ESPERA,
+                        help=f"Validaciones que pueden esperar turno (por defecto, {EN_ESPERA})")
+    parser.add_argument("--trabajadores", type=int,
+                        help="Procesos para el matching, compartidos por todas las validaciones "
+                             f"(por defecto, {TRABAJADORES})")
+    args = parser.parse_args(argv)
+
+    fuentes = {}
+    for par in args.catalogo:
+        letra, separador, fuente = par.partition("=")
+        if not separador:
+            parser.error(f"--catalogo debe tener la forma LETRA=FUENTE: {par!r}")
+        fuentes[letra.strip()] = fuente.strip()
+    try:
+        servicio = ServicioMatching(fuentes or None, args.concurrentes, args.en_espera, args.trabajadores)
+    except (OSError, ValueError) as e:
+        print(f"Error al cargar los catálogos: {e}", file=sys.stderr)
+        return 2
+    servidor = crear_servidor(servicio, args.host, args.puerto)
+    print(f"Servicio de matching en http://{args.host}:{servidor.server_address[1]}", file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servicio.cerrar()
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
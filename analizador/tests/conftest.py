@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Los módulos se importan como en la aplicación: motor, servicio, etc. están
+# en el directorio del proyecto y los datos sintéticos en benchmarks
+DIRECTORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [DIRECTORIO, os.path.join(DIRECTORIO, "benchmarks")]
@@ -0,0 +1,32 @@
+import re
+
+from hypothesis import given, settings, strategies as st
+
+from motor import AutomataPalabras
+
+# Alfabeto chico para que las palabras se traslapen y se repitan seguido, con
+# caracteres de palabra (letras, dígitos, '_', 'ñ') y de no palabra
+ALFABETO = "ab1_ñ .,-"
+palabras = st.text(alphabet=ALFABETO, max_size=5)
+textos = st.text(alphabet=ALFABETO, max_size=40)
+
+# =============================================================================
+# EL AUTÓMATA ENCUENTRA LO MISMO QUE re.search CON \b
+# =============================================================================
+
+@settings(max_examples=500, deadline=None)
+@given(st.lists(palabras, max_size=12), textos)
+def test_buscar_igual_que_re_search(lista, texto):
+    esperadas = {palabra for palabra in lista
+                 if re.search(rf'\b{re.escape(palabra)}\b', texto)}
+    assert AutomataPalabras(lista).buscar(texto) == esperadas
+
+@settings(max_examples=200, deadline=None)
+@given(st.lists(palabras, min_size=1, max_size=12), textos, st.data())
+def test_encuentra_las_palabras_insertadas(lista, texto, data):
+    # Una palabra del catálogo entre espacios en medio del comentario
+    palabra = data.draw(st.sampled_from(lista))
+    corte = data.draw(st.integers(min_value=0, max_value=len(texto)))
+    texto = f"{texto[:corte]} {palabra} {texto[corte:]}"
+    esperadas = {p for p in lista if re.search(rf'\b{re.escape(p)}\b', texto)}
+    assert AutomataPalabras(lista).buscar(texto) == esperadas
@@ -0,0 +1,67 @@
+import copy
+import os
+import time
+
+from motor import (CacheResultados, analizar_archivo_contratos, filas_resultados, normalizar_texto,
+                   podar_resultados, preparar_catalogo)
+from sinteticos import escribir_libro, generar_catalogo, generar_comentarios
+
+# =============================================================================
+# SÓLO SE VUELVEN A ANALIZAR LOS COMENTARIOS MODIFICADOS
+# =============================================================================
+
+def validar(file_path, catalogo, directorio):
+    cache = CacheResultados(file_path, catalogo, directorio=directorio)
+    resultados = analizar_archivo_contratos(file_path, {"": (catalogo, {})}, caches={"": cache})[""]
+    return cache, list(filas_resultados(resultados))
+
+def test_comentario_editado_se_vuelve_a_analizar(tmp_path):
+    catalogo = preparar_catalogo(copy.deepcopy(generar_catalogo(60, semilla=2)))
+    comentarios = generar_comentarios(300, duplicacion=0.5, semilla=2)
+    file_path = tmp_path / "comentarios.xlsx"
+    directorio = tmp_path / "resultados"
+    escribir_libro(file_path, comentarios)
+
+    cache, _ = validar(file_path, catalogo, directorio)
+    assert (cache.analizados, cache.reutilizados) == (len(set(map(normalizar_texto, comentarios))), 0)
+
+    # Se corrige un comentario que no se repite en otra fila
+    fila = next(i for i, c in enumerate(comentarios) if comentarios.count(c) == 1)
+    comentarios[fila] = "cambió barrena tricónica por falla y circuló lodo base aceite"
+    escribir_libro(file_path, comentarios)
+
+    cache, filas = validar(file_path, catalogo, directorio)
+    distintos = set(map(normalizar_texto, comentarios))
+    assert (cache.analizados, cache.reutilizados) == (1, len(distintos) - 1)
+    # Y el resultado es el mismo que sin caché
+    assert filas == list(filas_resultados(
+        analizar_archivo_contratos(file_path, {"": (catalogo, {})})[""]))
+
+    # Sin cambios no se escribe, pero se marca como usada
+    hace_un_año = time.time() - 365 * 86400
+    os.utime(cache.ruta, (hace_un_año, hace_un_año))
+    cache, _ = validar(file_path, catalogo, directorio)
+    assert (cache.analizados, cache.reutilizados) == (0, len(distintos))
+    assert os.path.getmtime(cache.ruta) > hace_un_año
+
+# =============================================================================
+# LOS RESULTADOS VIEJOS O DE SOBRA SE BORRAN
+# =============================================================================
+
+def test_podar_resultados(tmp_path):
+    ahora = time.time()
+    # (nombre, días sin usar); 100 bytes cada uno
+    for nombre, dias in [("viejo", 40), ("a", 5), ("b", 4), ("c", 3), ("d", 2), ("actual", 10)]:
+        ruta = tmp_path / f"{nombre}.json"
+        ruta.write_bytes(b"x" * 100)
+        os.utime(ruta, (ahora - dias * 86400, ahora - dias * 86400))
+    (tmp_path / "otro.txt").write_bytes(b"x" * 1000)
+
+    podar_resultados(tmp_path, vigencia=30 * 86400, maximo_bytes=350,
+                     conservar=[tmp_path / "actual.json"])
+
+    # El vencido se borra y luego los usados hace más tiempo, salvo el que se conserva
+    assert sorted(os.listdir(tmp_path)) == ["actual.json", "c.json", "d.json", "otro.txt"]
+
+def test_podar_resultados_sin_directorio(tmp_path):
+    podar_resultados(tmp_path / "no_existe")
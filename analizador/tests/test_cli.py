@@ -0,0 +1,52 @@
+import json
+import os
+
+import pytest
+
+from analizador_cli import crear_parser, main, nombres_salida
+from sinteticos import escribir_libro, generar_catalogo, generar_comentarios
+
+# =============================================================================
+# VALIDACIÓN POR LOTES DESDE LA LÍNEA DE COMANDOS
+# =============================================================================
+
+def test_contrato_antes_de_los_archivos():
+    args = crear_parser().parse_args(["--contrato", "A", "pozo1.xlsx"])
+    assert args.contrato == ["A"]
+    assert args.archivos == ["pozo1.xlsx"]
+
+def test_contrato_repetido():
+    args = crear_parser().parse_args(["--contrato", "A", "--contrato", "B", "pozo1.xlsx", "pozo2.xlsx"])
+    assert args.contrato == ["A", "B"]
+    assert args.archivos == ["pozo1.xlsx", "pozo2.xlsx"]
+
+def test_contrato_invalido_o_con_catalogo():
+    with pytest.raises(SystemExit):
+        crear_parser().parse_args(["--contrato", "Z", "pozo1.xlsx"])
+    with pytest.raises(SystemExit):
+        crear_parser().parse_args(["--contrato", "A", "--catalogo", "c.json", "pozo1.xlsx"])
+
+def test_nombres_salida_sin_repetidos():
+    assert nombres_salida(["pozo1.xlsx", os.path.join("datos", "pozo2.xlsx")]) == ["pozo1", "pozo2"]
+
+def test_nombres_salida_repetidos():
+    archivos = [os.path.join("a", "pozo1.xlsx"), os.path.join("b", "pozo1.xlsx"),
+                os.path.join("a", "pozo1.xlsx"), "a_pozo1.xlsx"]
+    assert nombres_salida(archivos) == ["a_pozo1", "b_pozo1", "a_pozo1_2", "a_pozo1_3"]
+
+def test_lote_con_nombres_repetidos_no_sobrescribe(tmp_path):
+    catalogo = tmp_path / "catalogo.json"
+    catalogo.write_text(json.dumps(generar_catalogo(20)), encoding="utf-8")
+    archivos = []
+    for directorio, semilla in (("a", 0), ("b", 1)):
+        (tmp_path / directorio).mkdir()
+        archivos.append(str(tmp_path / directorio / "pozo1.xlsx"))
+        escribir_libro(archivos[-1], generar_comentarios(30, semilla=semilla))
+    salida = tmp_path / "salida"
+
+    codigo = main(archivos + ["--catalogo", str(catalogo), "--salida", str(salida), "--formato", "csv",
+                              "--sin-cache", "--sin-historial", "--trabajadores", "1", "--diagnostico"])
+
+    assert codigo == 0
+    assert sorted(os.listdir(salida)) == ["a_pozo1_diagnostico.json", "a_pozo1_partidas.csv",
+                                          "b_pozo1_diagnostico.json", "b_pozo1_partidas.csv"]
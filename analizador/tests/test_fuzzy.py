@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from motor import (UMBRAL_SIMILITUD, IndiceCandidatos, matriz_fuzzy, medidas_texto,
+                   mejor_fuzzy_score, normalizar_texto, puntajes_en_cascada)
+
+# Términos del catálogo y variantes con errores de captura; sin medidas con
+# unidad, para que la compuerta de medidas no descarte palabras
+TERMINOS = [
+    "barrena", "triconica", "lodo base aceite", "lechada de amarre", "tr 20", "tr 13.375",
+    "zapata", "cople", "temblorina", "centrifuga decantadora", "barita", "pesca", "molino",
+    "barena", "lodo bace aseite", "zapta", "tr", "de", "a", "12.25", "0.5",
+]
+terminos = st.one_of(
+    st.sampled_from(TERMINOS),
+    st.text(alphabet="abdelorstuz 0123.,", min_size=1, max_size=15),
+).map(normalizar_texto).filter(lambda t: t and not medidas_texto(t))
+comentarios = st.lists(terminos, min_size=1, max_size=6).map(" ".join)
+umbrales = st.one_of(st.just(UMBRAL_SIMILITUD), st.integers(min_value=1, max_value=100))
+
+# =============================================================================
+# LA CASCADA DA LO MISMO QUE LA MATRIZ DE UN SOLO NIVEL
+# =============================================================================
+
+@settings(max_examples=300, deadline=None)
+@given(comentarios, st.lists(terminos, min_size=1, max_size=15, unique=True), umbrales)
+def test_cascada_igual_que_matriz(comment, palabras, umbral):
+    posiciones, cota_token_set, cota_parcial = IndiceCandidatos(palabras, umbral).filtrar(comment)
+    puntajes = np.zeros(len(palabras), dtype=int)
+    puntajes[posiciones] = puntajes_en_cascada(
+        comment, [palabras[j] for j in posiciones], cota_token_set, cota_parcial, umbral)
+    matriz = matriz_fuzzy([comment], palabras, umbral)[0]
+
+    # Las mismas palabras alcanzan el umbral, con el puntaje de mejor_fuzzy_score
+    alcanzan = matriz >= umbral
+    assert (puntajes >= umbral).tolist() == alcanzan.tolist()
+    assert puntajes[alcanzan].tolist() == matriz[alcanzan].tolist() == [
+        mejor_fuzzy_score(palabra, comment) for palabra, si in zip(palabras, alcanzan) if si]
+    # Y la misma mejor palabra
+    if alcanzan.any():
+        assert np.argmax(puntajes) == np.argmax(matriz)
+
+# =============================================================================
+# LA MATRIZ DA LO MISMO QUE EL MÁXIMO DE LOS CUATRO MÉTODOS DE FUZZYWUZZY
+# =============================================================================
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(comentarios, min_size=1, max_size=4), st.lists(terminos, min_size=1, max_size=10),
+       umbrales)
+def test_matriz_igual_que_fuzzywuzzy(lista, palabras, umbral):
+    fuzzywuzzy = pytest.importorskip("fuzzywuzzy.fuzz")
+    esperada = np.array([[max(fuzzywuzzy.ratio(palabra, comment),
+                              fuzzywuzzy.partial_ratio(palabra, comment),
+                              fuzzywuzzy.token_sort_ratio(palabra, comment),
+                              fuzzywuzzy.token_set_ratio(palabra, comment))
+                          for palabra in palabras] for comment in lista])
+    matriz = matriz_fuzzy(lista, palabras, umbral)
+
+    # El corte en umbral - 0.5 no pierde ningún par que fuzzywuzzy redondea al umbral
+    alcanzan = esperada >= umbral
+    assert (matriz >= umbral).tolist() == alcanzan.tolist()
+    assert matriz[alcanzan].tolist() == esperada[alcanzan].tolist()
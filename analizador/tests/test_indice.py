@@ -0,0 +1,125 @@
+import copy
+import re
+
+import pytest
+
+import motor
+from motor import (UMBRAL_SIMILITUD, medidas_texto, mejor_fuzzy_score, normalizar_texto,
+                   preparar_catalogo, procesar_comentarios)
+from sinteticos import generar_catalogo, generar_comentarios
+
+# =============================================================================
+# EL ÍNDICE DE CANDIDATAS DA LO MISMO QUE PUNTUAR TODAS LAS PALABRAS
+# =============================================================================
+
+def fuerza_bruta(comentarios, api_data):
+    """
+    El bucle original: cada palabra de cada partida contra cada comentario,
+    con re.search para las exactas y mejor_fuzzy_score para las demás.
+    """
+    partidas_detectadas = {}
+    for comment in comentarios:
+        for item in api_data:
+            for palabra in item["palabras_limpias"]:
+                match = re.search(rf'\b{re.escape(palabra)}\b', comment)
+                if match:
+                    similitud = 100
+                    palabra_encontrada = match.group()
+                else:
+                    similitud = mejor_fuzzy_score(palabra, comment)
+                    if similitud < UMBRAL_SIMILITUD:
+                        continue
+                    palabras_en_comentario = comment.split()
+                    palabras_validas = [w for w in palabras_en_comentario if len(w) >= 3]
+                    candidatas = [w for w in palabras_validas if palabra in w]
+                    opciones = candidatas or palabras_validas or palabras_en_comentario
+                    palabra_encontrada = max(opciones, key=lambda w: mejor_fuzzy_score(palabra, w))
+
+                datos = partidas_detectadas.get(item["partida"])
+                if datos is None:
+                    partidas_detectadas[item["partida"]] = {
+                        "cantidad": 1, "similitud": similitud,
+                        "palabra_coincidente": palabra_encontrada, "texto_evaluado": comment}
+                else:
+                    datos["cantidad"] += 1
+                    if similitud > datos["similitud"]:
+                        datos["similitud"] = similitud
+                        datos["palabra_coincidente"] = palabra_encontrada
+                        datos["texto_evaluado"] = comment
+    return partidas_detectadas
+
+@pytest.mark.parametrize("semilla", [0, 1])
+def test_indice_igual_que_fuerza_bruta(semilla, monkeypatch):
+    # Sin la compuerta de medidas, que se prueba aparte: las cotas del índice
+    # y la cascada no pierden ninguna coincidencia
+    monkeypatch.setattr(motor, "medidas_texto", lambda texto: set())
+    api_data = generar_catalogo(120, semilla=semilla)
+    comentarios = [normalizar_texto(c) for c in generar_comentarios(300, 0.3, semilla=semilla)]
+    catalogo = preparar_catalogo(copy.deepcopy(api_data))
+
+    esperadas = fuerza_bruta(comentarios, catalogo.items)
+    obtenidas = procesar_comentarios(comentarios, catalogo, {})
+
+    assert esperadas
+    assert list(obtenidas) == list(esperadas)
+    for partida, datos in esperadas.items():
+        assert {campo: obtenidas[partida][campo] for campo in datos} == datos, partida
+
+# =============================================================================
+# SÓLO UNA MEDIDA DISTINTA DE LA MISMA UNIDAD DESCARTA UNA PALABRA
+# =============================================================================
+
+def unidad(medida):
+    return medida.lstrip("0123456789.")
+
+@pytest.mark.parametrize("semilla", [0, 1])
+def test_compuerta_solo_descarta_si_el_comentario_trae_otra_medida(semilla):
+    catalogo = preparar_catalogo(generar_catalogo(120, semilla=semilla))
+    comentarios = {normalizar_texto(c) for c in generar_comentarios(300, 0.3, semilla=semilla)}
+    descartadas = 0
+    for comment in sorted(comentarios):
+        candidatas = set(catalogo.indice.filtrar(comment)[0].tolist())
+        for j, palabra in enumerate(catalogo.palabras):
+            if j in candidatas or mejor_fuzzy_score(palabra, comment) < UMBRAL_SIMILITUD:
+                continue
+            # Una palabra que alcanza el umbral sólo se pierde si el comentario
+            # trae otra medida de la misma unidad que alguna de las suyas
+            medidas_palabra = medidas_texto(palabra)
+            otras = medidas_texto(comment) - medidas_palabra
+            assert any(unidad(m) == unidad(o) for m in medidas_palabra for o in otras), (comment, palabra)
+            descartadas += 1
+    assert descartadas
+
+def detectar(comentario, palabra):
+    catalogo = preparar_catalogo([{
+        "partida": "1.01", "descripcion": palabra, "unidadMedida": "pza",
+        "precioUnitario": 1.0, "palabra": palabra}])
+    return procesar_comentarios([normalizar_texto(comentario)], catalogo, {}).get("1.01")
+
+@pytest.mark.parametrize("comentario, palabra", [
+    # Número suelto igual al de la medida
+    ("se bajo tr 20 a fondo", 'TR 20"'),
+    ("temperatura de 150 c", "temperatura 150c"),
+    ("lodo 1.20", "lodo 1.2gcc"),
+    # Sin ninguna medida de esa unidad en el comentario
+    ("cambio de barrena", "cambio de barrena 12 1/4"),
+    # La medida de la palabra y otras de la misma unidad
+    ("tr 13 3/8 y tr 9 5/8 a fondo", 'TR 9 5/8"'),
+    # Otra medida, pero de otra unidad
+    ("tr 20 con lodo 1.2 gr/cc", 'TR 20"'),
+])
+def test_medidas_compatibles_no_descartan(comentario, palabra):
+    esperado = mejor_fuzzy_score(normalizar_texto(palabra), normalizar_texto(comentario))
+    assert esperado >= UMBRAL_SIMILITUD
+    datos = detectar(comentario, palabra)
+    assert datos is not None and datos["similitud"] == esperado
+
+@pytest.mark.parametrize("comentario, palabra", [
+    ("tr 13 5/8 a fondo", 'TR 13 3/8"'),
+    ("se bajo tr 30\" a fondo", 'TR 20"'),
+    ("lodo de 1.25 gr/cc", "lodo 1.2 gr/cc"),
+    ("temperatura de 160 °c", "temperatura 150c"),
+])
+def test_medida_distinta_de_la_misma_unidad_descarta(comentario, palabra):
+    assert mejor_fuzzy_score(normalizar_texto(palabra), normalizar_texto(comentario)) >= UMBRAL_SIMILITUD
+    assert detectar(comentario, palabra) is None
@@ -0,0 +1,43 @@
+import datetime
+
+import openpyxl
+import pytest
+
+from motor import TEXTOS_NA, iterar_comentarios, leer_comentarios
+
+# =============================================================================
+# LECTURA EN STREAMING IGUAL QUE PD.READ_EXCEL
+# =============================================================================
+
+def escribir_columna(file_path, valores, otras_columnas=True):
+    libro = openpyxl.Workbook()
+    hoja = libro.active
+    hoja.append(["Fecha", "Comments"] if otras_columnas else ["Comments"])
+    for i, valor in enumerate(valores):
+        hoja.append([f"2024-01-{i % 28 + 1:02d}", valor] if otras_columnas else [valor])
+    libro.save(file_path)
+
+def test_textos_na_son_los_de_pandas():
+    parsers = pytest.importorskip("pandas._libs.parsers")
+    assert TEXTOS_NA == set(parsers.STR_NA_VALUES)
+
+def test_igual_que_read_excel(tmp_path):
+    valores = sorted(TEXTOS_NA) + [
+        " NA", "na", "Null", "NONE", "n/a ", "#DIV/0!", "Cambió barrena 12 1/4\"", "007", "1.50",
+        5, 2.0, 3.25, True, None, datetime.datetime(2024, 1, 2), "", "texto final",
+    ]
+    file_path = str(tmp_path / "libro.xlsx")
+    escribir_columna(file_path, valores)
+    assert list(iterar_comentarios(file_path)) == leer_comentarios(file_path)
+
+def test_filas_vacias_y_sin_columna(tmp_path):
+    file_path = str(tmp_path / "libro.xlsx")
+    escribir_columna(file_path, ["a", None, "N/A", None, None])
+    assert list(iterar_comentarios(file_path)) == leer_comentarios(file_path)
+
+    libro = openpyxl.Workbook()
+    libro.active.append(["Fecha"])
+    libro.active.append(["2024-01-01"])
+    file_path = str(tmp_path / "sin_comentarios.xlsx")
+    libro.save(file_path)
+    assert list(iterar_comentarios(file_path)) == leer_comentarios(file_path)
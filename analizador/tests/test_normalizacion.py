@@ -0,0 +1,124 @@
+import math
+import re
+import unicodedata
+
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from motor import canonizar_medidas, medidas_texto, normalizar_columna, normalizar_texto
+
+# =============================================================================
+# NORMALIZACIÓN IGUAL QUE LA VERSIÓN ORIGINAL
+# =============================================================================
+
+def normalizar_original(texto):
+    """
+    normalizar_texto antes de precompilarlo y memoizarlo, tal cual. Sus
+    reemplazos de "9 1/2" y "20'" son los que canonizar_medidas generalizó
+    después, así que sólo es la referencia para textos sin medidas; las
+    medidas se prueban con casos escritos a mano.
+    """
+    texto = str(texto).lower()
+    # Remover diacríticos (ej.: "cáscara" -> "cascara")
+    texto = ''.join(c for c in unicodedata.normalize('NFD', texto)
+                    if unicodedata.category(c) != 'Mn')
+    # Reemplazos específicos del dominio
+    texto = texto.replace("9 1/2", "9.5").replace("9 1/2'", "9.5").replace("9.5'", "9.5")
+    texto = texto.replace("20'", "20in")
+    # Se conservan números, letras, puntos, comas y espacios
+    texto = re.sub(r'[^a-z0-9., ]', '', texto)
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    return texto
+
+def sin_digitos(texto):
+    return not any(c.isdigit() for c in unicodedata.normalize('NFD', texto.lower()))
+
+# Piezas típicas de los comentarios de campo sin números: acentos, unidades,
+# puntuación y blancos variados
+PIEZAS = [
+    "Cambió", "BARRENA", "tricónica", "ñ", "Ü", "ç", "é", "ﬁ", "İ", "ß", "Ω",
+    "pulg", "plg", "in", "gr/cm3", "lb/gal", "ppg", "grados", "°C", "a", "z",
+    ".", ",", ";", ":", "-", "_", "/", "\\", "'", "\"", "(", ")", "#", "%", "&", "°", "”", "″",
+    " ", "  ", "\t", "\n", "\r\n", "\xa0", " ",
+]
+textos = st.one_of(
+    st.lists(st.sampled_from(PIEZAS), max_size=12).map("".join),
+    st.lists(st.sampled_from(PIEZAS), max_size=8).map(" ".join),
+    st.text(max_size=40),
+).filter(sin_digitos)
+# Celdas sin medidas: los enteros no tienen punto ni unidad
+celdas = st.one_of(
+    textos,
+    st.none(),
+    st.just(math.nan),
+    st.integers(min_value=-10**12, max_value=10**12),
+    st.booleans(),
+)
+
+@settings(max_examples=500, deadline=None)
+@given(celdas)
+def test_normalizar_texto_igual_que_original(valor):
+    esperado = normalizar_original(valor)
+    assert normalizar_texto(valor) == esperado
+    # La segunda vez sale de la caché
+    assert normalizar_texto(valor) == esperado
+
+@settings(max_examples=200, deadline=None)
+@given(st.lists(celdas, max_size=30))
+def test_normalizar_columna_igual_que_original(valores):
+    # Con repetidos, para que la columna agrupe textos iguales
+    valores = valores + valores[:5]
+    assert normalizar_columna(valores) == [normalizar_original(valor) for valor in valores]
+
+@pytest.mark.parametrize("texto, esperado", [
+    # Fracciones y pulgadas
+    ("tr 13 3/8\"", "tr 13.375in"),
+    ("tr 13-3/8", "tr 13.375in"),
+    ("barrena 9 1/2'", "barrena 9.5in"),
+    ("barrena 12 1/4 pulg", "barrena 12.25in"),
+    ("3/4 de pulgada", "0.75in de pulgada"),
+    ("tr 20'", "tr 20in"),
+    ("7'' y 5 plg", "7in y 5in"),
+    ("12.250\"", "12.25in"),
+    ("9.50'", "9.5in"),
+    ("8/8 y 1/3", "8/8 y 1/3"),
+    # Densidades y temperaturas
+    ("1.2 gr/cm3", "1.2gcc"),
+    ("lodo 1.20 g / cc", "lodo 1.2gcc"),
+    ("10,5 lb/gal", "10.5ppg"),
+    ("150 °c", "150c"),
+    ("150.0 grados c", "150c"),
+    ("300 grados f", "300f"),
+    # Decimales y números sueltos
+    ("lodo 1.20", "lodo 1.2"),
+    ("0.50 dia", "0.5 dia"),
+    ("2.0", "2"),
+    ("tr 20 a fondo", "tr 20 a fondo"),
+    ("temperatura de 150 c", "temperatura de 150 c"),
+    ("1.2345678", "1.2345678"),
+    ("1,250.50", "1,250.50"),
+    ("v1.10", "v1.10"),
+])
+def test_canonizar_medidas(texto, esperado):
+    assert canonizar_medidas(texto) == esperado
+
+def test_casos_conocidos():
+    assert normalizar_texto("Cambió  BARRENA 9 1/2' ") == "cambio barrena 9.5in"
+    assert normalizar_texto("TR 13-3/8\"") == "tr 13.375in"
+    assert normalizar_texto("lodo 1.20 y 0.50") == "lodo 1.2 y 0.5"
+    assert normalizar_texto(math.nan) == "nan"
+    assert normalizar_columna([math.nan, None, 5, 2.5, True, "Ñandú"]) == [
+        "nan", "none", "5", "2.5", "true", "nandu"]
+
+@pytest.mark.parametrize("escrituras", [
+    ["12 1/4\"", "12-1/4", "12.25\"", "12.250\"", "12.25 pulg", "12 1/4 plg", "12.2500 in"],
+    ["9 1/2", "9 1/2'", "9-1/2\"", "9.5'", "9.50'", "9.500 pulgadas"],
+    ["1.2 gr/cm3", "1.20 g/cc", "1,2 grs/cm3", "1.200 gr / cc"],
+    ["150 °C", "150.0 grados c", "150,00 ºc"],
+])
+def test_todas_las_escrituras_dan_la_misma_medida(escrituras):
+    assert len({normalizar_texto(f"tr {escritura} a fondo") for escritura in escrituras}) == 1
+
+def test_solo_cuentan_las_medidas_con_unidad():
+    texto = normalizar_texto("TR 13 3/8\" a 0.50 dia, lodo 1.20 gr/cc a 150 °C y 20 m")
+    assert medidas_texto(texto) == {"13.375in", "1.2gcc", "150c"}
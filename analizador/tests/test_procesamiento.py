@@ -0,0 +1,91 @@
+import copy
+import threading
+
+import pytest
+
+import motor
+from motor import (FILAS_AVANCE_LECTURA, ContextoValidacion, GrupoProcesos, ValidacionCancelada,
+                   analizar_comentario, filas_resultados, iterar_comentarios,
+                   leer_comentarios, normalizar_texto, preparar_catalogo, procesar_contratos,
+                   registrar_partida)
+from sinteticos import escribir_libro, generar_catalogo, generar_comentarios
+
+# =============================================================================
+# AVANCE Y CANCELACIÓN DURANTE LA LECTURA
+# =============================================================================
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return preparar_catalogo(copy.deepcopy(generar_catalogo(30)))
+
+@pytest.mark.parametrize("agrupar", [True, False])
+def test_cancelar_durante_la_lectura(catalogo, agrupar):
+    cancelar = threading.Event()
+    leidas = []
+
+    def comentarios():
+        for comment in generar_comentarios(FILAS_AVANCE_LECTURA * 5):
+            leidas.append(comment)
+            yield normalizar_texto(comment)
+
+    def progreso_lectura(filas):
+        # Se cancela en el primer aviso, como lo haría el botón Cancelar
+        cancelar.set()
+
+    with pytest.raises(ValidacionCancelada):
+        procesar_contratos(comentarios(), {"": (catalogo, {})}, agrupar=agrupar, cancelar=cancelar,
+                           progreso_lectura=progreso_lectura)
+    # Se detiene en la siguiente revisión, sin leer el resto
+    assert len(leidas) == 2 * FILAS_AVANCE_LECTURA + 1
+
+def test_progreso_lectura(catalogo):
+    avisos = []
+    comentarios = [normalizar_texto(c) for c in generar_comentarios(FILAS_AVANCE_LECTURA * 2 + 10)]
+    procesar_contratos(comentarios, {"": (catalogo, {})}, progreso_lectura=avisos.append)
+    assert avisos == [FILAS_AVANCE_LECTURA, 2 * FILAS_AVANCE_LECTURA]
+
+# =============================================================================
+# AGRUPADO Y EN PARALELO DA LO MISMO QUE FILA POR FILA
+# =============================================================================
+
+def fila_por_fila(file_path, catalogo, contrato_info):
+    """
+    El bucle original: cada fila del libro, leído con pandas, se analiza por
+    separado y sus coincidencias se registran en el orden de las filas.
+    """
+    comentarios = leer_comentarios(file_path)
+    contexto = ContextoValidacion(dict(enumerate(comentarios)), contrato_info)
+    partidas_detectadas = {}
+    for fila, comment in enumerate(comentarios):
+        for item, similitud, palabra_encontrada in analizar_comentario(comment, catalogo):
+            registrar_partida(partidas_detectadas, item, similitud, palabra_encontrada, fila, contexto)
+    return partidas_detectadas
+
+@pytest.mark.parametrize("en_paralelo", [False, True])
+@pytest.mark.parametrize("agrupar", [True, False])
+def test_igual_que_fila_por_fila(catalogo, tmp_path, monkeypatch, agrupar, en_paralelo):
+    file_path = tmp_path / "comentarios.xlsx"
+    escribir_libro(file_path, generar_comentarios(400, duplicacion=0.7, semilla=3))
+    contrato_info = {"contrato": "C-1"}
+
+    esperadas = fila_por_fila(file_path, catalogo, contrato_info)
+    procesos = None
+    if en_paralelo:
+        # Varios bloques repartidos entre los procesos de un GrupoProcesos
+        monkeypatch.setattr(motor, "MINIMO_PARALELO", 10)
+        monkeypatch.setattr(motor, "MAXIMO_BLOQUE", 16)
+        procesos = GrupoProcesos(2)
+    try:
+        obtenidas = procesar_contratos(iterar_comentarios(file_path), {"": (catalogo, contrato_info)},
+                                       agrupar=agrupar, procesos=procesos)[""]
+    finally:
+        if procesos is not None:
+            procesos.cerrar()
+    if en_paralelo:
+        assert procesos.arranques == 1
+
+    assert esperadas
+    # Las mismas partidas, en el mismo orden, con la misma fila y los mismos valores
+    assert [(partida, datos.fila) for partida, datos in obtenidas.items()] == [
+        (partida, datos.fila) for partida, datos in esperadas.items()]
+    assert list(filas_resultados(obtenidas)) == list(filas_resultados(esperadas))
@@ -0,0 +1,110 @@
+import json
+import socket
+import threading
+import zipfile
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+import motor
+from motor import normalizar_texto, preparar_catalogo, procesar_contratos
+from servicio import TIPO_XLSX, ServicioMatching, crear_servidor, validar_en_servicio
+from sinteticos import escribir_libro, generar_catalogo, generar_comentarios
+
+# =============================================================================
+# SERVICIO LOCAL DE MATCHING
+# =============================================================================
+
+@pytest.fixture
+def servicio(tmp_path):
+    catalogo = tmp_path / "catalogo.json"
+    catalogo.write_text(json.dumps(generar_catalogo(40)), encoding="utf-8")
+    servicio = ServicioMatching({"A": str(catalogo)}, concurrentes=1, en_espera=1, trabajadores=1)
+    yield servicio
+    servicio.cerrar()
+
+@pytest.fixture
+def url(servicio):
+    servidor = crear_servidor(servicio, "127.0.0.1", 0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+def enviar_libro(url, cuerpo):
+    return requests.post(url + "/validar", params={"contrato": "A"}, data=cuerpo,
+                         headers={"Content-Type": TIPO_XLSX}, timeout=60)
+
+def test_valida_un_libro(url, tmp_path):
+    file_path = str(tmp_path / "libro.xlsx")
+    escribir_libro(file_path, generar_comentarios(50))
+    resultados = validar_en_servicio(url, file_path, {"A": {"Pozo": "X-1"}})
+    assert resultados["A"]
+    assert all(datos["contrato_info"] == "{'Pozo': 'X-1'}" for datos in resultados["A"].values())
+
+@pytest.mark.parametrize("cuerpo", ["bytes", "zip_sin_libro"])
+def test_libro_invalido_da_400(url, tmp_path, cuerpo):
+    if cuerpo == "bytes":
+        datos = b"esto no es un libro de Excel"
+    else:
+        # Un zip válido al que le faltan las partes del libro
+        ruta = tmp_path / "vacio.zip"
+        with zipfile.ZipFile(ruta, "w") as archivo:
+            archivo.writestr("hola.txt", "hola")
+        datos = ruta.read_bytes()
+    response = enviar_libro(url, datos)
+    assert response.status_code == 400
+    assert response.json() == {"error": "El archivo no es un libro de Excel (.xlsx) válido"}
+
+def test_ocupado_da_503_sin_leer_el_cuerpo(servicio, url):
+    # Todos los lugares ocupados
+    with servicio.reservar(), servicio.reservar():
+        # Se anuncia un libro de 100 MB sin enviarlo: si el servicio lo
+        # esperara para revisar si está ocupado, no respondería
+        direccion = urlsplit(url)
+        with socket.create_connection((direccion.hostname, direccion.port), timeout=10) as conexion:
+            conexion.sendall(b"POST /validar?contrato=A HTTP/1.1\r\nHost: prueba\r\n"
+                             b"Content-Type: " + TIPO_XLSX.encode() + b"\r\n"
+                             b"Content-Length: " + str(100 * 1024 * 1024).encode() + b"\r\n\r\n")
+            assert conexion.recv(64).startswith(b"HTTP/1.0 503")
+
+        # Con el cuerpo enviado completo, el cliente también recibe la respuesta
+        response = enviar_libro(url, b"x" * (1024 * 1024))
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+
+    # Al liberarse, se vuelve a atender
+    response = enviar_libro(url, b"esto no es un libro de Excel")
+    assert response.status_code == 400
+
+def test_procesos_compartidos_entre_validaciones(tmp_path, monkeypatch):
+    # Con pocos comentarios también se reparten entre los procesos
+    monkeypatch.setattr(motor, "MINIMO_PARALELO", 10)
+    catalogo = tmp_path / "catalogo.json"
+    catalogo.write_text(json.dumps(generar_catalogo(40)), encoding="utf-8")
+    servicio = ServicioMatching({"A": str(catalogo)}, concurrentes=1, en_espera=1, trabajadores=2)
+    try:
+        comentarios = generar_comentarios(120, 0.2)
+        contratos = {"A": {"Pozo": "X-1"}}
+
+        def esperado():
+            compilado = servicio.catalogo("A")["catalogo"]
+            resultados = procesar_contratos(map(normalizar_texto, comentarios),
+                                            {"A": (compilado, contratos["A"])})
+            return {partida: datos.como_diccionario() for partida, datos in resultados["A"].items()}
+
+        for _ in range(3):
+            respuesta = servicio.validar(comentarios=comentarios, contratos=contratos)
+            assert respuesta["resultados"]["A"] == esperado()
+        assert servicio.procesos.arranques == 1
+
+        # Otra versión del catálogo (como la que arma CatalogosPrecargados): se arranca otro grupo
+        servicio.locales["A"] = {"catalogo": preparar_catalogo(generar_catalogo(60, semilla=5)),
+                                 "estado": None}
+        respuesta = servicio.validar(comentarios=comentarios, contratos=contratos)
+        assert respuesta["resultados"]["A"] == esperado()
+        servicio.validar(comentarios=comentarios, contratos=contratos)
+        assert servicio.procesos.arranques == 2
+    finally:
+        servicio.cerrar()